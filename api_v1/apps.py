@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ApiV1Config(AppConfig):
     name = 'api_v1'
+
+    def ready(self):
+        # registers system checks
+        from api_v1 import money  # noqa: F401
@@ -0,0 +1,200 @@
+import re
+import asyncio
+from threading import Event
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.urls import set_script_prefix
+
+from app.settings import ASGI_READ_THREADS
+
+
+READ_METHODS = ('GET', 'HEAD')
+READ_PATH = re.compile(
+    r'^/api/v1/(customers/(\d+/)?|transactions/(export/)?)$'
+)
+
+# parts of streaming response read ahead of sending
+STREAM_BUFFER = 16
+
+
+class ReadHandler(ASGIHandler):
+    """
+    Serves read endpoints from the event loop of ASGI server
+
+    Django 3.0 has neither async views nor async database access, so
+    request is parsed and answered on the event loop and only the view
+    with its queries is awaited on a dedicated bounded thread pool.
+    Streaming response is iterated and closed on the pool as well.
+    Pool size limits connections used by reads, with `CONN_MAX_AGE`
+    thread keeps its connection between requests, and slow history
+    query holds a thread instead of a worker process
+    """
+
+    def __init__(self, max_workers: int):
+        # sync middleware chain, view is called within pool thread
+        BaseHandler.__init__(self)
+        self.load_middleware()
+        self.executor = ThreadPoolExecutor(max_workers,
+                                           thread_name_prefix='asgi-read')
+
+    async def __call__(self, scope: dict, receive: Callable,
+                       send: Callable) -> None:
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+
+        set_script_prefix(
+            settings.FORCE_SCRIPT_NAME or scope.get('root_path', '')
+        )
+
+        request, response = self.create_request(scope, body_file)
+
+        loop = asyncio.get_event_loop()
+
+        if request is not None:
+            response = await loop.run_in_executor(
+                self.executor, self.get_read_response, request
+            )
+
+        await self.send_response(response, send)
+        body_file.close()
+
+    def get_read_response(self, request: HttpRequest) -> HttpResponse:
+        """ Runs view, connection is checked in the same thread it's used """
+        signals.request_started.send(sender=self.__class__,
+                                     scope=request.scope)
+        close_old_connections()
+        try:
+            response = self.get_response(request)
+        finally:
+            close_old_connections()
+
+        response._handler_class = self.__class__
+        return response
+
+    async def send_response(self, response: HttpResponse,
+                            send: Callable) -> None:
+        """ Sends response, it's closed on the pool once it's sent """
+        loop = asyncio.get_event_loop()
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': get_response_headers(response),
+        })
+
+        if response.streaming:
+            await self.send_streaming(response, send)
+            return
+
+        for chunk, last in self.chunk_bytes(response.content):
+            await send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': not last,
+            })
+
+        await loop.run_in_executor(self.executor, response.close)
+
+    async def send_streaming(self, response: StreamingHttpResponse,
+                             send: Callable) -> None:
+        """
+        Sends parts which one pool thread reads and puts into a queue
+
+        Streaming content may read a server-side cursor, so the same
+        thread iterates and closes response, queue bound holds it while
+        client reads slower than rows are fetched
+        """
+        loop = asyncio.get_event_loop()
+        parts = asyncio.Queue(STREAM_BUFFER)
+        stopped = Event()
+        done = object()
+
+        def put(part) -> None:
+            asyncio.run_coroutine_threadsafe(parts.put(part), loop).result()
+
+        def produce() -> None:
+            try:
+                for part in response:
+                    if stopped.is_set():
+                        break
+                    put(part)
+            finally:
+                try:
+                    response.close()
+                finally:
+                    if not stopped.is_set():
+                        put(done)
+
+        producer = loop.run_in_executor(self.executor, produce)
+
+        try:
+            while True:
+                part = await parts.get()
+                if part is done:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        finally:
+            # producer waiting on full queue sees that client is gone
+            stopped.set()
+            while not parts.empty():
+                parts.get_nowait()
+
+        # failed iteration aborts response instead of completing it
+        await producer
+        await send({'type': 'http.response.body'})
+
+
+def get_response_headers(response: HttpResponse) -> List[Tuple[bytes, bytes]]:
+    """ Headers with cookies, case is kept the same way as Django does """
+    headers = []
+
+    for header, value in response.items():
+        if isinstance(header, str):
+            header = header.encode('ascii')
+        if isinstance(value, str):
+            value = value.encode('latin1')
+        headers.append((bytes(header), bytes(value)))
+
+    for cookie in response.cookies.values():
+        headers.append(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+        )
+
+    return headers
+
+
+class ReadRouter:
+    """ Routes read requests to `ReadHandler`, the others to application """
+
+    def __init__(self, application: Callable,
+                 max_workers: int = ASGI_READ_THREADS):
+        self.application = application
+        self.read_handler = ReadHandler(max_workers)
+
+    async def __call__(self, scope: dict, receive: Callable,
+                       send: Callable) -> None:
+        if is_read_request(scope):
+            await self.read_handler(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
+
+
+def is_read_request(scope: dict) -> bool:
+    return scope['type'] == 'http' and \
+        scope['method'] in READ_METHODS and \
+        READ_PATH.match(scope['path']) is not None
@@ -0,0 +1,245 @@
+import math
+import random
+from time import perf_counter
+from decimal import Decimal
+from threading import Thread
+from queue import Queue, Empty
+from collections import Counter, namedtuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.db import connections, transaction
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIClient
+
+from wallet.models import Account
+from api_v1.retry import conflicts
+from api_v1.services import bulk_create_customers_with_wallets
+from api_v1.utils import calculate_fee, calculate_total, is_ledger_mode
+
+
+UNIFORM = 'uniform'
+ZIPF = 'zipf'
+PING_PONG = 'pingpong'
+PATTERNS = (UNIFORM, ZIPF, PING_PONG)
+
+TRANSFER = 'transfer'
+TRANSACTIONS = 'transactions'
+CUSTOMERS = 'customers'
+ENDPOINTS = (TRANSFER, TRANSACTIONS, CUSTOMERS)
+
+PERCENTILES = (50, 95, 99)
+
+# host which is allowed in debug mode without ALLOWED_HOSTS
+SERVER_NAME = 'localhost'
+
+Request = namedtuple('Request', ('endpoint', 'method', 'path', 'data', 'fee'))
+Response = namedtuple('Response', ('endpoint', 'status', 'elapsed', 'fee'))
+
+
+def seed_customers(count: int) -> List[Account]:
+    """ Creates customers with wallets as API does, returns funded accounts """
+    with transaction.atomic():
+        created = bulk_create_customers_with_wallets([
+            {'first_name': 'Load', 'last_name': str(number)}
+            for number in range(count)
+        ])
+
+    return [account for _, accounts in created
+            for account in accounts if account.amount]
+
+
+def get_pairs(accounts: List[Account], pattern: str,
+              rnd: random.Random,
+              zipf_s: float = 1.1) -> Iterator[Tuple[Account, Account]]:
+    """
+    Endless accounts pairs of transfers between different customers
+
+    `uniform` pattern picks any accounts, `zipf` one makes the first
+    accounts hot, `pingpong` one moves money between two accounts back
+    and forth, so opposite transfers collide all the time
+    """
+    if pattern == PING_PONG:
+        first, second = accounts[:2]
+        while True:
+            yield first, second
+            first, second = second, first
+
+    weights = None
+    if pattern == ZIPF:
+        weights = [1 / rank ** zipf_s for rank in range(1, len(accounts) + 1)]
+
+    while True:
+        account_from, account_to = rnd.choices(accounts, weights, k=2)
+        if account_from.customer_id != account_to.customer_id:
+            yield account_from, account_to
+
+
+def get_requests(accounts: List[Account], pattern: str, count: int,
+                 mix: Dict[str, int], amount: Decimal,
+                 rnd: random.Random, zipf_s: float = 1.1) -> List[Request]:
+    """ Requests of the run, history and customers read accounts in use """
+    pairs = get_pairs(accounts, pattern, rnd, zipf_s)
+    fee = calculate_total(amount, calculate_fee(amount)) - amount
+    requests = []
+
+    for endpoint in rnd.choices(list(mix), list(mix.values()), k=count):
+        account_from, account_to = next(pairs)
+
+        if endpoint == TRANSFER:
+            requests.append(Request(TRANSFER, 'post', '/api/v1/transfer/', {
+                'customer_from': account_from.customer_id,
+                'account_from': str(account_from.uuid),
+                'customer_to': account_to.customer_id,
+                'account_to': str(account_to.uuid),
+                'amount': str(amount)
+            }, fee))
+        elif endpoint == TRANSACTIONS:
+            requests.append(Request(
+                TRANSACTIONS, 'get', '/api/v1/transactions/',
+                {'account_to_uuid': str(account_to.uuid)}, 0
+            ))
+        else:
+            requests.append(Request(
+                CUSTOMERS, 'get',
+                '/api/v1/customers/%s/' % account_to.customer_id, None, 0
+            ))
+
+    return requests
+
+
+def send(client: APIClient, request: Request) -> Response:
+    started = perf_counter()
+
+    if request.method == 'post':
+        response = client.post(request.path, request.data, format='json')
+    else:
+        response = client.get(request.path, request.data)
+
+    return Response(
+        request.endpoint, response.status_code, perf_counter() - started,
+        request.fee if response.status_code == HTTP_200_OK else 0
+    )
+
+
+def run_requests(requests: List[Request],
+                 concurrency: int) -> Tuple[List[Response], float]:
+    """
+    Sends requests through the whole API stack by concurrent workers
+
+    Every worker has its own client and database connection, which is
+    closed when the worker is done
+
+    Returns:
+        Tuple[List[Response], float]: responses and elapsed seconds
+    """
+    queue = Queue()
+    for request in requests:
+        queue.put(request)
+
+    responses = []
+
+    def work():
+        client = APIClient(raise_request_exception=False,
+                           SERVER_NAME=SERVER_NAME)
+        try:
+            while True:
+                try:
+                    request = queue.get_nowait()
+                except Empty:
+                    return
+                responses.append(send(client, request))
+        finally:
+            connections.close_all()
+
+    workers = [Thread(target=work) for _ in range(concurrency)]
+    started = perf_counter()
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return responses, perf_counter() - started
+
+
+def get_percentile(values: List[float], percent: int) -> float:
+    """ Nearest rank percentile of sorted values """
+    if not values:
+        return 0
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+def get_total_balance(customers: List[int]) -> Decimal:
+    """ Sum of customers balances the same as API shows them """
+    if is_ledger_mode():
+        accounts = Account.objects.with_ledger_balance()
+    else:
+        accounts = Account.objects.with_shards_balance()
+
+    return sum((account.balance
+                for account in accounts.filter(customer__in=customers)),
+               Decimal(0))
+
+
+def get_endpoint_stats(responses: List[Response]) -> Dict:
+    elapsed = sorted(response.elapsed for response in responses)
+    statuses = Counter(response.status for response in responses)
+
+    stats = {
+        'requests': len(responses),
+        'ok': statuses[HTTP_200_OK],
+        'rejected': statuses[HTTP_400_BAD_REQUEST],
+        'failed': len(responses) - statuses[HTTP_200_OK] -
+        statuses[HTTP_400_BAD_REQUEST],
+    }
+    for percent in PERCENTILES:
+        stats['p%s' % percent] = get_percentile(elapsed, percent)
+
+    return stats
+
+
+def run_benchmark(customers: int, requests: int, concurrency: int,
+                  pattern: str, mix: Dict[str, int], amount: Decimal,
+                  seed: Optional[int] = None, zipf_s: float = 1.1) -> Dict:
+    """
+    Seeds customers, loads API with them and checks money conservation
+
+    Transfer fee isn't credited to any account, so balances of seeded
+    customers must decrease exactly by fees of succeeded transfers.
+    Conflicts are counted by retries of this process only, so API is
+    called in process instead of over network
+
+    Returns:
+        Dict: throughput, stats by endpoint, conflicts and money totals
+    """
+    rnd = random.Random(seed)
+    accounts = seed_customers(customers)
+    customer_ids = [account.customer_id for account in accounts]
+
+    initial = get_total_balance(customer_ids)
+    conflicts_before = Counter(conflicts)
+
+    responses, elapsed = run_requests(
+        get_requests(accounts, pattern, requests, mix, amount, rnd, zipf_s),
+        concurrency
+    )
+
+    fees = sum((response.fee for response in responses), Decimal(0))
+    final = get_total_balance(customer_ids)
+
+    return {
+        'elapsed': elapsed,
+        'throughput': len(responses) / elapsed if elapsed else 0,
+        'endpoints': {
+            endpoint: get_endpoint_stats([
+                response for response in responses
+                if response.endpoint == endpoint
+            ])
+            for endpoint in ENDPOINTS if endpoint in mix
+        },
+        'conflicts': Counter(conflicts) - conflicts_before,
+        'initial': initial,
+        'fees': fees,
+        'final': final,
+        'conserved': initial - fees == final,
+    }
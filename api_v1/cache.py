@@ -0,0 +1,204 @@
+import os
+import hashlib
+import logging
+from uuid import uuid4
+from functools import wraps
+from threading import Lock
+from time import monotonic
+from collections import Counter
+from typing import Callable, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from api_v1.metrics import read_snapshots, write_snapshot
+
+
+HIT = 'hits'
+MISS = 'misses'
+
+HISTORY = 'history'
+NAMES = 'names'
+
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+# files of every process, e.g. `<pid>.cache.json`
+SNAPSHOT_SUFFIX = '.cache.json'
+
+logger = logging.getLogger(__name__)
+
+stats = Counter()
+_stats_lock = Lock()
+_last_flush = monotonic()
+
+
+def count_request(name: str, result: str) -> None:
+    with _stats_lock:
+        stats[(name, result)] += 1
+
+    if monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def flush() -> None:
+    """ Writes hits and misses of the process for stats of any worker """
+    global _last_flush
+
+    with _stats_lock:
+        data = {}
+        for (name, result), count in stats.items():
+            data.setdefault(name, {})[result] = count
+        _last_flush = monotonic()
+
+    try:
+        write_snapshot(data, SNAPSHOT_SUFFIX)
+    except (OSError, ValueError):
+        logger.exception('Cache stats of process %s are not written',
+                         os.getpid())
+
+
+def get_stats() -> Dict[str, Dict]:
+    """
+    Hits, misses and hit ratio of every cached endpoint summed over
+    all processes, files of stopped ones included
+    """
+    flush()
+    merged = Counter()
+
+    for data in read_snapshots(SNAPSHOT_SUFFIX):
+        for name, counts in data.items():
+            for result, count in counts.items():
+                merged[(name, result)] += count
+
+    result = {}
+    for name in sorted({name for name, _ in merged}):
+        hits, misses = merged[(name, HIT)], merged[(name, MISS)]
+        result[name] = {
+            HIT: hits,
+            MISS: misses,
+            'hit_ratio': round(hits / (hits + misses), 4)
+        }
+
+    return result
+
+
+def account_scope(uuid) -> str:
+    return 'account:%s' % uuid
+
+
+def customer_scope(customer_id) -> str:
+    return 'customer:%s' % customer_id
+
+
+def get_generation_key(scope: str) -> str:
+    return 'wallet:generation:%s' % scope
+
+
+def get_generations(scopes: List[str]) -> List[str]:
+    """
+    Current generations of scopes, missing ones are started
+
+    Generation is a random token, so a scope whose generation was
+    evicted by the cache starts a new one and never meets stale entries
+    """
+    keys = [get_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+
+    if missing:
+        for key in missing:
+            cache.add(key, uuid4().hex, timeout=None)
+        generations.update(cache.get_many(missing))
+
+    return [generations.get(key, '') for key in keys]
+
+
+def invalidate(scopes: Iterable[str]) -> None:
+    """
+    Starts new generations of scopes when current transaction commits
+
+    Entries cached under previous generations are not read anymore,
+    they are evicted by the cache itself
+    """
+    keys = [get_generation_key(scope) for scope in set(scopes)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_transfers(transfers: Iterable[Dict]) -> None:
+    """ Invalidates history and customers touched by applied transfers """
+    scopes = [HISTORY]
+
+    for item in transfers:
+        scopes += [
+            account_scope(item['account_from']),
+            account_scope(item['account_to']),
+            customer_scope(item['customer_from']),
+            customer_scope(item.get('customer_to', item['customer_from'])),
+        ]
+
+    invalidate(scopes)
+
+
+def get_response_key(request: Request, generations: List[str]) -> str:
+    value = '|'.join([request.get_full_path(),
+                      request.accepted_media_type] + generations)
+    return 'wallet:response:%s' % hashlib.md5(value.encode()).hexdigest()
+
+
+def cached_response(func: Callable) -> Callable:
+    """
+    Read-through cache of viewset action JSON responses
+
+    Viewset provides `get_cache_scopes()` - data scopes the response
+    depends on, cache key includes their generations, so a write
+    invalidates responses by starting new generations of its scopes.
+    Cached response keeps its `ETag` and `Last-Modified`, so
+    conditional request is answered without database as well
+    """
+
+    @wraps(func)
+    def wrapper(self, request: Request, *args, **kwargs):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+        if not timeout or request.accepted_renderer.format != 'json':
+            return func(self, request, *args, **kwargs)
+
+        name = '%s-%s' % (self.basename, self.action)
+        scopes = self.get_cache_scopes(request, *args, **kwargs)
+        key = get_response_key(request, get_generations(scopes))
+        cached = cache.get(key)
+
+        if cached is not None:
+            count_request(name, HIT)
+            return get_cached_response(request, *cached)
+
+        count_request(name, MISS)
+        response = func(self, request, *args, **kwargs)
+
+        if response.status_code == 200:
+            headers = {header: response[header] for header in CACHED_HEADERS
+                       if response.has_header(header)}
+            cache.set(key, (response.data, headers), timeout)
+
+        return response
+
+    return wrapper
+
+
+def get_cached_response(request: Request, data, headers: Dict) -> Response:
+    response = Response(data, headers=headers)
+
+    if not headers:
+        return response
+
+    return get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+        response=response
+    )
@@ -0,0 +1,51 @@
+import hashlib
+from calendar import timegm
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Optional, Sequence
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
+
+
+def get_etag(request: Request, version: Sequence) -> str:
+    """ Quoted ETag of rendered media type and data version """
+    value = '%s:%s' % (request.accepted_media_type, version)
+    return quote_etag(hashlib.md5(value.encode()).hexdigest())
+
+
+def conditional_list(func: Callable) -> Callable:
+    """
+    Answers list action with 304 when client has its current version
+
+    Viewset provides `get_list_version()` returning cheap validators,
+    data version and last modification time, they are checked against
+    `If-None-Match` and `If-Modified-Since` before the list is queried
+    and set as `ETag` and `Last-Modified` of the response
+    """
+
+    @wraps(func)
+    def wrapper(self, request: Request, *args, **kwargs):
+        version, modified_at = self.get_list_version()
+        etag = get_etag(request, version)
+        last_modified = get_timestamp(modified_at)
+
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=last_modified)
+
+        if response is None:
+            response = func(self, request, *args, **kwargs)
+
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response.setdefault('ETag', etag)
+            if last_modified is not None:
+                response.setdefault('Last-Modified', http_date(last_modified))
+
+        return response
+
+    return wrapper
+
+
+def get_timestamp(value: Optional[datetime]) -> Optional[int]:
+    return timegm(value.utctimetuple()) if value is not None else None
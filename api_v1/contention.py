@@ -0,0 +1,250 @@
+import os
+import random
+import logging
+from time import monotonic, time
+from hashlib import blake2b
+from heapq import heappop, heappush, heapify
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+from api_v1.metrics import QueryTimer, read_snapshots, write_snapshot
+
+
+SKETCH_WIDTH = 2048
+SKETCH_DEPTH = 4
+
+# values estimated for every key
+TRANSFERS = 'transfers'
+LOCK_WAIT = 'lock_wait_seconds'
+VALUES = (TRANSFERS, LOCK_WAIT)
+
+ACCOUNTS = 'accounts'
+PAIRS = 'pairs'
+PAIR_SEPARATOR = '>'
+
+SNAPSHOT_SUFFIX = '.contention.json'
+
+logger = logging.getLogger(__name__)
+
+
+class TopKeys:
+    """
+    Keys with the largest estimates, the smallest one is replaced first
+
+    Heap keeps outdated estimates of keys as well, they're skipped when
+    popped and the heap is rebuilt when it grows too much. Zero size
+    keeps no keys
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.estimates = {}
+        self.heap = []
+
+    def offer(self, key: str, estimate: float) -> None:
+        if self.size <= 0:
+            return
+
+        if key not in self.estimates and len(self.estimates) >= self.size:
+            self._drop_outdated()
+            if estimate <= self.heap[0][0]:
+                return
+            _, smallest = heappop(self.heap)
+            del self.estimates[smallest]
+
+        self.estimates[key] = estimate
+        heappush(self.heap, (estimate, key))
+
+        if len(self.heap) > self.size * 4:
+            self.heap = [(value, key)
+                         for key, value in self.estimates.items()]
+            heapify(self.heap)
+
+    def _drop_outdated(self) -> None:
+        while self.heap[0][0] != self.estimates.get(self.heap[0][1]):
+            heappop(self.heap)
+
+
+class HotKeys:
+    """
+    Count-min sketches of transfers and lock wait by key with top keys
+
+    Memory doesn't depend on count of keys, estimate of a key may only
+    exceed its real value, by a share of total which is lower the wider
+    sketch is. Keys are hashed once for both values
+    """
+
+    def __init__(self, size: int, width: int = SKETCH_WIDTH,
+                 depth: int = SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.tables = [[[0.0] * width for _ in range(depth)]
+                       for _ in VALUES]
+        self.tops = [TopKeys(size) for _ in VALUES]
+
+    def get_indexes(self, key: str) -> List[int]:
+        digest = blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[row * 4:row * 4 + 4], 'little')
+                % self.width for row in range(self.depth)]
+
+    def add(self, key: str, values: Tuple[float, ...]) -> None:
+        indexes = self.get_indexes(key)
+
+        for table, top, value in zip(self.tables, self.tops, values):
+            estimate = None
+            for row, index in zip(table, indexes):
+                row[index] += value
+                if estimate is None or row[index] < estimate:
+                    estimate = row[index]
+            top.offer(key, estimate)
+
+    def estimate(self, key: str) -> Tuple[float, ...]:
+        indexes = self.get_indexes(key)
+        return tuple(min(row[index] for row, index in zip(table, indexes))
+                     for table in self.tables)
+
+    def get_top(self) -> Dict[str, List[float]]:
+        """ Estimates of keys which are top by any value """
+        keys = set()
+        for top in self.tops:
+            keys.update(top.estimates)
+        return {key: list(self.estimate(key)) for key in keys}
+
+
+accounts = HotKeys(settings.CONTENTION_TOP_SIZE)
+pairs = HotKeys(settings.CONTENTION_TOP_SIZE)
+_lock = Lock()
+_started = time()
+_last_flush = monotonic()
+
+
+def record(account_from: str, account_to: str, lock_wait: float,
+           weight: float = 1) -> None:
+    """ Adds transfer to both accounts and to their pair """
+    values = (weight, lock_wait * weight)
+
+    with _lock:
+        accounts.add(account_from, values)
+        if account_to != account_from:
+            accounts.add(account_to, values)
+        pairs.add(PAIR_SEPARATOR.join((account_from, account_to)), values)
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Records sampled transfers by accounts with their lock wait time
+
+    Every `CONTENTION_SAMPLE_RATE` share of transfers is measured and
+    counted as `1 / CONTENTION_SAMPLE_RATE` transfers, the others cost
+    one random number. Lock wait is time of queries locking rows with
+    `FOR UPDATE`, `returning` engine locks rows by its only statement,
+    so the whole statement is counted
+
+    Recording never changes result or exception of the transfer,
+    its errors are only logged
+    """
+
+    @wraps(func)
+    def wrapper(data, *args, **kwargs):
+        rate = settings.CONTENTION_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return func(data, *args, **kwargs)
+
+        timer = QueryTimer()
+        try:
+            with connection.execute_wrapper(timer):
+                return func(data, *args, **kwargs)
+        finally:
+            try:
+                record(str(data['account_from']), str(data['account_to']),
+                       timer.lock_wait_seconds, 1 / rate)
+
+                if monotonic() - _last_flush >= \
+                        settings.METRICS_FLUSH_INTERVAL:
+                    flush()
+            except Exception:
+                logger.exception('Sampled transfer is not recorded')
+
+    return wrapper
+
+
+def flush() -> None:
+    """ Writes top keys of the process, sketches stay in the process """
+    global _last_flush
+
+    with _lock:
+        data = {
+            'started': _started,
+            ACCOUNTS: accounts.get_top(),
+            PAIRS: pairs.get_top(),
+        }
+        _last_flush = monotonic()
+
+    try:
+        write_snapshot(data, SNAPSHOT_SUFFIX)
+    except (OSError, ValueError):
+        logger.exception('Hot accounts of process %s are not written',
+                         os.getpid())
+
+
+def get_key_fields(kind: str, key: str) -> Dict:
+    if kind == PAIRS:
+        account_from, account_to = key.split(PAIR_SEPARATOR)
+        return {'account_from': account_from, 'account_to': account_to}
+    return {'uuid': key}
+
+
+def get_ranking(kind: str, keys: Dict[str, List[float]], value: str,
+                top: int, seconds: float) -> List[Dict]:
+    index = VALUES.index(value)
+    ranking = sorted(keys.items(), key=lambda item: item[1][index],
+                     reverse=True)[:top]
+
+    return [
+        dict(
+            get_key_fields(kind, key),
+            transfers=round(values[0]),
+            transfers_per_second=round(values[0] / seconds, 3)
+            if seconds else 0,
+            lock_wait_seconds=round(values[1], 6)
+        )
+        for key, values in ranking
+    ]
+
+
+def get_hot_accounts(top: int = 10) -> Dict:
+    """
+    The hottest accounts and pairs of all processes by lock wait and rate
+
+    Top keys of processes are summed, a key which is top in some of them
+    only is underestimated by the others
+
+    Returns:
+        Dict: rankings of accounts and pairs with time they're counted for
+    """
+    flush()
+    merged = {ACCOUNTS: {}, PAIRS: {}}
+    started = time()
+
+    for data in read_snapshots(SNAPSHOT_SUFFIX):
+        started = min(started, data['started'])
+        for kind in merged:
+            for key, values in data[kind].items():
+                total = merged[kind].setdefault(key, [0, 0])
+                total[0] += values[0]
+                total[1] += values[1]
+
+    seconds = time() - started
+    result = {'seconds': round(seconds, 3)}
+
+    for kind, keys in merged.items():
+        result[kind] = {
+            'by_%s' % value: get_ranking(kind, keys, value, top, seconds)
+            for value in VALUES
+        }
+
+    return result
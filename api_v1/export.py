@@ -0,0 +1,139 @@
+import csv
+import json
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from app.settings import EXPORT_CHUNK_SIZE
+from api_v1.rendering import get_formatter, get_lookup
+from api_v1.serializers import TransactionSerializer
+
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+
+CUSTOMER_FIELDS = ('id', 'first_name', 'last_name')
+
+
+class NDJSONRenderer(JSONRenderer):
+    """ Renders errors of export, rows are streamed by `export_response` """
+    media_type = 'application/x-ndjson'
+    format = NDJSON
+
+
+class CSVRenderer(JSONRenderer):
+    """ Renders errors of export, rows are streamed by `export_response` """
+    media_type = 'text/csv'
+    format = CSV
+
+
+class Echo:
+    """ File-like object which returns written value to csv writer """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def get_transaction_columns() -> List[Tuple[str, str, Callable]]:
+    """
+    Describes exported columns of transaction history
+
+    Every column is a tuple of output name, `values_list` lookup and
+    precompiled representation function of `TransactionSerializer` field,
+    so exported values are formatted the same way API formats them
+    """
+    fields = TransactionSerializer().fields
+    columns = []
+
+    for name, field in fields.items():
+        if name in ('customer_from', 'customer_to'):
+            columns += [
+                ('%s_%s' % (name, customer_field),
+                 '%s__%s' % (get_lookup(field), customer_field),
+                 get_formatter(field.fields[customer_field]))
+                for customer_field in CUSTOMER_FIELDS
+            ]
+        else:
+            columns.append((name, get_lookup(field), get_formatter(field)))
+
+    return columns
+
+
+def iter_transaction_rows(queryset: QuerySet,
+                          columns: List[Tuple[str, str, Callable]]
+                          ) -> Iterator[List]:
+    """ Yields formatted values reading rows from server-side cursor """
+    lookups = [lookup for _, lookup, _ in columns]
+    formatters = [formatter for _, _, formatter in columns]
+
+    rows = queryset.values_list(*lookups).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+    for row in rows:
+        yield [None if value is None else formatter(value)
+               for formatter, value in zip(formatters, row)]
+
+
+def nest_customers(row: Dict) -> Dict:
+    """ Makes flat exported row the same shape as `TransactionSerializer` """
+    for name in ('customer_from', 'customer_to'):
+        row[name] = {
+            field: row.pop('%s_%s' % (name, field))
+            for field in CUSTOMER_FIELDS
+        }
+    return row
+
+
+def iter_ndjson(queryset: QuerySet) -> Iterator[str]:
+    columns = get_transaction_columns()
+    names = [name for name, _, _ in columns]
+    order = list(TransactionSerializer().fields)
+
+    for values in iter_transaction_rows(queryset, columns):
+        row = nest_customers(dict(zip(names, values)))
+        yield json.dumps({name: row[name] for name in order},
+                         ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def iter_csv(queryset: QuerySet) -> Iterator[str]:
+    columns = get_transaction_columns()
+    writer = csv.writer(Echo())
+
+    yield writer.writerow([name for name, _, _ in columns])
+
+    for values in iter_transaction_rows(queryset, columns):
+        yield writer.writerow(values)
+
+
+EXPORT_FORMATS = {
+    NDJSON: (iter_ndjson, NDJSONRenderer.media_type),
+    CSV: (iter_csv, CSVRenderer.media_type),
+}
+
+
+def export_response(queryset: QuerySet,
+                    export_format: str) -> StreamingHttpResponse:
+    """
+    Streams transaction history in NDJSON or CSV format
+
+    Rows are read in chunks from server-side cursor and formatted
+    one by one, so memory doesn't depend on exported rows count
+
+    Arguments:
+        queryset: QuerySet - filtered transaction history
+        export_format: str - 'ndjson' or 'csv'
+
+    Returns:
+        StreamingHttpResponse: response with exported history
+    """
+    iter_rows, content_type = EXPORT_FORMATS[export_format]
+
+    response = StreamingHttpResponse(iter_rows(queryset),
+                                     content_type=content_type)
+    response['Content-Disposition'] = \
+        'attachment; filename="transactions.%s"' % export_format
+
+    return response
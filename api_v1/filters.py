@@ -1,11 +1,33 @@
+from django.db.models import QuerySet
 from django_filters.rest_framework import (
     FilterSet,
     UUIDFilter,
-    CharFilter
+    CharFilter,
+    IsoDateTimeFilter
 )
 
+from wallet.models import Account
+
 
 class TransactionFilters(FilterSet):
     action = CharFilter(field_name='action')
-    account_to_uuid = UUIDFilter(field_name='account_to_uuid')
-    account_from_uuid = UUIDFilter(field_name='account_from_uuid')
+    account_to_uuid = UUIDFilter(field_name='account_to',
+                                 method='filter_account')
+    account_from_uuid = UUIDFilter(field_name='account_from',
+                                   method='filter_account')
+    created_after = IsoDateTimeFilter(field_name='created_at',
+                                      lookup_expr='gte')
+    created_before = IsoDateTimeFilter(field_name='created_at',
+                                       lookup_expr='lt')
+
+    def filter_account(self, queryset: QuerySet, name: str,
+                       value) -> QuerySet:
+        """
+        Account id is found by subquery instead of join, so history
+        is read by (account, created_at) index in pagination order
+        """
+        return queryset.filter(**{name: get_account_id(value)})
+
+
+def get_account_id(uuid) -> QuerySet:
+    return Account.objects.filter(uuid=uuid).values('id')[:1]
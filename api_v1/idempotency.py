@@ -0,0 +1,155 @@
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+from threading import Lock
+from collections import OrderedDict, namedtuple
+from typing import Dict, Optional
+
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from wallet.models import IdempotencyKey
+from app.settings import IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_KEY_TTL
+
+
+StoredResponse = namedtuple('StoredResponse',
+                            ('request_hash', 'data', 'status'))
+
+
+class LRUCache:
+    """ Thread safe least recently used cache, entries expire after ttl """
+
+    def __init__(self, size: int, ttl: int):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: StoredResponse,
+            ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + (self.ttl if ttl is None else ttl), value
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+responses = LRUCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_KEY_TTL)
+
+
+def get_request_hash(data: Dict) -> str:
+    """ Fingerprint of request body, replay must have the same one """
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_expired_at() -> datetime:
+    """ Keys created before the time are expired """
+    return timezone.now() - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+
+
+def get_stored_response(key: str) -> Optional[StoredResponse]:
+    """
+    Looks for response of request done with the key
+
+    In-process cache is checked first, database only on cache miss,
+    found response is put into the cache. Expired key which isn't
+    purged yet is not found, the same way as a purged one
+
+    Arguments:
+        key: str - client's idempotency key
+
+    Returns:
+        Optional[StoredResponse]: stored response or None
+    """
+    stored = responses.get(key)
+
+    if stored is not None:
+        return stored
+
+    expired_at = get_expired_at()
+    row = IdempotencyKey.objects \
+        .filter(key=key, created_at__gte=expired_at) \
+        .values_list('request_hash', 'response', 'status', 'created_at') \
+        .first()
+
+    if row is None:
+        return None
+
+    request_hash, response, status, created_at = row
+    stored = StoredResponse(request_hash, json.loads(response), status)
+    # cached no longer than the key lives
+    responses.set(key, stored, (created_at - expired_at).total_seconds())
+
+    return stored
+
+
+def store_response(key: str, request_hash: str,
+                   data: Dict, status: int) -> StoredResponse:
+    """
+    Saves response of the key, must be called inside transfer transaction
+
+    Unique index on the key makes concurrent request with the same key
+    fail with IntegrityError, so transfer is never applied twice.
+    Expired row of the key is replaced
+    """
+    IdempotencyKey.objects \
+        .filter(key=key, created_at__lt=get_expired_at()) \
+        .delete()
+    IdempotencyKey.objects.create(
+        key=key,
+        request_hash=request_hash,
+        response=json.dumps(data, cls=JSONEncoder),
+        status=status
+    )
+
+    return StoredResponse(request_hash, data, status)
+
+
+def purge_expired_keys(chunk_size: int) -> int:
+    """
+    Deletes keys older than `IDEMPOTENCY_KEY_TTL` seconds
+
+    Keys are deleted by chunks to keep every transaction short
+
+    Arguments:
+        chunk_size: int - keys deleted by one query
+
+    Returns:
+        int: number of deleted keys
+    """
+    expired_at = get_expired_at()
+    total = 0
+
+    while True:
+        ids = IdempotencyKey.objects \
+            .filter(created_at__lt=expired_at) \
+            .values_list('id', flat=True)[:chunk_size]
+        deleted, _ = IdempotencyKey.objects.filter(id__in=list(ids)).delete()
+        total += deleted
+
+        if deleted < chunk_size:
+            return total
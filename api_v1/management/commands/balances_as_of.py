@@ -0,0 +1,56 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from wallet.models import Account
+from api_v1.services import get_balances_as_of
+
+
+class Command(BaseCommand):
+    help = 'Writes balances of all accounts at given time into CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('as_of', help='ISO 8601 time of balances')
+        parser.add_argument('path', help='CSV file path')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='accounts queried at once')
+
+    def handle(self, *args, **options):
+        as_of = parse_datetime(options['as_of'])
+
+        if as_of is None:
+            raise CommandError('Invalid time: %s' % options['as_of'])
+        if timezone.is_naive(as_of):
+            as_of = timezone.make_aware(as_of)
+
+        total, last_id = 0, 0
+
+        with open(options['path'], 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('uuid', 'currency', 'amount', 'updated_at'))
+
+            while True:
+                chunk = list(
+                    Account.objects
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', 'uuid')[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+
+                last_id = chunk[-1][0]
+                balances = get_balances_as_of([uuid for _, uuid in chunk],
+                                              as_of)
+                writer.writerows(
+                    (balance['uuid'], balance['currency'], balance['amount'],
+                     balance['updated_at'] and balance['updated_at'].isoformat())
+                    for balance in balances
+                )
+                total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s accounts written' % total
+        ))
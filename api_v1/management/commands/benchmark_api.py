@@ -0,0 +1,134 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from wallet.models import TransferEngine
+from api_v1.benchmark import (
+    run_benchmark,
+    ENDPOINTS,
+    PATTERNS,
+    PERCENTILES,
+    UNIFORM
+)
+
+
+class Command(BaseCommand):
+    help = 'Loads API with transfers and reads of seeded customers, ' \
+           'reports throughput, latency, conflicts and checks that money ' \
+           'minus fees is conserved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=100,
+                            help='customers seeded by every run')
+        parser.add_argument('--requests', type=int, default=1000,
+                            help='requests sent by every run')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='workers sending requests at once')
+        parser.add_argument('--pattern', choices=PATTERNS, default=UNIFORM,
+                            help='how transfer accounts are picked')
+        parser.add_argument('--zipf-s', type=float, default=1.1,
+                            help='skew of zipf pattern')
+        parser.add_argument('--mix', default='transfer=8,transactions=1,'
+                                             'customers=1',
+                            help='weights of endpoints requests')
+        parser.add_argument('--amount', default='1.00',
+                            help='amount of every transfer')
+        parser.add_argument('--engines', nargs='+',
+                            choices=TransferEngine.values,
+                            default=[settings.TRANSFER_ENGINE],
+                            help='transfer engines compared, '
+                                 'every one gets its own customers')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='random seed to repeat the same requests')
+        parser.add_argument('--test-database', action='store_true',
+                            help='runs against a new test database '
+                                 'which is destroyed afterwards')
+
+    def handle(self, *args, **options):
+        mix = self._get_mix(options['mix'])
+
+        try:
+            amount = Decimal(options['amount'])
+        except InvalidOperation:
+            raise CommandError("Amount '%s' is not a number"
+                               % options['amount'])
+
+        if options['pattern'] != UNIFORM and options['customers'] < 2:
+            raise CommandError('At least 2 customers are needed')
+
+        old_name = connection.settings_dict['NAME']
+        if options['test_database']:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True,
+                                               serialize=False)
+
+        try:
+            lost = []
+            for engine in options['engines']:
+                with override_settings(TRANSFER_ENGINE=engine):
+                    report = run_benchmark(
+                        options['customers'], options['requests'],
+                        options['concurrency'], options['pattern'], mix,
+                        amount, options['seed'], options['zipf_s']
+                    )
+                self._write_report(engine, options, report)
+
+                if not report['conserved']:
+                    lost.append(engine)
+        finally:
+            if options['test_database']:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if lost:
+            raise CommandError('Money is not conserved by %s'
+                               % ', '.join(lost))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s runs' % len(options['engines'])
+        ))
+
+    def _get_mix(self, value):
+        mix = {}
+
+        for item in value.split(','):
+            endpoint, _, weight = item.partition('=')
+            if endpoint not in ENDPOINTS or not weight.isdigit():
+                raise CommandError("Mix item '%s' must be <endpoint>=<weight>"
+                                   ", endpoints are %s"
+                                   % (item, ', '.join(ENDPOINTS)))
+            mix[endpoint] = int(weight)
+
+        if not any(mix.values()):
+            raise CommandError('Mix has no requests')
+
+        return mix
+
+    def _write_report(self, engine, options, report):
+        self.stdout.write(
+            'Engine %s, pattern %s, %s workers: %s requests in %.2f s, '
+            '%.0f per second' % (
+                engine, options['pattern'], options['concurrency'],
+                options['requests'], report['elapsed'], report['throughput']
+            )
+        )
+
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(
+                '  %s: %s requests, %s ok, %s rejected, %s failed, %s' % (
+                    endpoint, stats['requests'], stats['ok'],
+                    stats['rejected'], stats['failed'],
+                    ', '.join('p%s %.1f ms' % (percent,
+                                               stats['p%s' % percent] * 1000)
+                              for percent in PERCENTILES)
+                )
+            )
+
+        self.stdout.write('  conflicts: %s' % (', '.join(
+            '%s %s' % item for item in sorted(report['conflicts'].items())
+        ) or 'none'))
+        self.stdout.write('  money: initial %s, fees %s, final %s, %s' % (
+            report['initial'], report['fees'], report['final'],
+            'conserved' if report['conserved'] else 'NOT conserved'
+        ))
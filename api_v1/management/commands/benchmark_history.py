@@ -0,0 +1,71 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from wallet.models import Transaction
+
+
+SIZES = """
+SELECT COALESCE(SUM(pg_table_size(relid)), 0),
+       COALESCE(SUM(pg_indexes_size(relid)), 0)
+FROM pg_partition_tree(%s::regclass)
+"""
+
+ROW_WIDTH = """
+SELECT AVG(pg_column_size(sample.*))
+FROM (SELECT * FROM {table} LIMIT %s) AS sample
+"""
+
+FULL_SCAN = 'SELECT COUNT(*), SUM(amount) FROM {table}'
+
+
+class Command(BaseCommand):
+    help = 'Measures history table bytes per row and full scan speed, ' \
+           'uses only raw SQL, so it can be run before and after migration'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='full scans done, the best one is reported')
+        parser.add_argument('--sample', type=int, default=10000,
+                            help='rows used to measure row width')
+        parser.add_argument('--vacuum', action='store_true',
+                            help='rewrites table with VACUUM FULL first, '
+                                 'rows written before dropping columns '
+                                 'keep their size until rewritten')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Benchmark uses PostgreSQL statistics')
+
+        table = Transaction._meta.db_table
+
+        with connection.cursor() as cursor:
+            if options['vacuum']:
+                cursor.execute('VACUUM FULL ANALYZE %s' % table)
+
+            cursor.execute(SIZES, [table])
+            heap, indexes = cursor.fetchone()
+            cursor.execute(ROW_WIDTH.format(table=table), [options['sample']])
+            width = cursor.fetchone()[0] or 0
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = perf_counter()
+                cursor.execute(FULL_SCAN.format(table=table))
+                rows, _ = cursor.fetchone()
+                timings.append(perf_counter() - started)
+
+        best = min(timings)
+        per_row = max(rows, 1)
+
+        self.stdout.write('Rows: %s' % rows)
+        self.stdout.write('Row width: %.1f bytes' % width)
+        self.stdout.write('Heap: %.1f bytes per row, %.1f MB'
+                          % (heap / per_row, heap / 2 ** 20))
+        self.stdout.write('Indexes: %.1f bytes per row, %.1f MB'
+                          % (indexes / per_row, indexes / 2 ** 20))
+        self.stdout.write('Full scan: %.1f ms, %.0f rows per second'
+                          % (best * 1000, rows / best if best else 0))
+
+        self.stdout.write(self.style.SUCCESS('Done: %s scans' % len(timings)))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from wallet.models import LedgerEntry
+from api_v1.services import checkpoint_balance
+
+
+class Command(BaseCommand):
+    help = 'Folds ledger entries into balance checkpoints ' \
+           'of accounts which have enough new entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-entries', type=int, default=100,
+                            help='new entries account needs to checkpoint')
+
+    def handle(self, *args, **options):
+        accounts = LedgerEntry.objects \
+            .filter(checkpoint__isnull=True) \
+            .values('account') \
+            .annotate(entries=Count('id')) \
+            .filter(entries__gte=options['min_entries']) \
+            .values_list('account', flat=True)
+
+        total = 0
+        for account_id in list(accounts):
+            checkpoint_balance(account_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s accounts checkpointed' % total
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.metrics import clear, get_metrics_dir
+
+
+class Command(BaseCommand):
+    help = 'Removes metrics written by workers, run it before server ' \
+           'start, so counters of previous run are not summed'
+
+    def handle(self, *args, **options):
+        removed = clear()
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s files removed from %s' % (removed, get_metrics_dir())
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError
+
+from api_v1.money import convert_money_columns
+
+
+class Command(BaseCommand):
+    help = 'Converts amounts columns to storage set by MONEY_STORAGE'
+
+    def handle(self, *args, **options):
+        try:
+            converted = convert_money_columns()
+        except DataError as e:
+            raise CommandError('Amounts do not fit into numeric columns: %s'
+                               % e)
+
+        for column in converted:
+            self.stdout.write('Converted: %s' % column)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s columns converted' % len(converted)
+        ))
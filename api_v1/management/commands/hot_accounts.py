@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.contention import (
+    get_hot_accounts,
+    ACCOUNTS,
+    PAIRS,
+    VALUES
+)
+
+
+class Command(BaseCommand):
+    help = 'Shows the hottest accounts and account pairs by lock wait ' \
+           'and transfers rate recorded by all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10,
+                            help='accounts and pairs shown in every ranking')
+
+    def handle(self, *args, **options):
+        result = get_hot_accounts(options['top'])
+
+        for kind in (ACCOUNTS, PAIRS):
+            for value in VALUES:
+                self.stdout.write('%s by %s:' % (kind.capitalize(), value))
+
+                for item in result[kind]['by_%s' % value]:
+                    key = item['uuid'] if kind == ACCOUNTS else \
+                        '%s -> %s' % (item['account_from'], item['account_to'])
+                    self.stdout.write(
+                        '  %s  transfers %s (%.3f per second), '
+                        'lock wait %.6f s' % (
+                            key, item['transfers'],
+                            item['transfers_per_second'],
+                            item['lock_wait_seconds']
+                        )
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: recorded for %.0f seconds' % result['seconds']
+        ))
@@ -0,0 +1,68 @@
+import csv
+import sys
+from time import monotonic
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.settings import CUSTOMER_BULK_CHUNK_SIZE
+from api_v1.serializers import CustomerSerializer
+from api_v1.services import bulk_create_customers_with_wallets
+
+
+class Command(BaseCommand):
+    help = 'Creates customers with wallets from CSV file ' \
+           'with first_name and last_name columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file path, '-' reads stdin")
+        parser.add_argument('--chunk-size', type=int,
+                            default=CUSTOMER_BULK_CHUNK_SIZE,
+                            help='customers created by one transaction')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            self._import(sys.stdin, options['chunk_size'])
+        else:
+            with open(options['path'], newline='') as file:
+                self._import(file, options['chunk_size'])
+
+    def _import(self, file, chunk_size):
+        rows = csv.DictReader(file)
+        total, started = 0, monotonic()
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            serializer = CustomerSerializer(data=chunk, many=True)
+            if not serializer.is_valid():
+                row_errors = serializer.errors
+                # newer DRF reports only invalid rows keyed by index
+                if not isinstance(row_errors, dict):
+                    row_errors = dict(enumerate(row_errors))
+                # header is the first line of file
+                errors = [
+                    'line %s: %s' % (total + index + 2, '; '.join(
+                        '%s: %s' % (field, ' '.join(messages))
+                        for field, messages in fields.items()
+                    ))
+                    for index, fields in sorted(row_errors.items())
+                    if fields
+                ]
+                raise CommandError(
+                    'Invalid customers, %s created before them:\n%s'
+                    % (total, '\n'.join(errors))
+                )
+
+            with transaction.atomic():
+                bulk_create_customers_with_wallets(serializer.validated_data)
+
+            total += len(chunk)
+            elapsed = monotonic() - started
+            self.stdout.write('%s customers created, %.0f per second'
+                              % (total, total / elapsed if elapsed else 0))
+
+        self.stdout.write(self.style.SUCCESS('Done: %s customers' % total))
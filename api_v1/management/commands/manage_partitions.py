@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api_v1.partitions import create_partitions, detach_partitions
+
+
+class Command(BaseCommand):
+    help = 'Creates monthly partitions of history ahead and detaches ' \
+           'partitions older than retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=3,
+                            help='months ahead which get partitions')
+        parser.add_argument('--retain', type=int, default=None,
+                            help='full months of history kept, '
+                                 'older partitions are detached')
+        parser.add_argument('--drop', action='store_true',
+                            help='drops detached partitions instead of '
+                                 'keeping them for archiving')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('History is partitioned only in PostgreSQL')
+
+        created = create_partitions(options['ahead'])
+        detached = []
+
+        if options['retain'] is not None:
+            detached = detach_partitions(options['retain'], options['drop'])
+
+        for name in created:
+            self.stdout.write('Created: %s' % name)
+        for name in detached:
+            self.stdout.write('%s: %s' % (
+                'Dropped' if options['drop'] else 'Detached', name
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s partitions created, %s detached'
+            % (len(created), len(detached))
+        ))
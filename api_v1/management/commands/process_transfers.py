@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api_v1.services import process_transfer_requests
+from app.settings import TRANSFER_QUEUE_BATCH_SIZE, TRANSFER_QUEUE_POLL_INTERVAL
+
+
+class Command(BaseCommand):
+    help = 'Applies queued transfers in batches, one database ' \
+           'transaction per batch, several workers may run at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=TRANSFER_QUEUE_BATCH_SIZE,
+                            help='transfers applied within one transaction')
+        parser.add_argument('--poll-interval', type=float,
+                            default=TRANSFER_QUEUE_POLL_INTERVAL,
+                            help='seconds to sleep when queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='exit when queue is empty')
+
+    def handle(self, *args, **options):
+        total = 0
+
+        while True:
+            processed = process_transfer_requests(options['batch_size'])
+            total += processed
+
+            if processed:
+                continue
+            if options['once']:
+                break
+
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s transfers processed' % total
+        ))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api_v1.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Deletes transfer idempotency keys older than IDEMPOTENCY_KEY_TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='keys deleted by one query')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='seconds between purges, '
+                                 '0 purges once and exits')
+
+    def handle(self, *args, **options):
+        total = 0
+
+        while True:
+            total += purge_expired_keys(options['chunk_size'])
+
+            if not options['interval']:
+                break
+
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s keys purged' % total
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from wallet.models import Account
+from api_v1.shards import rebalance_shards
+
+
+class Command(BaseCommand):
+    help = 'Evens out shards of hot accounts'
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.filter(shards_count__gt=0) \
+            .values_list('id', flat=True)
+
+        total = 0
+        for account_id in list(accounts):
+            rebalance_shards(account_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: %s accounts rebalanced' % total
+        ))
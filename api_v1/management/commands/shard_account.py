@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.shards import set_account_shards
+
+
+class Command(BaseCommand):
+    help = 'Splits hot account balance by shards, ' \
+           'zero shards merges them back into account'
+
+    def add_arguments(self, parser):
+        parser.add_argument('uuid', help='account uuid')
+        parser.add_argument('shards', type=int, help='shards count')
+
+    def handle(self, *args, **options):
+        account = set_account_shards(options['uuid'], options['shards'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done: account %s has %s shards'
+            % (account.uuid, account.shards_count)
+        ))
@@ -0,0 +1,278 @@
+import os
+import re
+import json
+import logging
+import tempfile
+from copy import deepcopy
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock, get_ident
+from time import monotonic, perf_counter
+from typing import Callable, Dict, Iterator, Optional
+
+from django.conf import settings
+from django.db import connection
+
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                    0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# metric suffix, help and buckets of every measured scope
+SCOPE_METRICS = (
+    ('duration_seconds', 'Latency', DURATION_BUCKETS),
+    ('queries', 'Count of database queries', QUERIES_BUCKETS),
+    ('db_seconds', 'Time spent in database queries', DURATION_BUCKETS),
+    ('lock_wait_seconds', 'Time of SELECT FOR UPDATE queries, which is '
+                          'mostly waiting for row locks', DURATION_BUCKETS),
+)
+
+REQUEST = 'wallet_http_request'
+SERVICE = 'wallet_service'
+SCOPE_LABELS = {REQUEST: 'view', SERVICE: 'service'}
+
+FOR_UPDATE = re.compile(r'\bFOR (NO KEY )?UPDATE\b')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# files of every process, e.g. `<pid>.metrics.json`
+SNAPSHOT_SUFFIX = '.metrics.json'
+
+logger = logging.getLogger(__name__)
+
+# {metric: {label value: {'buckets': [...], 'sum': float, 'count': int}}}
+registry = {}
+_registry_lock = Lock()
+_last_flush = monotonic()
+
+
+def observe(metric: str, label: str, value: float,
+            buckets: tuple) -> None:
+    """ Adds value to histogram, buckets are stored not cumulative """
+    with _registry_lock:
+        histogram = registry.setdefault(metric, {}).get(label)
+        if histogram is None:
+            histogram = registry[metric][label] = {
+                'buckets': [0] * (len(buckets) + 1), 'sum': 0, 'count': 0
+            }
+        histogram['buckets'][bisect_left(buckets, value)] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+class QueryTimer:
+    """
+    Connection execute wrapper counting queries, database and lock wait time
+
+    It costs two clock reads per query
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0
+        self.lock_wait_seconds = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if FOR_UPDATE.search(sql):
+                self.lock_wait_seconds += elapsed
+
+
+class Scope(QueryTimer):
+    """
+    Measures latency, queries, database and lock wait time of a block
+
+    Nested scopes measure their queries too
+    """
+
+    def __init__(self, prefix: str, label: str = ''):
+        super(Scope, self).__init__()
+        self.prefix = prefix
+        self.label = label
+
+    def __enter__(self) -> 'Scope':
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        duration = perf_counter() - self._started
+        self._wrapper.__exit__(*exc_info)
+
+        values = (duration, self.queries, self.db_seconds,
+                  self.lock_wait_seconds)
+        for (suffix, _, buckets), value in zip(SCOPE_METRICS, values):
+            observe('%s_%s' % (self.prefix, suffix), self.label, value,
+                    buckets)
+
+
+def measured(func: Callable) -> Callable:
+    """ Measures every call of service function by its name """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with Scope(SERVICE, func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    Measures every request by its view name
+
+    Worker writes its metrics into `METRICS_DIR` at most every
+    `METRICS_FLUSH_INTERVAL` seconds, so any worker answers `/metrics`
+    with sums of all of them
+    """
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        scope = Scope(REQUEST)
+        with scope:
+            response = self.get_response(request)
+
+            match = getattr(request, 'resolver_match', None)
+            scope.label = match.view_name if match else 'unmatched'
+
+        if monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            flush()
+
+        return response
+
+
+def get_metrics_dir() -> str:
+    return settings.METRICS_DIR or \
+        os.path.join(tempfile.gettempdir(), 'wallet_metrics')
+
+
+def write_snapshot(data: Dict, suffix: str = SNAPSHOT_SUFFIX) -> None:
+    """ Writes data of the process into its own file atomically """
+    directory = get_metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, '%s%s' % (os.getpid(), suffix))
+
+    # threads of the process may write at once
+    temporary = '%s.%s.tmp' % (path, get_ident())
+    with open(temporary, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def read_snapshots(suffix: str = SNAPSHOT_SUFFIX) -> Iterator[Dict]:
+    """ Data written by all processes, files of stopped ones included """
+    directory = get_metrics_dir()
+    if not os.path.isdir(directory):
+        return
+
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(suffix):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                yield json.load(file)
+        except (OSError, ValueError):
+            continue
+
+
+def flush() -> None:
+    """
+    Writes metrics of the process for `/metrics` of any worker
+
+    It's called after response is made, e.g. transfer is committed,
+    so failed write is only logged and retried by the next flush
+    """
+    global _last_flush
+
+    with _registry_lock:
+        data = deepcopy(registry)
+        _last_flush = monotonic()
+
+    try:
+        write_snapshot(data)
+    except (OSError, ValueError):
+        logger.exception('Metrics of process %s are not written',
+                         os.getpid())
+
+
+def clear() -> int:
+    """ Removes files of all processes, returns count of removed files """
+    with _registry_lock:
+        registry.clear()
+
+    directory = get_metrics_dir()
+    if not os.path.isdir(directory):
+        return 0
+
+    names = [name for name in os.listdir(directory)
+             if name.endswith(('.json', '.tmp'))]
+    for name in names:
+        os.remove(os.path.join(directory, name))
+
+    return len(names)
+
+
+def collect() -> Dict:
+    """ Sums metrics of all processes, files of stopped ones included """
+    flush()
+    merged = {}
+
+    for data in read_snapshots():
+        for metric, histograms in data.items():
+            for label, histogram in histograms.items():
+                total = merged.setdefault(metric, {}).get(label)
+                if total is None:
+                    merged[metric][label] = histogram
+                    continue
+                total['buckets'] = [
+                    left + right for left, right
+                    in zip(total['buckets'], histogram['buckets'])
+                ]
+                total['sum'] += histogram['sum']
+                total['count'] += histogram['count']
+
+    return merged
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"') \
+        .replace('\n', r'\n')
+
+
+def render(metrics: Optional[Dict] = None) -> str:
+    """ Histograms in Prometheus text exposition format """
+    metrics = collect() if metrics is None else metrics
+    lines = []
+
+    for prefix, label_name in SCOPE_LABELS.items():
+        for suffix, description, buckets in SCOPE_METRICS:
+            metric = '%s_%s' % (prefix, suffix)
+            lines.append('# HELP %s %s by %s'
+                         % (metric, description, label_name))
+            lines.append('# TYPE %s histogram' % metric)
+
+            for label, histogram in sorted(metrics.get(metric, {}).items()):
+                label = '%s="%s"' % (label_name, escape_label(label))
+                cumulative = 0
+
+                bounds = [repr(float(bound)) for bound in buckets] + ['+Inf']
+                for bound, count in zip(bounds, histogram['buckets']):
+                    cumulative += count
+                    lines.append('%s_bucket{%s,le="%s"} %s'
+                                 % (metric, label, bound, cumulative))
+
+                lines.append('%s_sum{%s} %r'
+                             % (metric, label, float(histogram['sum'])))
+                lines.append('%s_count{%s} %s' % (metric, label,
+                                                  histogram['count']))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from typing import Dict, List
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+
+from wallet.fields import DECIMAL_PLACES, MoneyField, is_minor_units
+
+
+def get_money_columns() -> Dict[str, List[MoneyField]]:
+    """ Money fields of wallet models by table """
+    columns = defaultdict(list)
+
+    for model in apps.get_app_config('wallet').get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, MoneyField):
+                columns[model._meta.db_table].append(field)
+
+    return columns
+
+
+def get_column_types(table: str) -> Dict[str, str]:
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_name = %s AND table_schema = current_schema()
+        """, [table])
+        return dict(cursor.fetchall())
+
+
+def convert_money_columns() -> List[str]:
+    """
+    Converts money columns to storage set by `MONEY_STORAGE`
+
+    Columns of a table are converted by one `ALTER TABLE`, so the table
+    is rewritten once, columns which are already converted are skipped.
+    Partitions of history are converted together with it
+
+    Returns:
+        List[str]: converted columns
+    """
+    minor = is_minor_units()
+    scale = 10 ** DECIMAL_PLACES
+    converted = []
+
+    with transaction.atomic():
+        # deferred foreign key checks of the transaction block ALTER TABLE
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        for table, fields in get_money_columns().items():
+            types = get_column_types(table)
+            changes = []
+
+            for field in fields:
+                if (types[field.column] == 'bigint') == minor:
+                    continue
+
+                column = connection.ops.quote_name(field.column)
+                expression = 'round(%s * %s)' % (column, scale) if minor \
+                    else '%s / %s.0' % (column, scale)
+                changes.append('ALTER COLUMN %s TYPE %s USING %s' % (
+                    column, field.db_type(connection), expression
+                ))
+                converted.append('%s.%s' % (table, field.column))
+
+            if changes:
+                with connection.cursor() as cursor:
+                    cursor.execute('ALTER TABLE %s %s' % (
+                        connection.ops.quote_name(table), ', '.join(changes)
+                    ))
+
+    return converted
+
+
+@checks.register(checks.Tags.database)
+def check_money_columns(app_configs=None,
+                        **kwargs) -> List[checks.CheckMessage]:
+    """
+    Fails when money columns aren't stored the way `MONEY_STORAGE` sets
+
+    Amounts would be read and written in wrong units otherwise, e.g.
+    cents taken for dollars. Tables which aren't migrated yet are skipped.
+    Django 3.0 runs it only for `check --tag database`, later versions
+    call every check with `databases`, which is None unless the command
+    uses the database, e.g. before test database of benchmark is created
+    """
+    databases = kwargs.get('databases', [DEFAULT_DB_ALIAS])
+
+    if connection.vendor != 'postgresql' or \
+            DEFAULT_DB_ALIAS not in (databases or []):
+        return []
+
+    minor = is_minor_units()
+    errors = []
+
+    for table, fields in get_money_columns().items():
+        types = get_column_types(table)
+
+        for field in fields:
+            column_type = types.get(field.column)
+            if column_type is None or (column_type == 'bigint') == minor:
+                continue
+
+            errors.append(checks.Error(
+                '%s.%s is %s, but MONEY_STORAGE is %s'
+                % (table, field.column, column_type, settings.MONEY_STORAGE),
+                hint='Run python manage.py convert_money',
+                id='api_v1.E001'
+            ))
+
+    return errors
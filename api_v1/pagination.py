@@ -0,0 +1,207 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+Cursor = namedtuple('Cursor', ('position', 'reverse'))
+
+INVALID_CURSOR = 'Invalid cursor'
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor pagination over a unique ordering key
+
+    Page is selected by comparing ordering fields with values of the last
+    seen row instead of OFFSET, and total count is never queried, so every
+    page costs one index range scan
+
+    Ordering is taken from queryset, so it works together with
+    `OrderingFilter`, and completed with `tiebreak_ordering` fields
+    to make the key unique
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    tiebreak_ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request,
+                          view=None) -> Optional[List[Model]]:
+        self.request = request
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor.reverse if cursor else False
+        ordering = invert_ordering(self.ordering) if reverse else self.ordering
+
+        page = self.get_page_rows(queryset, ordering, cursor)
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = page
+
+        return page
+
+    def get_page_rows(self, queryset: QuerySet, ordering: Sequence[str],
+                      cursor: Optional[Cursor]) -> List[Model]:
+        """ Page rows in ordering plus one more to know if there are more """
+        return list(
+            get_page_queryset(queryset, ordering, cursor)[:self.page_size + 1]
+        )
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_ordering(self, queryset: QuerySet) -> Tuple[str, ...]:
+        ordering = [field for field in queryset.query.order_by
+                    if isinstance(field, str)]
+        names = {field.lstrip('-') for field in ordering}
+
+        for field in self.tiebreak_ordering:
+            if field.lstrip('-') not in names:
+                ordering.append(field)
+
+        return tuple(ordering)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(Cursor(self.get_position(self.page[-1]), False))
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_link(Cursor(self.get_position(self.page[0]), True))
+
+    def get_position(self, instance: Model) -> List[Any]:
+        return [getattr(instance, field.lstrip('-'))
+                for field in self.ordering]
+
+    def get_link(self, cursor: Cursor) -> str:
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(cursor)
+        )
+
+    def encode_cursor(self, cursor: Cursor) -> str:
+        position = [to_cursor_value(value) for value in cursor.position]
+        data = json.dumps({'p': position, 'r': int(cursor.reverse)})
+        return urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request: Request) -> Optional[Cursor]:
+        encoded = request.query_params.get(self.cursor_query_param)
+
+        if not encoded:
+            return None
+
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            position = data['p']
+            if len(position) != len(self.ordering):
+                raise ValueError(encoded)
+            position = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+            return Cursor(position, bool(data['r']))
+        except Exception:
+            raise NotFound(INVALID_CURSOR)
+
+
+class UnionKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination over UNION ALL of querysets
+
+    View provides `get_union_querysets(queryset)` - querysets which have
+    no rows in common. Every one of them is paged separately, so it's an
+    index range scan limited by page size, then their ids are merged
+    with UNION ALL and rows of the page are fetched by primary key
+    """
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request,
+                          view=None) -> Optional[List[Model]]:
+        self.view = view
+        return super(UnionKeysetPagination, self).paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_page_rows(self, queryset: QuerySet, ordering: Sequence[str],
+                      cursor: Optional[Cursor]) -> List[Model]:
+        names = [field.lstrip('-') for field in ordering]
+        limit = self.page_size + 1
+
+        branches = [
+            get_page_queryset(branch, ordering, cursor)
+            .values_list('pk', *names)[:limit]
+            for branch in self.view.get_union_querysets(queryset)
+        ]
+        rows = branches[0].union(*branches[1:], all=True) \
+            .order_by(*ordering)[:limit]
+        ids = [row[0] for row in rows]
+
+        return list(queryset.filter(pk__in=ids).order_by(*ordering))
+
+
+def get_page_queryset(queryset: QuerySet, ordering: Sequence[str],
+                      cursor: Optional[Cursor]) -> QuerySet:
+    """ Rows placed after cursor in ordering """
+    if cursor:
+        queryset = queryset.filter(
+            get_keyset_filter(ordering, cursor.position)
+        )
+    return queryset.order_by(*ordering)
+
+
+def to_cursor_value(value: Any) -> Any:
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def invert_ordering(ordering: Sequence[str]) -> Tuple[str, ...]:
+    return tuple(field[1:] if field.startswith('-') else '-' + field
+                 for field in ordering)
+
+
+def get_keyset_filter(ordering: Sequence[str], position: Sequence) -> Q:
+    """
+    Builds condition selecting rows placed after position in ordering
+
+    For ordering (a, -b) and position (x, y) it's
+    a >= x AND (a > x OR (a = x AND b < y)),
+    the first redundant bound makes leading field an index range condition
+    """
+    lookups = [('%s__lt' if field.startswith('-') else '%s__gt')
+               % field.lstrip('-') for field in ordering]
+    names = [field.lstrip('-') for field in ordering]
+
+    after = Q()
+    for i in range(len(ordering)):
+        equal = {names[j]: position[j] for j in range(i)}
+        after |= Q(**equal, **{lookups[i]: position[i]})
+
+    bound = '%s__lte' if ordering[0].startswith('-') else '%s__gte'
+
+    return Q(**{bound % names[0]: position[0]}) & after
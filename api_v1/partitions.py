@@ -0,0 +1,169 @@
+import re
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from wallet.models import Account
+from api_v1.cache import HISTORY, account_scope, invalidate
+from api_v1.queries import PARTITION_BALANCES
+
+
+TABLE = 'wallet_transaction'
+DEFAULT_PARTITION = 'wallet_transaction_default'
+
+PARTITION_BOUNDS = re.compile(
+    r"FROM \((?:MINVALUE|'(?P<start>[^']+)')\) TO \('(?P<end>[^']+)'\)"
+)
+
+Partition = namedtuple('Partition', ('name', 'start', 'end'))
+
+
+def get_month_start(value: datetime, months: int = 0) -> datetime:
+    """ Start of the month `months` after the month of value, in UTC """
+    value = value.astimezone(timezone.utc)
+    month = value.year * 12 + value.month - 1 + months
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def get_partitions() -> List[Partition]:
+    """ Range partitions of history ordered by time, default one is skipped """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT partition.relname,
+                   pg_get_expr(partition.relpartbound, partition.oid)
+            FROM pg_inherits
+            JOIN pg_class partition ON partition.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+        """, [TABLE])
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bounds in rows:
+        match = PARTITION_BOUNDS.search(bounds)
+        if match is None:
+            continue
+        start = match.group('start')
+        partitions.append(Partition(
+            name,
+            parse_datetime(start) if start else None,
+            parse_datetime(match.group('end'))
+        ))
+
+    return sorted(partitions, key=lambda partition: partition.end)
+
+
+def create_partition(start: datetime, end: datetime) -> str:
+    """
+    Creates partition of history made within [start, end)
+
+    Rows of the range which got into default partition are moved into
+    the new one, otherwise it can't be attached
+
+    Arguments:
+        start: datetime - range start, inclusive
+        end: datetime - range end, exclusive
+
+    Returns:
+        str: name of the partition
+    """
+    name = '%s_%s' % (TABLE, start.strftime('%Y_%m'))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE {name} (
+                LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+            )
+        """.format(name=name, table=TABLE))
+        cursor.execute("""
+            WITH moved AS (
+                DELETE FROM {default}
+                WHERE created_at >= %(start)s AND created_at < %(end)s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """.format(name=name, default=DEFAULT_PARTITION),
+            {'start': start, 'end': end})
+        cursor.execute("""
+            ALTER TABLE {table} ATTACH PARTITION {name}
+            FOR VALUES FROM (%(start)s) TO (%(end)s)
+        """.format(name=name, table=TABLE), {'start': start, 'end': end})
+
+    return name
+
+
+def create_partitions(months: int,
+                      now: Optional[datetime] = None) -> List[str]:
+    """
+    Creates monthly partitions up to `months` months ahead
+
+    Months already covered by existing partitions are skipped
+
+    Arguments:
+        months: int - months after the current one which get partitions
+        now: Optional[datetime] - current time
+
+    Returns:
+        List[str]: names of created partitions
+    """
+    now = now or datetime.now(timezone.utc)
+    partitions = get_partitions()
+    covered_until = partitions[-1].end if partitions else None
+    created = []
+
+    for offset in range(months + 1):
+        start = get_month_start(now, offset)
+        if covered_until is not None and start < covered_until:
+            continue
+        end = get_month_start(now, offset + 1)
+        created.append(create_partition(start, end))
+
+    return created
+
+
+def detach_partitions(months: int, drop: bool = False,
+                      now: Optional[datetime] = None) -> List[str]:
+    """
+    Detaches partitions of history older than `months` full months
+
+    Detached partition stays a standalone table to be archived (e.g. with
+    `pg_dump -t`) and dropped, history API doesn't see its rows anymore.
+    Balances of its accounts after their latest operations are kept as
+    balance snapshots, so balances as of later times are still known
+
+    Arguments:
+        months: int - full months before the current one which are kept
+        drop: bool - drops detached partitions
+        now: Optional[datetime] - current time
+
+    Returns:
+        List[str]: names of detached partitions
+    """
+    before = get_month_start(now or datetime.now(timezone.utc), -months)
+    detached = []
+
+    for partition in get_partitions():
+        if partition.end > before:
+            break
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(PARTITION_BALANCES.format(
+                partition=partition.name
+            ))
+            accounts = [row[0] for row in cursor.fetchall()]
+            cursor.execute('ALTER TABLE %s DETACH PARTITION %s'
+                           % (TABLE, partition.name))
+            if drop:
+                cursor.execute('DROP TABLE %s' % partition.name)
+
+            # cached history must not serve detached rows
+            invalidate([HISTORY] + [
+                account_scope(uuid) for uuid in Account.objects
+                .filter(id__in=accounts).values_list('uuid', flat=True)
+            ])
+
+        detached.append(partition.name)
+
+    return detached
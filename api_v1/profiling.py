@@ -0,0 +1,169 @@
+import io
+import pstats
+import cProfile
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from django.db import connection, transaction, DatabaseError
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+NAMESPACE = 'api_v1'
+
+# statements explained by one request and functions shown in summary
+EXPLAIN_MAX = 20
+TOP_FUNCTIONS = 30
+
+# profiled functions whose time is serialization and rendering
+SERIALIZATION_FUNCTIONS = ('to_representation', 'render_customers',
+                           'render_transactions')
+RENDERING_FUNCTIONS = ('render',)
+
+
+class QueryLog:
+    """ Connection execute wrapper keeping every statement with its time """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': params,
+                'many': many,
+                'seconds': perf_counter() - started,
+            })
+
+
+def is_profiled(request: HttpRequest) -> bool:
+    """ Only staff users profile only `api_v1` views """
+    if request.GET.get(PROFILE_PARAM) != '1' and \
+            request.headers.get(PROFILE_HEADER) != '1':
+        return False
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_staff:
+        return False
+
+    try:
+        return resolve(request.path_info).namespace == NAMESPACE
+    except Resolver404:
+        return False
+
+
+def get_plans(queries: List[Dict]) -> None:
+    """
+    Adds `EXPLAIN (ANALYZE, BUFFERS)` plan to read statements
+
+    ANALYZE runs the statement once more, so only plain SELECT statements
+    are explained, within a transaction which is rolled back
+    """
+    if connection.vendor != 'postgresql':
+        return
+
+    explained = 0
+    for query in queries:
+        sql = query['sql'].lstrip()
+        if explained >= EXPLAIN_MAX or query['many'] or \
+                not sql.upper().startswith('SELECT') or \
+                'FOR UPDATE' in sql.upper():
+            continue
+
+        explained += 1
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql,
+                                   query['params'])
+                    query['plan'] = '\n'.join(row[0]
+                                              for row in cursor.fetchall())
+                transaction.set_rollback(True)
+        except DatabaseError as err:
+            query['plan'] = str(err)
+
+
+def get_cumulative(stats: pstats.Stats, names: tuple) -> float:
+    """
+    The longest cumulative time of functions with given names
+
+    Outer call includes nested ones (e.g. list and its items
+    serializers), so the longest one is the total
+    """
+    return max(
+        [timing[3] for (_, _, name), timing in stats.stats.items()
+         if name in names] or [0]
+    )
+
+
+def get_profile(profiler: cProfile.Profile, response: HttpResponse,
+                queries: List[Dict], duration: float) -> Dict:
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+    for query in queries:
+        del query['many']
+        query['params'] = repr(query['params'])
+        query['seconds'] = round(query['seconds'], 6)
+
+    return {
+        'status': response.status_code,
+        'duration_seconds': round(duration, 6),
+        'db_seconds': round(sum(query['seconds'] for query in queries), 6),
+        'serialization_seconds': round(
+            get_cumulative(stats, SERIALIZATION_FUNCTIONS), 6
+        ),
+        'rendering_seconds': round(
+            get_cumulative(stats, RENDERING_FUNCTIONS), 6
+        ),
+        'queries': queries,
+        'profile': summary.getvalue(),
+    }
+
+
+class ProfilingMiddleware:
+    """
+    Answers `api_v1` request of staff user with its profile
+
+    Given `?_profile=1` or `X-Profile: 1` header, the view is run under
+    cProfile with every SQL statement logged, and its response is
+    replaced by cProfile summary, statements with their timing and
+    plans and time spent in serialization. It doesn't need DEBUG and
+    costs nothing for the other requests. Times are inflated by cProfile
+    """
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not is_profiled(request):
+            return self.get_response(request)
+
+        log = QueryLog()
+        profiler = cProfile.Profile()
+        started = perf_counter()
+
+        with connection.execute_wrapper(log):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+                # export is rendered while streamed
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            finally:
+                profiler.disable()
+
+        duration = perf_counter() - started
+        queries = log.queries
+        get_plans(queries)
+
+        return JsonResponse(get_profile(profiler, response, queries,
+                                        duration))
@@ -0,0 +1,123 @@
+"""
+Raw SQL used by transfer engines and reports which can't be expressed with ORM
+"""
+
+TRANSFER_RETURNING = """
+WITH locked AS (
+    -- both rows are locked in primary key order before any of them is
+    -- updated, so opposite transfers wait for each other, not deadlock.
+    -- Balance of hot account is split across shards, its base row is
+    -- neither locked nor updated, such transfer is done by locking engine
+    SELECT id, uuid, customer_id
+    FROM wallet_account
+    WHERE uuid IN (%(account_from)s, %(account_to)s)
+      AND shards_count = 0
+    ORDER BY id
+    FOR NO KEY UPDATE
+), debit AS (
+    UPDATE wallet_account
+    SET amount = amount - %(total)s
+    WHERE uuid = %(account_from)s
+      AND customer_id = %(customer_from)s
+      AND amount - %(total)s > 0
+      AND shards_count = 0
+      -- count reads the whole CTE, so both rows are locked
+      AND (SELECT count(*) FROM locked) = 2
+      AND EXISTS (
+          SELECT 1 FROM locked
+          WHERE uuid = %(account_to)s AND customer_id = %(customer_to)s
+      )
+    RETURNING id, uuid, customer_id, currency, amount
+), credit AS (
+    UPDATE wallet_account
+    SET amount = amount + %(amount)s
+    WHERE uuid = %(account_to)s
+      AND customer_id = %(customer_to)s
+      AND shards_count = 0
+      AND EXISTS (SELECT 1 FROM debit)
+    RETURNING id, uuid, customer_id, currency, amount
+), history AS (
+    INSERT INTO wallet_transaction (
+        account_from_id, account_from_amount,
+        account_to_id, account_to_amount,
+        amount, action, created_at
+    )
+    -- LEFT JOIN makes debit without credit violate NOT NULL constraints,
+    -- so the whole statement is aborted instead of losing money
+    SELECT debit.id, debit.amount,
+           credit.id, credit.amount,
+           %(amount)s, %(action)s, %(now)s
+    FROM debit LEFT JOIN credit ON TRUE
+    RETURNING id
+)
+SELECT debit.id, debit.uuid, debit.currency, debit.amount,
+       customer_from.id, customer_from.first_name, customer_from.last_name,
+       credit.id, credit.uuid, credit.currency, credit.amount,
+       customer_to.id, customer_to.first_name, customer_to.last_name
+FROM debit
+JOIN credit ON TRUE
+JOIN wallet_customer customer_from ON customer_from.id = debit.customer_id
+JOIN wallet_customer customer_to ON customer_to.id = credit.customer_id
+"""
+
+# Accounts locked in primary key order with the lock UPDATE takes, unlike
+# FOR UPDATE it doesn't block inserts of rows referencing accounts
+LOCK_ACCOUNTS_NO_KEY = """
+SELECT id FROM wallet_account
+WHERE uuid = ANY(%s::uuid[])
+ORDER BY id
+FOR NO KEY UPDATE
+"""
+
+# Latest balance snapshot of every account at or before `as_of`, three
+# index probes per account, accounts without snapshot are skipped.
+# Balance snapshots keep balances of history detached by retention
+BALANCES_AS_OF = """
+SELECT account.uuid, account.currency, latest.amount, latest.created_at
+FROM unnest(%(uuids)s::uuid[]) AS requested (uuid)
+JOIN wallet_account account ON account.uuid = requested.uuid
+CROSS JOIN LATERAL (
+    (
+        SELECT created_at, id, account_from_amount AS amount
+        FROM wallet_transaction
+        WHERE account_from_id = account.id AND created_at <= %(as_of)s
+        ORDER BY created_at DESC, id DESC
+        LIMIT 1
+    )
+    UNION ALL
+    (
+        SELECT created_at, id, account_to_amount
+        FROM wallet_transaction
+        WHERE account_to_id = account.id AND created_at <= %(as_of)s
+        ORDER BY created_at DESC, id DESC
+        LIMIT 1
+    )
+    UNION ALL
+    (
+        SELECT created_at, 0, amount
+        FROM wallet_balancesnapshot
+        WHERE account_id = account.id AND created_at <= %(as_of)s
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+) AS latest
+"""
+
+# Balance of every account of history partition after its latest
+# operation there, one scan of the partition, returns the accounts
+PARTITION_BALANCES = """
+INSERT INTO wallet_balancesnapshot (account_id, amount, created_at)
+SELECT DISTINCT ON (account_id) account_id, amount, created_at
+FROM (
+    SELECT account_from_id AS account_id, account_from_amount AS amount,
+           created_at, id
+    FROM {partition}
+    UNION ALL
+    SELECT account_to_id, account_to_amount, created_at, id
+    FROM {partition}
+) AS balances
+ORDER BY account_id, created_at DESC, id DESC
+RETURNING account_id
+"""
@@ -0,0 +1,285 @@
+import json
+import decimal
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Sequence
+
+from django.conf import settings
+from django.db.models import ExpressionWrapper, F, QuerySet
+from rest_framework import fields
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.serializers import BaseSerializer, Serializer
+from rest_framework.settings import api_settings
+
+from wallet.fields import DECIMAL_PARAMS, MoneyField
+from wallet.models import Account
+from api_v1.serializers import (
+    AccountSerializer,
+    AmountField,
+    CustomerAccountSerializer,
+    TransactionSerializer,
+    add_virtual_accounts
+)
+from api_v1.utils import is_ledger_mode
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ACCOUNT_LOOKUPS = ('uuid', 'currency', 'balance')
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders plain data of fast path with the same output as `JSONRenderer`
+
+    Uses orjson if it's installed, otherwise C encoder of json module
+    without `JSONEncoder.default` hook, fast path data has only
+    strings, numbers, lists and dicts
+    """
+
+    def render(self, data, accepted_media_type=None,
+               renderer_context=None) -> bytes:
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+
+        if data is None or indent is not None or self.ensure_ascii or \
+                not self.compact:
+            return super(FastJSONRenderer, self).render(
+                data, accepted_media_type, renderer_context
+            )
+
+        if orjson is not None:
+            ret = orjson.dumps(data)
+        else:
+            ret = json.dumps(data, ensure_ascii=False,
+                             separators=(',', ':')).encode()
+
+        # the same escaping as JSONRenderer does for javascript
+        return ret.replace(LINE_SEPARATOR, b'\\u2028') \
+            .replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+
+
+def is_fast_rendering(request: Request) -> bool:
+    """ Fast path is used only when it's enabled and JSON is rendered """
+    return settings.FAST_RENDERING and \
+        type(request.accepted_renderer) is JSONRenderer
+
+
+def get_formatter(field: fields.Field) -> Callable:
+    """
+    Precompiles equivalent of `field.to_representation` for not None value
+
+    Common fields are formatted without per value settings lookups,
+    the other ones fall back to `to_representation`
+    """
+    field_type = type(field)
+
+    if field_type is fields.CharField:
+        return str
+    if field_type is fields.IntegerField:
+        return int
+    if field_type is fields.UUIDField and field.uuid_format == 'hex_verbose':
+        return str
+    if field_type is fields.ChoiceField:
+        choices = field.choice_strings_to_values
+        return lambda value: choices.get(value, value) \
+            if type(value) is str else field.to_representation(value)
+    if field_type in (fields.DecimalField, AmountField):
+        return get_decimal_formatter(field)
+    if field_type is fields.DateTimeField:
+        return get_datetime_formatter(field)
+
+    return field.to_representation
+
+
+def get_decimal_formatter(field: fields.DecimalField) -> Callable:
+    coerce_to_string = getattr(field, 'coerce_to_string',
+                               api_settings.COERCE_DECIMAL_TO_STRING)
+
+    if not coerce_to_string or field.localize or field.decimal_places is None \
+            or getattr(field, 'normalize_output', False):
+        return field.to_representation
+
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def format_decimal(value):
+        if type(value) is not decimal.Decimal:
+            return field.to_representation(value)
+        return '{:f}'.format(
+            value.quantize(exponent, rounding=rounding, context=context)
+        )
+
+    return format_decimal
+
+
+def get_datetime_formatter(field: fields.DateTimeField) -> Callable:
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') \
+        else field.default_timezone()
+
+    if output_format is None or output_format.lower() != fields.ISO_8601 \
+            or field_timezone is None:
+        return field.to_representation
+
+    def format_datetime(value):
+        if getattr(value, 'tzinfo', None) is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_datetime
+
+
+def get_serializer_lookups(serializer: Serializer,
+                           prefix: str = '') -> List[str]:
+    """ `values_list` lookups of serializer fields, nested ones are joined """
+    lookups = []
+
+    for field in serializer.fields.values():
+        if isinstance(field, BaseSerializer):
+            lookups += get_serializer_lookups(
+                field, prefix + get_lookup(field) + '__'
+            )
+        else:
+            lookups.append(prefix + get_lookup(field))
+
+    return lookups
+
+
+def get_lookup(field: fields.Field) -> str:
+    """ Field source as lookup, e.g. `account_from__uuid` """
+    return '__'.join(field.source_attrs)
+
+
+def compile_row_builder(serializer: Serializer,
+                        lookups: Sequence[str],
+                        prefix: str = '',
+                        exclude: Sequence[str] = ()) -> Callable:
+    """
+    Precompiles function building serializer representation of flat row
+
+    Arguments:
+        serializer: Serializer - serializer which output is built
+        lookups: Sequence[str] - lookups of row values
+        prefix: str - lookups prefix of nested serializer
+        exclude: Sequence[str] - fields which are built separately
+
+    Returns:
+        Callable[[Sequence], Dict]: function of `values_list` row
+    """
+    getters = []
+
+    for name, field in serializer.fields.items():
+        if name in exclude:
+            continue
+        if isinstance(field, BaseSerializer):
+            getters.append((name, compile_row_builder(
+                field, lookups, prefix + get_lookup(field) + '__'
+            )))
+        else:
+            getters.append((name, get_value_getter(
+                lookups.index(prefix + get_lookup(field)), get_formatter(field)
+            )))
+
+    def build(row):
+        return {name: getter(row) for name, getter in getters}
+
+    return build
+
+
+def get_value_getter(index: int, formatter: Callable) -> Callable:
+    def get(row):
+        value = row[index]
+        return None if value is None else formatter(value)
+
+    return get
+
+
+def get_transaction_rows(queryset: QuerySet) -> QuerySet:
+    """ Flat rows of history, ordering fields are fetched for pagination """
+    lookups = get_serializer_lookups(TransactionSerializer())
+    ordering = [field.lstrip('-') for field in queryset.query.order_by
+                if isinstance(field, str)]
+    for field in ['id'] + ordering:
+        if field not in lookups:
+            lookups.append(field)
+
+    return queryset.values_list(*lookups, named=True)
+
+
+def render_transactions(rows: Iterable) -> List[Dict]:
+    """ The same output as `TransactionSerializer(rows, many=True).data` """
+    rows = list(rows)
+
+    if not rows:
+        return []
+
+    build = compile_row_builder(TransactionSerializer(), rows[0]._fields)
+
+    return [build(row) for row in rows]
+
+
+def get_customer_rows(queryset: QuerySet) -> QuerySet:
+    fields = CustomerAccountSerializer().fields
+    lookups = [field.source for name, field in fields.items()
+               if name != 'accounts']
+
+    return queryset.prefetch_related(None).values_list(*lookups, named=True)
+
+
+def get_account_rows(customers: List[int]) -> QuerySet:
+    """ Accounts of customers with balance the same as `Account.balance` """
+    if is_ledger_mode():
+        accounts = Account.objects.with_ledger_balance()
+        balance = F('ledger_amount')
+    else:
+        accounts = Account.objects.with_shards_balance()
+        # money output field converts minor units the same way as columns
+        balance = ExpressionWrapper(F('amount') + F('shards_amount'),
+                                    output_field=MoneyField(**DECIMAL_PARAMS))
+
+    return accounts \
+        .filter(customer__in=customers) \
+        .order_by('id') \
+        .values_list('customer_id', 'uuid', 'currency', balance)
+
+
+def render_customers(rows: Iterable) -> List[Dict]:
+    """
+    The same output as `CustomerAccountSerializer(rows, many=True).data`
+
+    Accounts of all customers are fetched by one query, the same way
+    as `CustomerViewSet` prefetches them
+    """
+    rows = list(rows)
+
+    if not rows:
+        return []
+
+    build_customer = compile_row_builder(
+        CustomerAccountSerializer(), rows[0]._fields, exclude=('accounts',)
+    )
+    build_account = compile_row_builder(AccountSerializer(), ACCOUNT_LOOKUPS)
+    accounts = defaultdict(list)
+
+    for customer_id, *values in get_account_rows([row.id for row in rows]):
+        accounts[customer_id].append(build_account(values))
+
+    result = []
+    for row in rows:
+        data = build_customer(row)
+        data['accounts'] = add_virtual_accounts(row.id, accounts[row.id])
+        result.append(data)
+
+    return result
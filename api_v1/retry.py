@@ -0,0 +1,86 @@
+import random
+import logging
+from time import sleep
+from functools import wraps
+from threading import Lock
+from collections import Counter
+from typing import Callable, Optional
+
+from django.db import transaction, OperationalError
+
+from app.settings import (
+    TRANSFER_RETRY_ATTEMPTS,
+    TRANSFER_RETRY_BACKOFF,
+    TRANSFER_RETRY_BACKOFF_MAX
+)
+
+
+logger = logging.getLogger(__name__)
+
+DEADLOCK = 'deadlock'
+SERIALIZATION_FAILURE = 'serialization_failure'
+RETRIES_EXHAUSTED = 'retries_exhausted'
+
+CONFLICT_PGCODES = {
+    '40P01': DEADLOCK,
+    '40001': SERIALIZATION_FAILURE,
+}
+
+conflicts = Counter()
+_conflicts_lock = Lock()
+
+
+def get_conflict_reason(err: OperationalError) -> Optional[str]:
+    """ Returns conflict name if database error is worth to retry """
+    return CONFLICT_PGCODES.get(getattr(err.__cause__, 'pgcode', None))
+
+
+def count_conflict(reason: str) -> None:
+    with _conflicts_lock:
+        conflicts[reason] += 1
+
+
+def get_backoff(attempt: int) -> float:
+    """ Exponential backoff with jitter bounded by maximum delay """
+    delay = min(TRANSFER_RETRY_BACKOFF_MAX,
+                TRANSFER_RETRY_BACKOFF * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def retry_on_conflict(func: Callable) -> Callable:
+    """
+    Retries database transaction aborted by deadlock or serialization failure
+
+    Retry is only possible when decorated function owns the transaction,
+    inside of an outer atomic block the error is raised to its owner
+
+    Every conflict is counted in `conflicts` by its reason
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 1
+
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as err:
+                reason = get_conflict_reason(err)
+
+                if reason is None or \
+                        transaction.get_connection().in_atomic_block:
+                    raise
+
+                count_conflict(reason)
+
+                if attempt >= TRANSFER_RETRY_ATTEMPTS:
+                    count_conflict(RETRIES_EXHAUSTED)
+                    raise
+
+                logger.warning('%s retry %s of %s due to %s',
+                               func.__name__, attempt,
+                               TRANSFER_RETRY_ATTEMPTS, reason)
+                sleep(get_backoff(attempt))
+                attempt += 1
+
+    return wrapper
@@ -1,5 +1,50 @@
+import json
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.conf import settings
 from rest_framework import serializers
-from wallet.models import Customer, Account, Transaction, DECIMAL_PARAMS
+from wallet.models import (
+    Customer,
+    Account,
+    Currency,
+    Transaction,
+    TransferRequest,
+    WalletMode
+)
+from wallet.fields import get_amount_params
+from app.settings import (
+    TRANSFER_BATCH_MAX_SIZE,
+    CUSTOMER_BULK_MAX_SIZE,
+    BALANCE_BULK_MAX_SIZE
+)
+
+
+class AmountField(serializers.DecimalField):
+    """
+    Decimal amount, its precision follows `MONEY_STORAGE` when the field
+    is used, not when serializer class is declared
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.update(get_amount_params())
+        super(AmountField, self).__init__(**kwargs)
+
+    @property
+    def max_digits(self) -> int:
+        return get_amount_params()['max_digits']
+
+    @max_digits.setter
+    def max_digits(self, value: int) -> None:
+        pass
+
+    @property
+    def max_whole_digits(self) -> int:
+        return self.max_digits - self.decimal_places
+
+    @max_whole_digits.setter
+    def max_whole_digits(self, value: int) -> None:
+        pass
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -9,11 +54,38 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 
 class AccountSerializer(serializers.ModelSerializer):
+    amount = AmountField(source='balance', read_only=True)
+
     class Meta:
         model = Account
         fields = ('uuid', 'currency', 'amount')
 
 
+def add_virtual_accounts(customer: int, accounts: List[Dict]) -> List[Dict]:
+    """
+    Completes customer accounts with not yet created ones in lazy wallet mode
+
+    Virtual accounts are shown with zero balance and the uuid they get
+    when a transfer uses them first time
+    """
+    if settings.WALLET_MODE != WalletMode.LAZY:
+        return accounts
+
+    currencies = {account['currency'] for account in accounts}
+    accounts = list(accounts) + [
+        AccountSerializer(Account(
+            uuid=Account.get_virtual_uuid(customer, currency),
+            currency=currency.value,
+            amount=Decimal(0)
+        )).data
+        for currency in Currency if currency.value not in currencies
+    ]
+    order = [currency.value for currency in Currency]
+
+    return sorted(accounts,
+                  key=lambda account: order.index(account['currency']))
+
+
 class CustomerAccountSerializer(serializers.ModelSerializer):
     accounts = AccountSerializer(many=True, read_only=True)
 
@@ -21,10 +93,36 @@ class CustomerAccountSerializer(serializers.ModelSerializer):
         model = Customer
         fields = ('id', 'first_name', 'last_name', 'accounts')
 
+    def to_representation(self, instance: Customer) -> Dict:
+        data = super(CustomerAccountSerializer, self).to_representation(
+            instance
+        )
+        data['accounts'] = add_virtual_accounts(instance.id, data['accounts'])
+        return data
+
+
+class CustomerBulkSerializer(serializers.Serializer):
+    customers = serializers.ListField(
+        child=CustomerSerializer(),
+        allow_empty=False,
+        max_length=CUSTOMER_BULK_MAX_SIZE
+    )
+
 
 class TransactionSerializer(serializers.ModelSerializer):
-    customer_from = CustomerSerializer()
-    customer_to = CustomerSerializer()
+    customer_from = CustomerSerializer(source='account_from.customer')
+    customer_to = CustomerSerializer(source='account_to.customer')
+    amount = AmountField()
+    account_from_uuid = serializers.UUIDField(source='account_from.uuid')
+    account_from_currency = serializers.ChoiceField(
+        Currency.choices, source='account_from.currency'
+    )
+    account_from_amount = AmountField()
+    account_to_uuid = serializers.UUIDField(source='account_to.uuid')
+    account_to_currency = serializers.ChoiceField(
+        Currency.choices, source='account_to.currency'
+    )
+    account_to_amount = AmountField()
 
     class Meta:
         model = Transaction
@@ -43,9 +141,74 @@ class TransactionSerializer(serializers.ModelSerializer):
         )
 
 
+class AccountTransactionSerializer(TransactionSerializer):
+    balance = serializers.SerializerMethodField()
+
+    class Meta(TransactionSerializer.Meta):
+        fields = TransactionSerializer.Meta.fields + ('balance',)
+
+    def get_balance(self, obj: Transaction) -> str:
+        """ Balance of `account` context after transaction, from snapshot """
+        if str(obj.account_from.uuid) == self.context['account']:
+            amount = obj.account_from_amount
+        else:
+            amount = obj.account_to_amount
+        return self.fields['account_from_amount'].to_representation(amount)
+
+
 class TransferSerializer(serializers.Serializer):
     customer_from = serializers.IntegerField()
     customer_to = serializers.IntegerField(required=False)
     account_from = serializers.UUIDField()
     account_to = serializers.UUIDField()
-    amount = serializers.DecimalField(**DECIMAL_PARAMS)
+    amount = AmountField()
+
+
+class TransferRequestSerializer(serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TransferRequest
+        fields = (
+            'id',
+            'status',
+            'result',
+            'result_status',
+            'created_at',
+            'processed_at'
+        )
+
+    def get_result(self, obj: TransferRequest) -> Optional[Dict]:
+        return json.loads(obj.result) if obj.result else None
+
+
+class TransferBatchSerializer(serializers.Serializer):
+    transfers = serializers.ListField(
+        child=TransferSerializer(),
+        allow_empty=False,
+        max_length=TRANSFER_BATCH_MAX_SIZE
+    )
+    atomic = serializers.BooleanField(default=True)
+
+
+class BalanceSerializer(serializers.Serializer):
+    uuid = serializers.UUIDField()
+    currency = serializers.CharField(allow_null=True)
+    amount = AmountField(allow_null=True)
+    updated_at = serializers.DateTimeField(allow_null=True)
+
+
+class BalanceAsOfSerializer(serializers.Serializer):
+    as_of = serializers.DateTimeField(required=False)
+
+
+class HotAccountsSerializer(serializers.Serializer):
+    top = serializers.IntegerField(min_value=1, max_value=1000, default=10)
+
+
+class BalanceBulkSerializer(BalanceAsOfSerializer):
+    accounts = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=BALANCE_BULK_MAX_SIZE
+    )
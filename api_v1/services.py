@@ -1,23 +1,93 @@
+import json
 from uuid import uuid4
+from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Tuple
+from typing import Dict, Iterable, List, Tuple
 
-from django.db import transaction, Error
+from django.conf import settings
+from django.db import connection, transaction, Error, IntegrityError
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
+    HTTP_202_ACCEPTED,
+    HTTP_404_NOT_FOUND,
     HTTP_400_BAD_REQUEST,
+    HTTP_422_UNPROCESSABLE_ENTITY,
     HTTP_500_INTERNAL_SERVER_ERROR
 )
 
-from wallet.models import Account, Currency, Transaction, Action
-from api_v1.validations import transfer_data_validate
-from api_v1.serializers import CustomerAccountSerializer, TransferSerializer
+from wallet.models import (
+    Account,
+    BalanceCheckpoint,
+    Currency,
+    Customer,
+    LedgerEntry,
+    Transaction,
+    TransferEngine,
+    TransferRequest,
+    TransferStatus,
+    Action,
+    WalletMode
+)
+from wallet.fields import from_db_amount, to_db_amount
+from api_v1.cache import (
+    customer_scope,
+    invalidate,
+    invalidate_transfers,
+    HISTORY
+)
+from api_v1.idempotency import (
+    get_request_hash,
+    get_stored_response,
+    store_response,
+    responses
+)
+from api_v1.contention import profiled
+from api_v1.metrics import measured
+from api_v1.queries import (
+    BALANCES_AS_OF,
+    LOCK_ACCOUNTS_NO_KEY,
+    TRANSFER_RETURNING
+)
+from api_v1.retry import get_conflict_reason, retry_on_conflict
+from api_v1.shards import load_hot_balances, save_balances
+from api_v1.validations import (
+    transfer_data_validate,
+    accounts_exist_validate,
+    idempotency_key_validate,
+    BATCH_ROLLED_BACK,
+    IDEMPOTENCY_KEY_REUSED,
+    NO_BALANCE
+)
+from app.settings import CUSTOMER_BULK_CHUNK_SIZE
+from api_v1.serializers import (
+    BalanceSerializer,
+    BalanceAsOfSerializer,
+    BalanceBulkSerializer,
+    CustomerSerializer,
+    CustomerAccountSerializer,
+    CustomerBulkSerializer,
+    AccountSerializer,
+    TransferSerializer,
+    TransferBatchSerializer,
+    TransferRequestSerializer,
+    add_virtual_accounts
+)
 from api_v1.utils import (
     is_self_transfer,
+    is_different_customers,
     calculate_fee,
+    calculate_total,
+    quantize_amount,
     get_success_response,
-    get_history_tx
+    get_history_tx,
+    get_ledger_entries,
+    get_transfer_request_data,
+    get_virtual_account,
+    is_ledger_mode
 )
 
 
@@ -28,14 +98,89 @@ INITIAL_ACCOUNT_DATA = (
 )
 
 
+@measured
+@profiled
 def transfer(data: TransferSerializer) -> Tuple[Dict, int]:
     """
     Transfers from one customers account to another
 
+    Transfer is done by engine chosen with `TRANSFER_ENGINE` setting,
+    cached responses of both accounts are invalidated when it commits
+
+    Arguments:
+        data: TransferSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with HTTP status
+    """
+    response_data, response_status = \
+        TRANSFER_ENGINES[settings.TRANSFER_ENGINE](data)
+
+    if response_status == HTTP_200_OK:
+        invalidate_transfers([data])
+
+    return response_data, response_status
+
+
+@measured
+@retry_on_conflict
+def transfer_idempotent(key: str, data: TransferSerializer) -> Tuple[Dict, int]:
+    """
+    Transfers once per client's idempotency key
+
+    Response is saved with the key in the transfer transaction, so replay
+    is answered from the saved response without locking any account.
+    Concurrent request with the same key fails on the key unique index,
+    its transfer is rolled back and the winner's response is returned
+
+    Arguments:
+        key: str - `Idempotency-Key` header value
+        data: TransferSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with HTTP status
+    """
+    errors = idempotency_key_validate(key)
+
+    if errors.get('errors'):
+        return errors, HTTP_400_BAD_REQUEST
+
+    request_hash = get_request_hash(data)
+    stored = get_stored_response(key)
+
+    if stored is None:
+        try:
+            with transaction.atomic():
+                response_data, response_status = transfer(data)
+                stored = store_response(key, request_hash,
+                                        response_data, response_status)
+        except IntegrityError:
+            stored = get_stored_response(key)
+
+            if stored is None:
+                raise
+        else:
+            responses.set(key, stored)
+
+    if stored.request_hash != request_hash:
+        return {'errors': [IDEMPOTENCY_KEY_REUSED % key]}, \
+            HTTP_422_UNPROCESSABLE_ENTITY
+
+    return stored.data, stored.status
+
+
+@measured
+@retry_on_conflict
+def transfer_locking(data: TransferSerializer) -> Tuple[Dict, int]:
+    """
+    Transfers from one customers account to another
+
     Method is using for transfer between self customer'a accounts
     and also to transfer between one customer to another
 
-    To provide consistency method uses database transaction mechanism
+    To provide consistency method uses database transaction mechanism,
+    both accounts are locked with one query in primary key order,
+    so opposite transfers between the same accounts can't deadlock
 
     Arguments:
         data: TransferSerializer - uses to get request data
@@ -47,22 +192,27 @@ def transfer(data: TransferSerializer) -> Tuple[Dict, int]:
 
     with transaction.atomic():
 
-        account_from = Account.objects.select_for_update().select_related() \
-            .get(uuid=data['account_from'])
-        account_to = Account.objects.select_for_update().select_related() \
-            .get(uuid=data['account_to'])
+        accounts = lock_transfer_accounts([data])
+        account_from = accounts.get(data['account_from'])
+        account_to = accounts.get(data['account_to'])
 
-        errors = transfer_data_validate(account_from, account_to, data, amount)
+        errors = accounts_exist_validate(account_from, account_to, data)
+
+        if not errors.get('errors'):
+            hot = load_hot_balances(accounts.values(),
+                                    debited={data['account_from']})
+            errors = transfer_data_validate(account_from, account_to,
+                                            data, amount)
 
         if not errors.get('errors'):
 
             if not is_self_transfer(data):
                 fee = calculate_fee(amount)
 
-            account_from.amount = account_from.amount - amount - fee
-            account_from.save()
+            account_from.amount = (account_from.amount -
+                                   calculate_total(amount, fee))
             account_to.amount = account_to.amount + amount
-            account_to.save()
+            save_balances(accounts.values(), hot)
 
             tx = get_history_tx(account_from, account_to, amount, Action.TRANSFER)
             tx.save()
@@ -75,6 +225,454 @@ def transfer(data: TransferSerializer) -> Tuple[Dict, int]:
     return result, HTTP_200_OK
 
 
+@measured
+@retry_on_conflict
+def transfer_returning(data: TransferSerializer) -> Tuple[Dict, int]:
+    """
+    Transfers from one customers account to another with one query
+
+    Debit is a guarded UPDATE which checks account belonging and balance,
+    credit and history record are written by the same statement, so rows
+    are locked only while the statement runs. Both rows are locked in
+    primary key order first, so opposite transfers can't deadlock
+
+    When the statement changes nothing the transfer is done by locking
+    engine, it produces the same validation errors as before and also
+    covers transfers which became valid meanwhile and transfers of hot
+    accounts, whose balance is kept by shards
+
+    Arguments:
+        data: TransferSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with HTTP status
+    """
+    amount, fee = Decimal(data['amount']), Decimal(0)
+    customer_to = data.get('customer_to', data['customer_from'])
+
+    if data['account_from'] == data['account_to'] or (
+            not is_self_transfer(data) and
+            not is_different_customers(customer_to, data['customer_from'])):
+        return transfer_locking(data)
+
+    if not is_self_transfer(data):
+        fee = calculate_fee(amount)
+
+    params = {
+        'account_from': data['account_from'],
+        'account_to': data['account_to'],
+        'customer_from': data['customer_from'],
+        'customer_to': customer_to,
+        'amount': to_db_amount(amount),
+        'total': to_db_amount(calculate_total(amount, fee)),
+        'action': Action.TRANSFER.value,
+        'now': timezone.now(),
+    }
+
+    try:
+        if connection.in_atomic_block:
+            with transaction.atomic():
+                row = execute_transfer_returning(params)
+        else:
+            row = execute_transfer_returning(params)
+    except IntegrityError:
+        row = None
+
+    if row is None:
+        return transfer_locking(data)
+
+    account_from = Account(
+        id=row[0], uuid=row[1], currency=row[2],
+        amount=from_db_amount(row[3]),
+        customer=Customer(id=row[4], first_name=row[5], last_name=row[6])
+    )
+    account_to = Account(
+        id=row[7], uuid=row[8], currency=row[9],
+        amount=from_db_amount(row[10]),
+        customer=Customer(id=row[11], first_name=row[12], last_name=row[13])
+    )
+
+    return get_success_response(account_from, account_to), HTTP_200_OK
+
+
+def execute_transfer_returning(params: Dict) -> Tuple:
+    with connection.cursor() as cursor:
+        cursor.execute(TRANSFER_RETURNING, params)
+        return cursor.fetchone()
+
+
+@measured
+@retry_on_conflict
+def transfer_ledger(data: TransferSerializer) -> Tuple[Dict, int]:
+    """
+    Transfers from one customers account to another appending ledger entries
+
+    Account rows are never updated, balance is the latest checkpoint
+    plus ledger entries made after it. Both accounts are locked, so the
+    balances are read after committed entries of concurrent transfers
+
+    Arguments:
+        data: TransferSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with HTTP status
+    """
+    amount, fee = Decimal(data['amount']), Decimal(0)
+
+    with transaction.atomic():
+
+        accounts = lock_transfer_accounts([data], ledger=True)
+        account_from = accounts.get(data['account_from'])
+        account_to = accounts.get(data['account_to'])
+
+        errors = accounts_exist_validate(account_from, account_to, data)
+
+        if not errors.get('errors'):
+            set_ledger_balances(accounts.values())
+            errors = transfer_data_validate(account_from, account_to,
+                                            data, amount)
+
+        if errors.get('errors'):
+            return dict(errors), HTTP_400_BAD_REQUEST
+
+        if not is_self_transfer(data):
+            fee = calculate_fee(amount)
+
+        total = calculate_total(amount, fee)
+        account_from.amount = account_from.amount - total
+        account_to.amount = account_to.amount + amount
+
+        tx = get_history_tx(account_from, account_to, amount, Action.TRANSFER)
+        tx.save()
+        LedgerEntry.objects.bulk_create(get_ledger_entries(tx, total))
+
+    return get_success_response(account_from, account_to), HTTP_200_OK
+
+
+TRANSFER_ENGINES = {
+    TransferEngine.LOCKING: transfer_locking,
+    TransferEngine.RETURNING: transfer_returning,
+    TransferEngine.LEDGER: transfer_ledger,
+}
+
+
+def lock_accounts(uuids: Iterable[str], for_update: bool = True,
+                  skip_hot: bool = False,
+                  no_key: bool = False) -> Dict[str, Account]:
+    """
+    Locks accounts for update with one query
+
+    Rows are locked in primary key order, so concurrent callers
+    locking intersecting sets of accounts can't deadlock each other
+
+    Arguments:
+        uuids: Iterable[str] - accounts uuids to lock
+        for_update: bool - False only reads accounts without locking
+        skip_hot: bool - True doesn't select hot accounts,
+                         their balance is locked by shards
+        no_key: bool - True locks FOR NO KEY UPDATE, so inserts of rows
+                       referencing the accounts aren't blocked
+
+    Returns:
+        Dict[str, Account]: locked accounts by their uuid
+    """
+    uuids = set(uuids)
+    accounts = Account.objects.select_related('customer') \
+        .filter(uuid__in=uuids) \
+        .order_by('id')
+
+    if for_update and no_key:
+        # select_for_update() can't take this lock, rows are locked by
+        # separate statement, so the next one reads their latest version
+        with connection.cursor() as cursor:
+            cursor.execute(LOCK_ACCOUNTS_NO_KEY,
+                           [[str(uuid) for uuid in uuids]])
+    elif for_update:
+        accounts = accounts.select_for_update(of=('self',))
+
+    if skip_hot:
+        accounts = accounts.filter(shards_count=0)
+
+    return {str(account.uuid): account for account in accounts}
+
+
+def lock_transfer_accounts(transfers: List[Dict],
+                           ledger: bool = False) -> Dict[str, Account]:
+    """
+    Locks all accounts of transfers
+
+    In lazy wallet mode accounts which are still virtual are created
+    with zero balance on first use and locked as well, accounts of not
+    existing customers stay missing
+
+    Hot accounts are just read, their shards are locked
+    by `load_hot_balances` when they're debited
+
+    Ledger transfers lock accounts FOR NO KEY UPDATE, so inserts of
+    entries referencing them don't deadlock opposite transfers. Credited
+    accounts are locked too, otherwise concurrent credits would compute
+    history snapshot `account_to_amount` from the same balance
+
+    Arguments:
+        transfers: List[Dict] - transfers request data
+        ledger: bool - True locks accounts of ledger mode transfers
+
+    Returns:
+        Dict[str, Account]: locked accounts by their uuid
+    """
+    owners = {}
+    for item in transfers:
+        owners.setdefault(item['account_from'], item['customer_from'])
+        owners.setdefault(item['account_to'],
+                          item.get('customer_to', item['customer_from']))
+
+    def lock():
+        accounts = lock_accounts(owners, skip_hot=not ledger, no_key=ledger)
+        missing = set(owners) - set(accounts)
+
+        if missing:
+            accounts.update(lock_accounts(missing, for_update=False))
+
+        return accounts
+
+    accounts = lock()
+
+    if settings.WALLET_MODE == WalletMode.LAZY and len(accounts) < len(owners):
+        virtual = [
+            get_virtual_account(owner, uuid)
+            for uuid, owner in owners.items() if uuid not in accounts
+        ]
+        customers = set(Customer.objects.filter(
+            id__in={account.customer_id for account in virtual
+                    if account is not None}
+        ).values_list('id', flat=True))
+        virtual = [account for account in virtual
+                   if account is not None and account.customer_id in customers]
+
+        if virtual:
+            Account.objects.bulk_create(virtual, ignore_conflicts=True)
+            accounts = lock()
+
+    return accounts
+
+
+def set_ledger_balances(accounts: Iterable[Account]) -> None:
+    """
+    Replaces `amount` of accounts with their ledger balance
+
+    Must be called after accounts are locked, so no entry
+    can be appended meanwhile. Accounts are never saved in ledger mode
+    """
+    accounts = {account.id: account for account in accounts}
+    balances = Account.objects.filter(id__in=accounts) \
+        .with_ledger_balance() \
+        .values_list('id', 'ledger_amount')
+
+    for account_id, balance in balances:
+        accounts[account_id].amount = balance
+
+
+@measured
+@retry_on_conflict
+def transfer_batch(data: TransferBatchSerializer) -> Tuple[Dict, int]:
+    """
+    Applies many transfers within one database transaction
+
+    In atomic mode any invalid transfer rolls back the whole batch,
+    otherwise only valid transfers are applied
+
+    Arguments:
+        data: TransferBatchSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with per transfer results
+        and HTTP status
+    """
+    with transaction.atomic():
+        results = apply_transfers(data['transfers'], data['atomic'])
+
+    if any(result['status'] != HTTP_200_OK for result in results) \
+            and data['atomic']:
+        return {'transfers': results}, HTTP_400_BAD_REQUEST
+
+    return {'transfers': results}, HTTP_200_OK
+
+
+def apply_transfers(transfers: List[Dict], is_atomic: bool) -> List[Dict]:
+    """
+    Validates and applies transfers, must be called inside transaction
+
+    All accounts touched by transfers are locked with one query,
+    then every transfer is validated against balances left by the
+    previous ones, and all changes are written with bulk queries
+
+    In ledger mode ledger entries are appended instead of updating
+    accounts
+
+    Arguments:
+        transfers: List[Dict] - TransferSerializer data items
+        is_atomic: bool - write nothing if any transfer is invalid
+
+    Returns:
+        List[Dict]: result with HTTP status of every transfer
+    """
+    results, history, totals, changed = [], [], [], {}
+    is_ledger = is_ledger_mode()
+
+    accounts = lock_transfer_accounts(transfers, ledger=is_ledger)
+
+    if is_ledger:
+        set_ledger_balances(accounts.values())
+    else:
+        hot = load_hot_balances(
+            accounts.values(),
+            debited={item['account_from'] for item in transfers}
+        )
+
+    for item in transfers:
+        amount, fee = Decimal(item['amount']), Decimal(0)
+
+        account_from = accounts.get(item['account_from'])
+        account_to = accounts.get(item['account_to'])
+
+        errors = accounts_exist_validate(account_from, account_to, item)
+
+        if not errors.get('errors'):
+            errors = transfer_data_validate(account_from, account_to,
+                                            item, amount)
+
+        if errors.get('errors'):
+            results.append(
+                {'status': HTTP_400_BAD_REQUEST, **errors}
+            )
+            continue
+
+        if not is_self_transfer(item):
+            fee = calculate_fee(amount)
+
+        totals.append(calculate_total(amount, fee))
+        account_from.amount = account_from.amount - totals[-1]
+        account_to.amount = quantize_amount(account_to.amount + amount)
+        changed[account_from.id] = account_from
+        changed[account_to.id] = account_to
+
+        history.append(
+            get_history_tx(account_from, account_to,
+                           amount, Action.TRANSFER)
+        )
+        results.append({
+            'status': HTTP_200_OK,
+            'result': get_success_response(account_from, account_to)
+        })
+
+    if is_atomic and len(history) != len(transfers):
+        for result in results:
+            if result['status'] == HTTP_200_OK:
+                result.pop('result')
+                result.update(status=HTTP_400_BAD_REQUEST,
+                              errors=[BATCH_ROLLED_BACK])
+
+        return results
+
+    Transaction.objects.bulk_create(history)
+
+    if is_ledger:
+        LedgerEntry.objects.bulk_create([
+            entry for tx, total in zip(history, totals)
+            for entry in get_ledger_entries(tx, total)
+        ])
+    else:
+        save_balances(changed.values(), hot)
+
+    invalidate_transfers([
+        item for item, result in zip(transfers, results)
+        if result['status'] == HTTP_200_OK
+    ])
+
+    return results
+
+
+@measured
+def enqueue_transfer(data: TransferSerializer) -> Tuple[Dict, int]:
+    """
+    Stores transfer to the queue, worker applies it later
+
+    Arguments:
+        data: TransferSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: queued transfer json data and HTTP status
+    """
+    transfer_request = TransferRequest.objects.create(
+        customer_from=data['customer_from'],
+        customer_to=data.get('customer_to'),
+        account_from=data['account_from'],
+        account_to=data['account_to'],
+        amount=data['amount']
+    )
+
+    return TransferRequestSerializer(transfer_request).data, HTTP_202_ACCEPTED
+
+
+@measured
+@retry_on_conflict
+def process_transfer_requests(batch_size: int) -> int:
+    """
+    Applies queued transfers within one database transaction
+
+    Queued transfers are claimed with FOR UPDATE SKIP LOCKED so any
+    number of workers may run concurrently, one commit covers the
+    whole batch. Every transfer is applied in its own savepoint, result
+    of invalid one is stored and the others are applied anyway, database
+    error fails only its transfer. Transfer aborted by deadlock stays
+    queued for the next batch
+
+    Arguments:
+        batch_size: int - max number of transfers to apply
+
+    Returns:
+        int: number of processed transfers
+    """
+    with transaction.atomic():
+        requests = list(
+            TransferRequest.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=TransferStatus.QUEUED)
+            .order_by('id')[:batch_size]
+        )
+
+        if not requests:
+            return 0
+
+        processed, processed_at = [], timezone.now()
+        for item in requests:
+            try:
+                with transaction.atomic():
+                    result = apply_transfers(
+                        [get_transfer_request_data(item)], is_atomic=False
+                    )[0]
+            except Error as err:
+                if get_conflict_reason(err) is not None:
+                    continue
+                result = {'status': HTTP_500_INTERNAL_SERVER_ERROR,
+                          'errors': [{'database': str(err)}]}
+
+            item.result_status = result.pop('status')
+            item.status = TransferStatus.DONE \
+                if item.result_status == HTTP_200_OK else TransferStatus.FAILED
+            item.result = json.dumps(result, cls=JSONEncoder)
+            item.processed_at = processed_at
+            processed.append(item)
+
+        TransferRequest.objects.bulk_update(
+            processed,
+            ('status', 'result', 'result_status', 'processed_at')
+        )
+
+    return len(requests)
+
+
+@measured
 def create_customer_with_wallet(
         serializer: CustomerAccountSerializer) -> Tuple[Dict, int]:
     """
@@ -94,19 +692,232 @@ def create_customer_with_wallet(
     try:
         with transaction.atomic():
             customer = serializer.save()
-            for currency, amount in INITIAL_ACCOUNT_DATA:
-                account = Account(
-                    uuid=uuid4(),
-                    customer=customer,
-                    currency=currency,
-                    amount=amount
-                )
-                account.save()
-                tx = get_history_tx(account, account,
-                                    Decimal(amount), Action.INITIAL)
-                tx.save()
+            create_wallets([customer])
     except Error as err:
         errors = {'errors': [{'database': str(err)}]}
         return errors, HTTP_500_INTERNAL_SERVER_ERROR
 
     return serializer.data, HTTP_201_CREATED
+
+
+def create_wallets(customers: List[Customer]) -> Dict[int, List[Account]]:
+    """
+    Creates initial accounts and their history for saved customers
+
+    Accounts and history transactions of all customers are inserted
+    with one bulk query each (split by `CUSTOMER_BULK_CHUNK_SIZE`)
+
+    In lazy wallet mode only accounts with initial balance are created,
+    the others stay virtual until the first transfer uses them
+
+    Arguments:
+        customers: List[Customer] - customers which already have id
+
+    Returns:
+        Dict[int, List[Account]]: created accounts by customer id
+    """
+    is_lazy = settings.WALLET_MODE == WalletMode.LAZY
+
+    accounts = Account.objects.bulk_create(
+        [
+            Account(
+                uuid=Account.get_virtual_uuid(customer.id, currency)
+                if is_lazy else uuid4(),
+                customer=customer,
+                currency=currency,
+                amount=amount
+            )
+            for customer in customers
+            for currency, amount in INITIAL_ACCOUNT_DATA
+            if amount or not is_lazy
+        ],
+        batch_size=CUSTOMER_BULK_CHUNK_SIZE
+    )
+    Transaction.objects.bulk_create(
+        [
+            get_history_tx(account, account,
+                           Decimal(account.amount), Action.INITIAL)
+            for account in accounts
+        ],
+        batch_size=CUSTOMER_BULK_CHUNK_SIZE
+    )
+
+    invalidate([HISTORY] + [customer_scope(customer.id)
+                            for customer in customers])
+
+    wallets = {customer.id: [] for customer in customers}
+    for account in accounts:
+        wallets[account.customer.id].append(account)
+
+    return wallets
+
+
+def bulk_create_customers_with_wallets(
+        items: List[Dict]) -> List[Tuple[Customer, List[Account]]]:
+    """
+    Creates many customers with wallets using bulk queries
+
+    Must be called inside of database transaction
+
+    Arguments:
+        items: List[Dict] - customers first and last names
+
+    Returns:
+        List[Tuple[Customer, List[Account]]]: customers with their accounts
+    """
+    customers = Customer.objects.bulk_create(
+        [Customer(first_name=item['first_name'], last_name=item['last_name'])
+         for item in items],
+        batch_size=CUSTOMER_BULK_CHUNK_SIZE
+    )
+    wallets = create_wallets(customers)
+
+    return [(customer, wallets[customer.id]) for customer in customers]
+
+
+@measured
+def create_customers_with_wallets(
+        data: CustomerBulkSerializer) -> Tuple[Dict, int]:
+    """
+    Creates many customers with wallets at once
+
+    Every customer in response is the same as response of
+    `create_customer_with_wallet`
+
+    To provide consistency method uses database transaction mechanism
+
+    Arguments:
+        data: CustomerBulkSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with HTTP status
+    """
+    try:
+        with transaction.atomic():
+            created = bulk_create_customers_with_wallets(data['customers'])
+    except Error as err:
+        errors = {'errors': [{'database': str(err)}]}
+        return errors, HTTP_500_INTERNAL_SERVER_ERROR
+
+    customers = []
+    for customer, accounts in created:
+        item = CustomerSerializer(customer).data
+        item['accounts'] = add_virtual_accounts(
+            customer.id, AccountSerializer(accounts, many=True).data
+        )
+        customers.append(item)
+
+    return {'customers': customers}, HTTP_201_CREATED
+
+
+def get_balances_as_of(uuids: List[str], as_of: datetime) -> List[Dict]:
+    """
+    Balances of accounts at given time taken from history snapshots
+
+    Every history transaction keeps balances of both accounts after it,
+    so balance is the snapshot of the latest account transaction made
+    at or before the time, found by index instead of replaying history
+
+    Arguments:
+        uuids: List[str] - accounts uuids
+        as_of: datetime - time of balances
+
+    Returns:
+        List[Dict]: balance of every account, amount is None
+        if account had no transactions yet
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(BALANCES_AS_OF, {
+            'uuids': [str(uuid) for uuid in uuids],
+            'as_of': as_of
+        })
+        rows = {str(row[0]): row for row in cursor.fetchall()}
+
+    balances = []
+    for uuid in uuids:
+        _, currency, amount, updated_at = rows.get(str(uuid),
+                                                   (uuid, None, None, None))
+        balances.append({
+            'uuid': uuid,
+            'currency': currency,
+            'amount': from_db_amount(amount),
+            'updated_at': updated_at
+        })
+
+    return balances
+
+
+@measured
+def account_balance(uuid: str, data: BalanceAsOfSerializer) -> Tuple[Dict, int]:
+    """
+    Balance of account at `as_of` time, current time by default
+
+    Arguments:
+        uuid: str - account uuid
+        data: BalanceAsOfSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with HTTP status
+    """
+    as_of = data.get('as_of') or timezone.now()
+    balance = get_balances_as_of([uuid], as_of)[0]
+
+    if balance['amount'] is None:
+        return {'errors': [NO_BALANCE % (uuid, as_of.isoformat())]}, \
+            HTTP_404_NOT_FOUND
+
+    return {'as_of': as_of, **BalanceSerializer(balance).data}, HTTP_200_OK
+
+
+@measured
+def accounts_balances(data: BalanceBulkSerializer) -> Tuple[Dict, int]:
+    """
+    Balances of many accounts at `as_of` time, current time by default
+
+    Arguments:
+        data: BalanceBulkSerializer - uses to get request data
+
+    Returns:
+        Tuple[Dict, int]: response json data with HTTP status
+    """
+    as_of = data.get('as_of') or timezone.now()
+    balances = get_balances_as_of(data['accounts'], as_of)
+
+    return {
+        'as_of': as_of,
+        'balances': BalanceSerializer(balances, many=True).data
+    }, HTTP_200_OK
+
+
+def checkpoint_balance(account_id: int) -> BalanceCheckpoint:
+    """
+    Folds ledger entries of account into a new balance checkpoint
+
+    Account row is locked to not race with another checkpoint of the
+    same account. Entries are linked to the checkpoint by one UPDATE,
+    entries of not yet committed transfers aren't visible to it and
+    stay for the next checkpoint
+
+    Arguments:
+        account_id: int - account to checkpoint
+
+    Returns:
+        BalanceCheckpoint: created checkpoint
+    """
+    with transaction.atomic():
+        account = Account.objects.select_for_update().get(id=account_id)
+        previous = account.checkpoints.order_by('-id').first()
+
+        checkpoint = BalanceCheckpoint.objects.create(
+            account=account,
+            amount=previous.amount if previous else account.amount
+        )
+        LedgerEntry.objects \
+            .filter(account=account, checkpoint__isnull=True) \
+            .update(checkpoint=checkpoint)
+
+        total = checkpoint.entries.aggregate(total=Sum('amount'))['total']
+        checkpoint.amount += total or 0
+        checkpoint.save(update_fields=['amount'])
+
+    return checkpoint
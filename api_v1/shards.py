@@ -0,0 +1,204 @@
+import random
+from decimal import Decimal
+from collections import namedtuple
+from typing import Dict, Iterable, List, Set
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from wallet.models import Account, AccountShard
+from wallet.fields import money_value
+from api_v1.utils import quantize_amount
+
+
+HotBalance = namedtuple('HotBalance', ('base', 'total', 'shards'))
+
+
+def load_hot_balances(accounts: Iterable[Account],
+                      debited: Set[str]) -> Dict[int, HotBalance]:
+    """
+    Replaces `amount` of hot accounts with their combined balance
+
+    Shards of debited hot accounts are locked to check overdraft,
+    credited hot accounts lock just one random shard, the one credit
+    goes to. Both are locked by one query in index order, so transfers
+    can't deadlock on shards
+
+    Balance of credited hot account is read after its shard is locked,
+    so its history snapshot includes every committed credit. Credits
+    which are in flight on other shards at the same time are missing
+    from it, that's the price of not serializing credits, the next
+    operation of account records the exact balance again
+
+    Arguments:
+        accounts: Iterable[Account] - transfer accounts
+        debited: Set[str] - uuids of debited accounts
+
+    Returns:
+        Dict[int, HotBalance]: balances of hot accounts by account id,
+        `shards` are the locked ones
+    """
+    hot = [account for account in accounts if account.is_hot]
+    balances = {}
+
+    if not hot:
+        return balances
+
+    condition = Q()
+    for account in hot:
+        if str(account.uuid) in debited:
+            condition |= Q(account=account)
+        else:
+            condition |= Q(account=account,
+                           index=random.randrange(account.shards_count))
+
+    locked = list(
+        AccountShard.objects.select_for_update()
+        .filter(condition)
+        .order_by('account', 'index')
+    )
+    shards = locked + list(
+        AccountShard.objects
+        .filter(account__in=[account.id for account in hot])
+        .exclude(id__in=[shard.id for shard in locked])
+    )
+    # base balance is changed by debits, which lock all shards,
+    # so it's read again once they're committed
+    bases = dict(
+        Account.objects.filter(id__in=[account.id for account in hot])
+        .values_list('id', 'amount')
+    )
+
+    for account in hot:
+        account_shards = [shard for shard in shards
+                          if shard.account_id == account.id]
+        base = bases[account.id]
+        account.amount = base + sum(shard.amount for shard in account_shards)
+        balances[account.id] = HotBalance(
+            base, account.amount,
+            [shard for shard in locked if shard.account_id == account.id]
+        )
+
+    return balances
+
+
+def save_balances(accounts: Iterable[Account],
+                  hot: Dict[int, HotBalance]) -> None:
+    """
+    Writes changed balances of transfer accounts
+
+    Regular accounts are updated by one query, hot account credit is
+    added to one of its locked shards, debit is taken from them
+    """
+    regular = [account for account in accounts if account.id not in hot]
+
+    if regular:
+        Account.objects.bulk_update(regular, ['amount'])
+
+    for account in accounts:
+        if account.id not in hot:
+            continue
+
+        balance = hot[account.id]
+        delta = account.amount - balance.total
+
+        if delta > 0:
+            AccountShard.objects \
+                .filter(id=random.choice(balance.shards).id) \
+                .update(amount=F('amount') + money_value(delta))
+        elif delta < 0:
+            debit_shards(account, balance, -delta)
+
+
+def debit_shards(account: Account, balance: HotBalance,
+                 amount: Decimal) -> None:
+    """ Takes amount from account base balance first, then from shards """
+    if balance.base:
+        taken = min(balance.base, amount)
+        amount -= taken
+        Account.objects.filter(id=account.id) \
+            .update(amount=F('amount') - money_value(taken))
+
+    changed = []
+    for shard in sorted(balance.shards, key=lambda item: -item.amount):
+        if not amount:
+            break
+        taken = min(shard.amount, amount)
+        shard.amount -= taken
+        amount -= taken
+        changed.append(shard)
+
+    AccountShard.objects.bulk_update(changed, ['amount'])
+
+
+def spread(amount: Decimal, count: int) -> List[Decimal]:
+    """ Splits amount into count even parts, remainder goes to first one """
+    part = quantize_amount(amount / count)
+    if part * count > amount:
+        part -= Decimal('0.01')
+    return [amount - part * (count - 1)] + [part] * (count - 1)
+
+
+def set_account_shards(uuid: str, count: int) -> Account:
+    """
+    Splits account balance by count shards, zero count merges them back
+
+    Arguments:
+        uuid: str - account uuid
+        count: int - shards count
+
+    Returns:
+        Account: changed account
+    """
+    with transaction.atomic():
+        # shards are locked before account the same way debit does
+        shards = list(
+            AccountShard.objects.select_for_update(of=('self',))
+            .filter(account__uuid=uuid).order_by('index')
+        )
+        account = Account.objects.select_for_update().get(uuid=uuid)
+        total = account.amount + sum(shard.amount for shard in shards)
+
+        AccountShard.objects.filter(account=account).delete()
+
+        if count:
+            AccountShard.objects.bulk_create(
+                AccountShard(account=account, index=index, amount=amount)
+                for index, amount in enumerate(spread(total, count))
+            )
+
+        account.amount = Decimal(0) if count else total
+        account.shards_count = count
+        account.save(update_fields=['amount', 'shards_count'])
+
+    return account
+
+
+def rebalance_shards(account_id: int) -> None:
+    """
+    Evens out shards of hot account
+
+    Credits go to random shards and debits take from the largest ones,
+    so shards drift apart, even shards let more debits be covered
+    without locking all of them for long
+    """
+    with transaction.atomic():
+        shards = list(
+            AccountShard.objects.select_for_update()
+            .filter(account=account_id).order_by('index')
+        )
+        account = Account.objects.select_for_update().get(id=account_id)
+
+        if not shards:
+            return
+
+        total = account.amount + sum(shard.amount for shard in shards)
+
+        for shard, amount in zip(shards, spread(total, len(shards))):
+            shard.amount = amount
+
+        AccountShard.objects.bulk_update(shards, ['amount'])
+
+        if account.amount:
+            account.amount = Decimal(0)
+            account.save(update_fields=['amount'])
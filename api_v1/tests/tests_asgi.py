@@ -0,0 +1,98 @@
+import json
+from uuid import uuid4
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase
+
+from wallet.models import Account, Action, Customer, Currency, Transaction
+from api_v1.asgi import ReadRouter
+from api_v1.utils import get_history_tx
+
+
+class ReadRouterTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe')
+        Account.objects.create(uuid=uuid4(), customer=self.customer,
+                               currency=Currency.USD, amount=Decimal(100))
+        self.fallback = []
+        self.router = ReadRouter(self._fallback, max_workers=2)
+
+    def tearDown(self):
+        self.router.read_handler.executor.shutdown()
+
+    async def _fallback(self, scope, receive, send):
+        self.fallback.append(scope['path'])
+        await send({'type': 'http.response.start', 'status': 204,
+                    'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def _request(self, method, path):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'root_path': '',
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(self.router)(scope, receive, send)
+
+        body = b''.join(message.get('body', b'') for message in messages
+                        if message['type'] == 'http.response.body')
+        return messages[0]['status'], body
+
+    def test_read_requests(self):
+        status, body = self._request('GET', '/api/v1/customers/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['results'][0]['id'],
+                         self.customer.id)
+
+        status, body = self._request(
+            'GET', '/api/v1/customers/%s/' % self.customer.id
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['accounts'][0]['amount'], '100.00')
+
+        status, body = self._request('GET', '/api/v1/transactions/')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['results'], [])
+        self.assertEqual(self.fallback, [])
+
+    def test_export(self):
+        account = Account.objects.get()
+        Transaction.objects.bulk_create(
+            get_history_tx(account, account, Decimal(i), Action.TRANSFER)
+            for i in range(1, 51)
+        )
+
+        # more rows than stream buffer parts are waiting for the client
+        with patch('api_v1.asgi.STREAM_BUFFER', 2), \
+                patch('api_v1.export.EXPORT_CHUNK_SIZE', 5):
+            status, body = self._request('GET', '/api/v1/transactions/export/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [json.loads(line)['amount'] for line in body.splitlines()],
+            ['%s.00' % i for i in range(50, 0, -1)]
+        )
+        self.assertEqual(self.fallback, [])
+
+    def test_other_requests(self):
+        self._request('POST', '/api/v1/transfer/')
+        self._request('GET', '/api/v1/cache/stats/')
+
+        self.assertEqual(self.fallback,
+                         ['/api/v1/transfer/', '/api/v1/cache/stats/'])
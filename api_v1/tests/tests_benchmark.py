@@ -0,0 +1,39 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from api_v1.benchmark import get_percentile
+
+
+class PercentileTestCase(SimpleTestCase):
+
+    def test_get_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(get_percentile(values, 50), 50)
+        self.assertEqual(get_percentile(values, 99), 99)
+        self.assertEqual(get_percentile([7], 95), 7)
+        self.assertEqual(get_percentile([], 95), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'uses concurrent connections')
+class BenchmarkApiTestCase(TransactionTestCase):
+
+    def test_benchmark_api_command(self):
+        out = StringIO()
+        call_command('benchmark_api', customers=3, requests=30,
+                     concurrency=2, pattern='pingpong', seed=1,
+                     engines=['locking', 'returning'], stdout=out)
+
+        self.assertEqual(out.getvalue().count('conserved'), 2)
+        self.assertNotIn('NOT conserved', out.getvalue())
+        self.assertIn('Done: 2 runs', out.getvalue())
+
+    def test_wrong_mix(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', mix='transfer=1,refund=1',
+                         stdout=StringIO())
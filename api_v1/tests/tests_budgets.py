@@ -0,0 +1,243 @@
+import os
+import json
+from uuid import uuid4
+from decimal import Decimal
+from time import perf_counter
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency
+from api_v1.pagination import KeysetPagination
+from api_v1.serializers import (
+    CustomerAccountSerializer,
+    TransferBatchSerializer,
+    TransferSerializer
+)
+from api_v1.services import (
+    create_customer_with_wallet,
+    transfer,
+    transfer_batch
+)
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+# `UPDATE_BASELINES=1` records measured values instead of checking them
+UPDATE_BASELINES = os.getenv('UPDATE_BASELINES', '0') == '1'
+
+# wall time may be this times longer than baseline plus slack for timer
+# jitter of a few milliseconds paths, 0 skips time check
+TIME_FACTOR = float(os.getenv('BUDGET_TIME_FACTOR', 5))
+TIME_SLACK_MS = 20
+
+# runs of every path, the fastest one is compared
+REPEAT = 3
+
+
+class Measure:
+    """ Counts queries, rows they returned and wall time of the block """
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.ms = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        cursor = context['cursor']
+
+        self.queries += 1
+        if cursor.description is not None:
+            self.rows += max(cursor.rowcount, 0)
+
+        return result
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.ms = (perf_counter() - self._started) * 1000
+        self._wrapper.__exit__(*exc_info)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'baselines of postgresql')
+class BudgetTestCase(TestCase):
+    """
+    Query count, fetched rows and wall time of hot paths against baselines
+
+    Queries and rows must not grow at all, wall time may grow up to
+    `BUDGET_TIME_FACTOR` times. Run with `UPDATE_BASELINES=1` to record
+    new baselines after an intended change
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(BudgetTestCase, cls).setUpClass()
+        with open(BASELINES_PATH) as file:
+            cls.baselines = json.load(file)
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BASELINES:
+            with open(BASELINES_PATH, 'w') as file:
+                json.dump(cls.baselines, file, indent=2, sort_keys=True)
+                file.write('\n')
+        super(BudgetTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customers = [
+            Customer.objects.create(first_name='John', last_name=str(number))
+            for number in range(12)
+        ]
+        self.accounts = [
+            Account.objects.create(uuid=uuid4(), customer=customer,
+                                   currency=currency, amount=Decimal(100))
+            for customer in self.customers
+            for currency in (Currency.USD, Currency.EUR)
+        ]
+        self.usd, self.eur = self.accounts[:2]
+        self.other = self.accounts[2]
+
+    def measure(self, name, func):
+        """ Runs path `REPEAT` times and checks the fastest run """
+        runs = []
+        for _ in range(REPEAT):
+            with Measure() as measure:
+                func()
+            runs.append(measure)
+
+        best = min(runs, key=lambda run: run.ms)
+        measured = {'queries': best.queries, 'rows': best.rows,
+                    'ms': round(best.ms, 2)}
+
+        if UPDATE_BASELINES:
+            self.baselines[name] = measured
+            return best
+
+        baseline = self.baselines.get(name)
+        self.assertIsNotNone(baseline, 'no baseline of %s' % name)
+
+        self.assertLessEqual(best.queries, baseline['queries'],
+                             '%s queries are over budget' % name)
+        self.assertLessEqual(best.rows, baseline['rows'],
+                             '%s rows are over budget' % name)
+        if TIME_FACTOR:
+            self.assertLessEqual(best.ms,
+                                 baseline['ms'] * TIME_FACTOR + TIME_SLACK_MS,
+                                 '%s time is over budget' % name)
+
+        return best
+
+    def _transfer_data(self, account_from, account_to, customer_to=None):
+        data = {
+            'customer_from': account_from.customer.id,
+            'account_from': str(account_from.uuid),
+            'account_to': str(account_to.uuid),
+            'amount': '1.00'
+        }
+        if customer_to is not None:
+            data['customer_to'] = customer_to
+        return data
+
+    def _add_history(self, count):
+        for number in range(count):
+            account_from = self.accounts[number % len(self.accounts)]
+            account_to = self.accounts[(number + 3) % len(self.accounts)]
+            serializer = TransferSerializer(data=self._transfer_data(
+                account_from, account_to, account_to.customer.id
+            ))
+            serializer.is_valid(raise_exception=True)
+            transfer(serializer.data)
+
+    def test_transfer(self):
+        serializer = TransferSerializer(data=self._transfer_data(
+            self.usd, self.other, self.other.customer.id
+        ))
+        serializer.is_valid(raise_exception=True)
+
+        for engine in ('locking', 'returning', 'ledger'):
+            with override_settings(TRANSFER_ENGINE=engine):
+                self.measure('transfer_%s' % engine,
+                             lambda: transfer(serializer.data))
+
+    def test_transfer_view(self):
+        data = self._transfer_data(self.usd, self.eur)
+
+        def post():
+            response = self.client.post('/api/v1/transfer/', data,
+                                        format='json')
+            self.assertEqual(response.status_code, HTTP_200_OK)
+
+        self.measure('transfer_view', post)
+
+    def test_transfer_batch(self):
+        def get_batch(size):
+            serializer = TransferBatchSerializer(data={'transfers': [
+                self._transfer_data(self.usd, account,
+                                    account.customer.id)
+                for account in self.accounts[2:2 + size]
+            ]})
+            serializer.is_valid(raise_exception=True)
+            return serializer.data
+
+        small = self.measure('transfer_batch_2',
+                             lambda: transfer_batch(get_batch(2)))
+        large = self.measure('transfer_batch_10',
+                             lambda: transfer_batch(get_batch(10)))
+
+        self.assertEqual(small.queries, large.queries)
+
+    def test_create_customer_with_wallet(self):
+        def create():
+            serializer = CustomerAccountSerializer(
+                data={'first_name': 'Jane', 'last_name': 'Doe'}
+            )
+            serializer.is_valid(raise_exception=True)
+            _, status = create_customer_with_wallet(serializer)
+            self.assertEqual(status, HTTP_201_CREATED)
+
+        self.measure('create_customer_with_wallet', create)
+
+    def test_customers_page(self):
+        def get(path):
+            return lambda: self.assertEqual(
+                self.client.get(path).status_code, HTTP_200_OK
+            )
+
+        page = self.measure('customers_page', get('/api/v1/customers/'))
+        self.measure('customer', get('/api/v1/customers/%s/'
+                                     % self.customers[0].id))
+
+        with patch('rest_framework.pagination.PageNumberPagination.page_size',
+                   2):
+            small = self.measure('customers_page_2',
+                                 get('/api/v1/customers/'))
+
+        self.assertEqual(small.queries, page.queries)
+
+    def test_transactions_page(self):
+        self._add_history(60)
+
+        def get(path):
+            return lambda: self.assertEqual(
+                self.client.get(path).status_code, HTTP_200_OK
+            )
+
+        page = self.measure('transactions_page', get('/api/v1/transactions/'))
+        self.measure('account_transactions_page',
+                     get('/api/v1/accounts/%s/transactions/' % self.usd.uuid))
+
+        with patch.object(KeysetPagination, 'page_size', 50):
+            large = self.measure('transactions_page_50',
+                                 get('/api/v1/transactions/'))
+
+        self.assertEqual(large.queries, page.queries)
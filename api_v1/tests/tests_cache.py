@@ -0,0 +1,119 @@
+import os
+import json
+from uuid import uuid4
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_403_FORBIDDEN
+)
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency
+from api_v1.cache import stats
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=60)
+class ResponseCacheTestCase(TransactionTestCase):
+    # invalidation happens when transfer commits
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        cache.clear()
+        stats.clear()
+        self.client = APIClient()
+        self.john = Customer.objects.create(first_name='John', last_name='Doe')
+        self.jane = Customer.objects.create(first_name='Jane', last_name='Doe')
+        self.john_usd = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        self.jane_usd = Account.objects.create(
+            uuid=uuid4(), customer=self.jane,
+            currency=Currency.USD, amount=Decimal(0)
+        )
+
+    def _transfer(self, amount):
+        response = self.client.post('/api/v1/transfer/', {
+            'customer_from': self.john.id,
+            'customer_to': self.jane.id,
+            'account_from': str(self.john_usd.uuid),
+            'account_to': str(self.jane_usd.uuid),
+            'amount': amount
+        }, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_history_page(self):
+        url = '/api/v1/transactions/?account_to_uuid=%s' % self.jane_usd.uuid
+        self.assertEqual(self.client.get(url).data['results'], [])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'], [])
+
+        # conditional request is answered from cache too
+        with self.assertNumQueries(0):
+            response = self.client.get(url,
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+
+        self._transfer('10')
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+        url = '/api/v1/cache/stats/'
+        self.assertEqual(self.client.get(url).status_code, HTTP_403_FORBIDDEN)
+
+        # stats of another worker are summed with this one
+        with open(os.path.join(self.directory, '1.cache.json'), 'w') as file:
+            json.dump({'transaction-list': {'hits': 1}}, file)
+        self.client.force_login(User.objects.create_user(
+            'admin', password='secret', is_staff=True
+        ))
+        self.assertEqual(self.client.get(url).data, {
+            'transaction-list': {'hits': 3, 'misses': 2, 'hit_ratio': 0.6}
+        })
+
+    def test_history_page_uuid_format(self):
+        urls = ['/api/v1/transactions/?account_to_uuid=%s' % uuid
+                for uuid in (str(self.jane_usd.uuid).upper(),
+                             self.jane_usd.uuid.hex)]
+        for url in urls:
+            self.assertEqual(self.client.get(url).data['results'], [])
+
+        self._transfer('10')
+
+        for url in urls:
+            self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+    def test_customer(self):
+        url = '/api/v1/customers/%s/' % self.jane.id
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        self._transfer('10')
+        self.assertEqual(self.client.get(url).data['accounts'][0]['amount'],
+                         '10.00')
+
+        # the same customer with zero padded id
+        padded = '/api/v1/customers/00%s/' % self.jane.id
+        self.client.get(padded)
+        self._transfer('10')
+        self.assertEqual(
+            self.client.get(padded).data['accounts'][0]['amount'], '20.00'
+        )
+
+        self.client.patch(url, {'first_name': 'Janet'}, format='json')
+        self.assertEqual(self.client.get(url).data['first_name'], 'Janet')
@@ -0,0 +1,81 @@
+from uuid import uuid4
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency, Action
+from api_v1.utils import get_history_tx
+
+
+class ConditionalListTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe')
+        self.usd = Account.objects.create(
+            uuid=uuid4(), customer=self.customer,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        self.eur = Account.objects.create(
+            uuid=uuid4(), customer=self.customer,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+        self._add_tx(self.usd, self.eur)
+
+    def _add_tx(self, account_from, account_to):
+        get_history_tx(account_from, account_to,
+                       Decimal(1), Action.TRANSFER).save()
+
+    def _get(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_transactions(self):
+        url = '/api/v1/transactions/?account_from_uuid=%s' % self.usd.uuid
+        etag = self.client.get(url)['ETag']
+
+        # only version query runs
+        with self.assertNumQueries(1):
+            response = self._get(url, etag)
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # transaction out of filter doesn't change the list
+        self._add_tx(self.eur, self.usd)
+        self.assertEqual(self._get(url, etag).status_code,
+                         HTTP_304_NOT_MODIFIED)
+
+        self._add_tx(self.usd, self.eur)
+        response = self._get(url, etag)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_transactions_modified_since(self):
+        url = '/api/v1/transactions/'
+        last_modified = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+
+    def test_customers(self):
+        url = '/api/v1/customers/'
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(2):
+            response = self._get(url, etag)
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+
+        # balance change appends history transaction
+        self._add_tx(self.usd, self.eur)
+        response = self._get(url, etag)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+        etag = response['ETag']
+        self.client.patch('/api/v1/customers/%s/' % self.customer.id,
+                          {'first_name': 'Johnny'}, format='json')
+        response = self._get(url, etag)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['first_name'], 'Johnny')
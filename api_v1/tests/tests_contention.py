@@ -0,0 +1,137 @@
+from io import StringIO
+from uuid import uuid4
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from unittest import TestCase as SimpleTestCase
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.status import HTTP_200_OK, HTTP_403_FORBIDDEN
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency
+from api_v1.contention import HotKeys, TopKeys, profiled
+
+
+class HotKeysTestCase(SimpleTestCase):
+
+    def test_top_keys(self):
+        top = TopKeys(2)
+        for key, estimate in (('a', 1), ('b', 5), ('c', 3), ('a', 2),
+                              ('d', 4), ('b', 6)):
+            top.offer(key, estimate)
+
+        self.assertEqual(top.estimates, {'b': 6, 'd': 4})
+
+        top = TopKeys(0)
+        top.offer('a', 1)
+        self.assertEqual(top.estimates, {})
+
+    def test_estimates(self):
+        keys = HotKeys(3, width=64, depth=4)
+        for number in range(10):
+            for _ in range(number + 1):
+                keys.add('key-%s' % number, (1, number / 10))
+
+        transfers, lock_wait = keys.estimate('key-9')
+        self.assertGreaterEqual(transfers, 10)
+        self.assertGreaterEqual(lock_wait, 9)
+        self.assertEqual(set(keys.get_top()), {'key-7', 'key-8', 'key-9'})
+
+
+@override_settings(CONTENTION_SAMPLE_RATE=1, TRANSFER_ENGINE='locking')
+class HotAccountsTestCase(TestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        for name in ('accounts', 'pairs'):
+            patcher = patch('api_v1.contention.%s' % name, HotKeys(10))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.john = Customer.objects.create(first_name='John', last_name='Doe')
+        self.jane = Customer.objects.create(first_name='Jane', last_name='Doe')
+        self.usd = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        self.eur = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+        self.other = Account.objects.create(
+            uuid=uuid4(), customer=self.jane,
+            currency=Currency.USD, amount=Decimal(0)
+        )
+
+    def _transfer(self, account_to, customer_to=None):
+        data = {
+            'customer_from': self.john.id,
+            'account_from': str(self.usd.uuid),
+            'account_to': str(account_to.uuid),
+            'amount': '1.00'
+        }
+        if customer_to is not None:
+            data['customer_to'] = customer_to.id
+        response = self.client.post('/api/v1/transfer/', data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_hot_accounts(self):
+        for _ in range(3):
+            self._transfer(self.other, self.jane)
+        self._transfer(self.eur)
+
+        response = self.client.get('/api/v1/admin/hot-accounts/')
+        self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+
+        self.client.force_login(User.objects.create_user(
+            'admin', password='secret', is_staff=True
+        ))
+        response = self.client.get('/api/v1/admin/hot-accounts/',
+                                   {'top': 2})
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+        accounts = response.data['accounts']['by_transfers']
+        self.assertEqual([item['uuid'] for item in accounts],
+                         [str(self.usd.uuid), str(self.other.uuid)])
+        self.assertEqual([item['transfers'] for item in accounts], [4, 3])
+        self.assertGreater(
+            response.data['accounts']['by_lock_wait_seconds'][0]
+            ['lock_wait_seconds'], 0
+        )
+
+        pair = response.data['pairs']['by_transfers'][0]
+        self.assertEqual(
+            (pair['account_from'], pair['account_to'], pair['transfers']),
+            (str(self.usd.uuid), str(self.other.uuid), 3)
+        )
+
+        out = StringIO()
+        call_command('hot_accounts', top=1, stdout=out)
+        self.assertIn(
+            '%s -> %s  transfers 3' % (self.usd.uuid, self.other.uuid),
+            out.getvalue()
+        )
+        self.assertIn('Done: recorded for', out.getvalue())
+
+    def test_failed_recording(self):
+        with patch('api_v1.contention.record', side_effect=ValueError), \
+                self.assertLogs('api_v1.contention', 'ERROR'):
+            self._transfer(self.other, self.jane)
+
+        def failing(data):
+            raise RuntimeError('transfer failed')
+
+        # the transfer's own error isn't replaced by recording one
+        with patch('api_v1.contention.record', side_effect=ValueError), \
+                self.assertLogs('api_v1.contention', 'ERROR'), \
+                self.assertRaisesRegex(RuntimeError, 'transfer failed'):
+            profiled(failing)({'account_from': 'a', 'account_to': 'b'})
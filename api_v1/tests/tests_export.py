@@ -0,0 +1,64 @@
+import csv
+import json
+from io import StringIO
+from uuid import uuid4
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency, Transaction, Action
+from api_v1.serializers import TransactionSerializer
+from api_v1.utils import get_history_tx
+
+
+class ExportTestCase(TestCase):
+
+    url = '/api/v1/transactions/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        john = Customer.objects.create(first_name='John', last_name='Doe')
+        jane = Customer.objects.create(first_name='Jane', last_name='Doe')
+        cls.usd = Account.objects.create(
+            uuid=uuid4(), customer=john,
+            currency=Currency.USD, amount=Decimal('100.50')
+        )
+        cls.eur = Account.objects.create(
+            uuid=uuid4(), customer=jane,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+        Transaction.objects.bulk_create([
+            get_history_tx(cls.usd, cls.eur, Decimal(i), Action.TRANSFER)
+            for i in range(1, 6)
+        ] + [get_history_tx(cls.usd, cls.usd, Decimal(1), Action.INITIAL)])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        response = self.client.get(self.url + '?action=TRANSFER')
+        lines = self._content(response).splitlines()
+
+        expected = TransactionSerializer(
+            Transaction.objects.filter(action=Action.TRANSFER)
+            .order_by('-created_at', '-id'),
+            many=True
+        ).data
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in lines],
+                         json.loads(json.dumps(expected)))
+
+    def test_export_csv(self):
+        response = self.client.get(self.url + '?format=csv')
+        rows = list(csv.DictReader(StringIO(self._content(response))))
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(rows), Transaction.objects.count())
+        self.assertEqual(rows[0]['customer_from_first_name'], 'John')
+        self.assertEqual(rows[0]['account_from_amount'], '100.50')
@@ -0,0 +1,149 @@
+import os
+import json
+from io import StringIO
+from uuid import uuid4
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.status import HTTP_200_OK
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency
+from api_v1.metrics import (
+    collect,
+    observe,
+    registry,
+    render,
+    QUERIES_BUCKETS
+)
+
+
+class MetricsDirMixin:
+
+    def setUp(self):
+        super(MetricsDirMixin, self).setUp()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.metrics_dir = directory.name
+
+        settings = override_settings(METRICS_DIR=self.metrics_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+
+class RenderTestCase(MetricsDirMixin, SimpleTestCase):
+
+    def test_render_histogram(self):
+        for value in (1, 4, 4, 1000):
+            observe('wallet_service_queries', 'transfer', value,
+                    QUERIES_BUCKETS)
+
+        text = render()
+
+        self.assertIn('# TYPE wallet_service_queries histogram', text)
+        self.assertIn('wallet_service_queries_bucket'
+                      '{service="transfer",le="1.0"} 1', text)
+        self.assertIn('wallet_service_queries_bucket'
+                      '{service="transfer",le="5.0"} 3', text)
+        self.assertIn('wallet_service_queries_bucket'
+                      '{service="transfer",le="+Inf"} 4', text)
+        self.assertIn('wallet_service_queries_sum{service="transfer"} 1009.0',
+                      text)
+        self.assertIn('wallet_service_queries_count{service="transfer"} 4',
+                      text)
+
+    def test_collect_workers(self):
+        observe('wallet_service_queries', 'transfer', 2, QUERIES_BUCKETS)
+
+        other = {'wallet_service_queries': {'transfer': {
+            'buckets': [0, 3] + [0] * (len(QUERIES_BUCKETS) - 1),
+            'sum': 6, 'count': 3
+        }}}
+        path = os.path.join(self.metrics_dir, '1.metrics.json')
+        with open(path, 'w') as file:
+            json.dump(other, file)
+
+        histogram = collect()['wallet_service_queries']['transfer']
+
+        self.assertEqual(histogram['count'], 4)
+        self.assertEqual(histogram['sum'], 8)
+        self.assertEqual(histogram['buckets'][1], 4)
+
+        out = StringIO()
+        call_command('clear_metrics', stdout=out)
+        self.assertIn('Done: 2 files removed', out.getvalue())
+        self.assertEqual(collect(), {})
+
+
+class MiddlewareTestCase(MetricsDirMixin, TestCase):
+
+    def setUp(self):
+        super(MiddlewareTestCase, self).setUp()
+        self.client = APIClient()
+        self.john = Customer.objects.create(first_name='John', last_name='Doe')
+        self.jane = Customer.objects.create(first_name='Jane', last_name='Doe')
+        self.usd = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        self.other = Account.objects.create(
+            uuid=uuid4(), customer=self.jane,
+            currency=Currency.USD, amount=Decimal(0)
+        )
+
+    def _amount(self, account):
+        return Account.objects.get(id=account.id).amount
+
+    @override_settings(TRANSFER_ENGINE='locking')
+    def test_request_and_service_metrics(self):
+        response = self.client.post('/api/v1/transfer/', {
+            'customer_from': self.john.id,
+            'account_from': str(self.usd.uuid),
+            'customer_to': self.jane.id,
+            'account_to': str(self.other.uuid),
+            'amount': '10.00'
+        }, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.client.get('/api/v1/customers/')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+        text = response.content.decode()
+        self.assertIn('wallet_http_request_duration_seconds_count'
+                      '{view="api_v1:customer-list"} 1', text)
+        self.assertIn('wallet_service_duration_seconds_count'
+                      '{service="transfer_locking"} 1', text)
+
+        lock_wait = registry['wallet_service_lock_wait_seconds']
+        self.assertGreater(lock_wait['transfer_locking']['sum'], 0)
+        self.assertEqual(
+            registry['wallet_http_request_queries']['api_v1:customer-list']
+            ['count'], 1
+        )
+
+    @override_settings(TRANSFER_ENGINE='locking', METRICS_FLUSH_INTERVAL=0,
+                       CONTENTION_SAMPLE_RATE=0)
+    def test_failed_flush(self):
+        # directory can't be created within a file
+        path = os.path.join(self.metrics_dir, 'file')
+        open(path, 'w').close()
+
+        with override_settings(METRICS_DIR=os.path.join(path, 'metrics')), \
+                self.assertLogs('api_v1.metrics', 'ERROR'):
+            response = self.client.post('/api/v1/transfer/', {
+                'customer_from': self.john.id,
+                'account_from': str(self.usd.uuid),
+                'customer_to': self.jane.id,
+                'account_to': str(self.other.uuid),
+                'amount': '10.00'
+            }, format='json')
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(self._amount(self.other), Decimal('10.00'))
@@ -0,0 +1,157 @@
+from io import StringIO
+from uuid import uuid4
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.status import HTTP_200_OK
+from rest_framework.test import APIClient
+
+from wallet.models import Account, AccountShard, Customer, Currency
+from api_v1.money import check_money_columns, get_column_types
+from api_v1.shards import set_account_shards
+
+
+@skipUnless(connection.vendor == 'postgresql', 'converts postgresql columns')
+@override_settings(MONEY_STORAGE='minor')
+class MinorUnitsTestCase(TestCase):
+
+    def setUp(self):
+        call_command('convert_money', stdout=StringIO())
+        self.client = APIClient()
+        self.john = Customer.objects.create(first_name='John', last_name='Doe')
+        self.usd = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.USD, amount=Decimal('100.10')
+        )
+        self.eur = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+
+    def _stored(self, account):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount FROM wallet_account WHERE id = %s',
+                           [account.id])
+            return cursor.fetchone()[0]
+
+    def _transfer(self, amount):
+        return self.client.post('/api/v1/transfer/', {
+            'customer_from': self.john.id,
+            'account_from': str(self.usd.uuid),
+            'account_to': str(self.eur.uuid),
+            'amount': amount
+        }, format='json')
+
+    def test_convert_money(self):
+        self.assertEqual(get_column_types('wallet_transaction')['amount'],
+                         'bigint')
+        self.assertEqual(self._stored(self.usd), 10010)
+        self.assertEqual(Account.objects.get(id=self.usd.id).amount,
+                         Decimal('100.10'))
+
+        out = StringIO()
+        call_command('convert_money', stdout=out)
+        self.assertIn('Done: 0 columns converted', out.getvalue())
+
+        with override_settings(MONEY_STORAGE='decimal'):
+            call_command('convert_money', stdout=StringIO())
+            self.assertEqual(self._stored(self.usd), Decimal('100.10'))
+
+    def test_check_money_columns(self):
+        self.assertEqual(check_money_columns(), [])
+
+        with override_settings(MONEY_STORAGE='decimal'):
+            errors = check_money_columns()
+
+        self.assertEqual({error.id for error in errors}, {'api_v1.E001'})
+        self.assertIn('wallet_account.amount is bigint',
+                      [error.msg.split(',')[0] for error in errors])
+
+    def test_large_balance(self):
+        self.usd.amount = Decimal('1000000000.25')
+        self.usd.save()
+
+        self.assertEqual(Account.objects.get(id=self.usd.id).amount,
+                         Decimal('1000000000.25'))
+
+        # numeric(10, 2) can't hold it
+        with override_settings(MONEY_STORAGE='decimal'):
+            with self.assertRaises(CommandError):
+                call_command('convert_money', stdout=StringIO())
+
+    def test_fast_rendering(self):
+        set_account_shards(str(self.usd.uuid), 2)
+        self.eur.amount = Decimal('1000000000.25')
+        self.eur.save()
+        url = '/api/v1/customers/'
+
+        # amounts are beyond numeric(10, 2) API precision of decimal mode
+        with override_settings(FAST_RENDERING=False):
+            expected = self.client.get(url).json()
+        with override_settings(FAST_RENDERING=True):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json(), expected)
+        accounts = response.json()['results'][0]['accounts']
+        self.assertEqual([account['amount'] for account in accounts],
+                         ['100.10', '1000000000.25'])
+
+    def test_transfer_engines(self):
+        for engine in ('locking', 'returning', 'ledger'):
+            with override_settings(TRANSFER_ENGINE=engine):
+                response = self._transfer('10.05')
+            self.assertEqual(response.status_code, HTTP_200_OK)
+
+        self.assertEqual(self._stored(self.eur), 2010)
+
+        with override_settings(TRANSFER_ENGINE='ledger'):
+            accounts = self.client.get(
+                '/api/v1/customers/%s/' % self.john.id
+            ).data['accounts']
+        self.assertEqual([account['amount'] for account in accounts],
+                         ['69.95', '30.15'])
+        self.assertEqual(
+            self.client.get('/api/v1/accounts/%s/balance/'
+                            % self.eur.uuid).data['amount'],
+            '30.15'
+        )
+
+    def test_transfer_half_cent(self):
+        # 0.30 with 5% fee debits 0.315 = 32 cents in every engine
+        jane = Customer.objects.create(first_name='Jane', last_name='Doe')
+        jane_usd = Account.objects.create(
+            uuid=uuid4(), customer=jane,
+            currency=Currency.USD, amount=Decimal(0)
+        )
+
+        for engine, expected in (('locking', '99.78'), ('returning', '99.46'),
+                                 ('ledger', '99.14')):
+            with override_settings(TRANSFER_ENGINE=engine):
+                response = self.client.post('/api/v1/transfer/', {
+                    'customer_from': self.john.id,
+                    'account_from': str(self.usd.uuid),
+                    'customer_to': jane.id,
+                    'account_to': str(jane_usd.uuid),
+                    'amount': '0.30'
+                }, format='json')
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertEqual(response.data['from']['account']['amount'],
+                             expected)
+
+    def test_hot_account(self):
+        set_account_shards(str(self.usd.uuid), 3)
+        self.assertEqual(self._transfer('0.10').status_code, HTTP_200_OK)
+
+        self.assertEqual(
+            sum(AccountShard.objects.values_list('amount', flat=True)),
+            Decimal('100.00')
+        )
+        self.assertEqual(
+            Account.objects.with_shards_balance().get(id=self.usd.id).balance,
+            Decimal('100.00')
+        )
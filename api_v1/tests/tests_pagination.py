@@ -0,0 +1,135 @@
+from uuid import uuid4
+from decimal import Decimal
+
+from django.db.models import Q
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency, Transaction, Action
+from api_v1.utils import get_history_tx
+
+
+class KeysetPaginationTestCase(TestCase):
+
+    url = '/api/v1/transactions/'
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(first_name='John', last_name='Doe')
+        cls.usd = Account.objects.create(
+            uuid=uuid4(), customer=customer,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        cls.eur = Account.objects.create(
+            uuid=uuid4(), customer=customer,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+        txs = [
+            get_history_tx(cls.usd, cls.eur, Decimal(i), Action.TRANSFER)
+            for i in range(1, 24)
+        ]
+        txs += [
+            get_history_tx(cls.eur, cls.usd, Decimal(i), Action.CHARGE)
+            for i in range(1, 8)
+        ]
+        Transaction.objects.bulk_create(txs)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _walk(self, url, link='next'):
+        amounts = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            amounts += [tx['amount'] for tx in response.data['results']]
+            url = response.data[link]
+        return amounts, response
+
+    def _expected(self, queryset):
+        return [str(amount) for amount in queryset.values_list('amount',
+                                                               flat=True)]
+
+    def test_walk_forward_and_back(self):
+        amounts, last = self._walk(self.url)
+
+        self.assertEqual(amounts, self._expected(
+            Transaction.objects.order_by('-created_at', '-id')
+        ))
+        self.assertEqual(len(last.data['results']), 10)
+
+        back, first = self._walk(last.data['previous'], link='previous')
+        self.assertEqual(back, amounts[10:20] + amounts[:10])
+        self.assertIsNone(first.data['previous'])
+
+    def test_walk_with_ordering_and_filters(self):
+        amounts, _ = self._walk(self.url + '?ordering=action')
+        self.assertEqual(amounts, self._expected(
+            Transaction.objects.order_by('action', '-created_at', '-id')
+        ))
+
+        amounts, _ = self._walk(
+            self.url + '?account_from_uuid=%s&ordering=created_at'
+            % self.usd.uuid
+        )
+        self.assertEqual(amounts, self._expected(
+            Transaction.objects.filter(account_from=self.usd)
+            .order_by('created_at', 'id')
+        ))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url + '?cursor=broken')
+        self.assertEqual(response.status_code, 404)
+
+
+class AccountTransactionsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(first_name='John', last_name='Doe')
+        cls.usd, cls.eur, cls.cny = [
+            Account.objects.create(uuid=uuid4(), customer=customer,
+                                   currency=currency, amount=Decimal(100))
+            for currency in (Currency.USD, Currency.EUR, Currency.CNY)
+        ]
+        txs = [get_history_tx(cls.usd, cls.usd, Decimal(100), Action.INITIAL)]
+        for i in range(1, 16):
+            account_from, account_to = (cls.usd, cls.eur) if i % 3 \
+                else (cls.eur, cls.usd)
+            account_from.amount -= i
+            account_to.amount += i
+            txs.append(get_history_tx(account_from, account_to,
+                                      Decimal(i), Action.TRANSFER))
+            txs.append(get_history_tx(cls.eur, cls.cny,
+                                      Decimal(i), Action.TRANSFER))
+        Transaction.objects.bulk_create(txs)
+
+    def test_walk_forward_and_back(self):
+        client = APIClient()
+        url = '/api/v1/accounts/%s/transactions/' % self.usd.uuid
+        rows = []
+
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            rows += response.data['results']
+            url = response.data['next']
+
+        expected = Transaction.objects \
+            .filter(Q(account_from=self.usd) | Q(account_to=self.usd)) \
+            .order_by('-created_at', '-id')
+        self.assertEqual([row['amount'] for row in rows],
+                         [str(tx.amount) for tx in expected])
+        self.assertEqual(
+            [row['balance'] for row in rows],
+            [str(tx.account_from_amount
+                 if tx.account_from_id == self.usd.id
+                 else tx.account_to_amount) for tx in expected]
+        )
+        self.assertEqual(rows[0]['balance'], '%.2f' % self.usd.amount)
+        self.assertEqual(rows[-1]['action'], Action.INITIAL)
+
+        back = client.get(response.data['previous']).data
+        self.assertEqual(back['results'], rows[:10])
+        self.assertIsNone(back['previous'])
@@ -0,0 +1,154 @@
+from io import StringIO
+from uuid import uuid4
+from decimal import Decimal
+from datetime import datetime, timedelta, timezone
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency, Transaction, Action
+from api_v1.cache import HISTORY, account_scope
+from api_v1.partitions import (
+    create_partitions,
+    detach_partitions,
+    get_month_start,
+    get_partitions,
+    DEFAULT_PARTITION
+)
+from api_v1.utils import get_history_tx
+
+
+@skipUnless(connection.vendor == 'postgresql', 'uses postgresql partitions')
+class PartitionsTestCase(TestCase):
+
+    def setUp(self):
+        self.now = datetime.now(timezone.utc)
+        customer = Customer.objects.create(first_name='John', last_name='Doe')
+        self.usd = Account.objects.create(
+            uuid=uuid4(), customer=customer,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        self.eur = Account.objects.create(
+            uuid=uuid4(), customer=customer,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+
+    def _add_tx(self, created_at):
+        tx = get_history_tx(self.usd, self.eur, Decimal(1), Action.TRANSFER)
+        tx.save()
+        Transaction.objects.filter(id=tx.id).update(created_at=created_at)
+        return tx
+
+    def _count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM %s' % table)
+            return cursor.fetchone()[0]
+
+    def test_create_partitions(self):
+        ahead = get_month_start(self.now, 2) + timedelta(days=1)
+        tx = self._add_tx(ahead)
+        self.assertEqual(self._count(DEFAULT_PARTITION), 1)
+
+        created = create_partitions(2, self.now)
+
+        self.assertEqual(created, [
+            'wallet_transaction_%s' % get_month_start(self.now, months)
+            .strftime('%Y_%m') for months in (1, 2)
+        ])
+        self.assertEqual(create_partitions(2, self.now), [])
+        # row of default partition is moved into its month partition
+        self.assertEqual(self._count(DEFAULT_PARTITION), 0)
+        self.assertEqual(self._count(created[-1]), 1)
+        self.assertEqual(Transaction.objects.get(id=tx.id).created_at, ahead)
+
+        # date range is read from its partitions only
+        plan = Transaction.objects \
+            .filter(created_at__gte=get_month_start(self.now, 2),
+                    created_at__lt=get_month_start(self.now, 3)) \
+            .explain()
+        self.assertIn(created[-1], plan)
+        self.assertNotIn(created[0], plan)
+
+        response = APIClient().get('/api/v1/transactions/', {
+            'created_after': get_month_start(self.now, 2).isoformat()
+        })
+        self.assertEqual(
+            [item['amount'] for item in response.data['results']], ['1.00']
+        )
+
+    def test_detach_partitions(self):
+        self._add_tx(self.now - timedelta(days=400))
+        created = create_partitions(1, self.now)
+
+        # the current month and the next one are two months old by then
+        with patch('api_v1.partitions.invalidate') as invalidate:
+            detached = detach_partitions(1, now=get_month_start(self.now, 3))
+
+        self.assertEqual(detached, ['wallet_transaction_initial'] + created)
+        # cached history of detached rows is dropped
+        self.assertEqual(
+            set(invalidate.call_args_list[0][0][0]),
+            {HISTORY, account_scope(self.usd.uuid), account_scope(self.eur.uuid)}
+        )
+        self.assertEqual(get_partitions(), [])
+        self.assertEqual(self._count(detached[0]), 1)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_detach_partitions_keeps_balances(self):
+        last_at = self.now - timedelta(days=300)
+        self.eur.amount = Decimal(5)
+        self._add_tx(self.now - timedelta(days=400))
+        self.eur.amount = Decimal(7)
+        self._add_tx(last_at)
+        next_month = get_month_start(self.now, 1)
+        create_partitions(1, self.now)
+
+        self.assertEqual(detach_partitions(0, now=next_month),
+                         ['wallet_transaction_initial'])
+        self.assertFalse(Transaction.objects.exists())
+
+        url = '/api/v1/accounts/%s/balance/' % self.eur.uuid
+        response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['amount'], '7.00')
+
+        # balance before the latest detached operation isn't known
+        response = APIClient().get(url, {
+            'as_of': (last_at - timedelta(days=1)).isoformat()
+        })
+        self.assertEqual(response.status_code, 404)
+
+        # history of kept partitions is newer than the snapshot
+        self.eur.amount = Decimal(9)
+        self._add_tx(next_month + timedelta(days=1))
+        response = APIClient().get(url, {
+            'as_of': (next_month + timedelta(days=2)).isoformat()
+        })
+        self.assertEqual(response.data['amount'], '9.00')
+
+    def test_manage_partitions_command(self):
+        out = StringIO()
+        call_command('manage_partitions', ahead=1, retain=0, stdout=out)
+
+        name = 'wallet_transaction_%s' \
+            % get_month_start(self.now, 1).strftime('%Y_%m')
+        self.assertIn('Created: %s' % name, out.getvalue())
+        self.assertIn('Done: 1 partitions created, 0 detached',
+                      out.getvalue())
+        self.assertEqual(
+            [partition.name for partition in get_partitions()],
+            ['wallet_transaction_initial', name]
+        )
+
+    def test_benchmark_history_command(self):
+        self._add_tx(self.now)
+        out = StringIO()
+        call_command('benchmark_history', repeat=2, stdout=out)
+
+        self.assertIn('Rows: 1', out.getvalue())
+        self.assertIn('bytes per row', out.getvalue())
+        self.assertIn('Done: 2 scans', out.getvalue())
@@ -0,0 +1,75 @@
+from uuid import uuid4
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from rest_framework.status import HTTP_200_OK
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency, Action
+from api_v1.utils import get_history_tx
+
+
+class ProfilingTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.john = Customer.objects.create(first_name='John', last_name='Doe')
+        usd = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        eur = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+        for _ in range(3):
+            get_history_tx(usd, eur, Decimal(1), Action.TRANSFER).save()
+
+        self.staff = User.objects.create_user('admin', password='secret',
+                                              is_staff=True)
+
+    def test_not_staff(self):
+        response = self.client.get('/api/v1/transactions/', {'_profile': 1})
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_profile(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/api/v1/transactions/', {
+            '_profile': 1, 'action': Action.TRANSFER.value
+        })
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        profile = response.json()
+
+        self.assertEqual(profile['status'], HTTP_200_OK)
+        self.assertGreater(profile['serialization_seconds'], 0)
+        self.assertGreater(profile['rendering_seconds'], 0)
+        self.assertIn('cumulative', profile['profile'])
+
+        selects = [query for query in profile['queries']
+                   if 'wallet_transaction' in query['sql']]
+        self.assertTrue(selects)
+        self.assertGreater(profile['db_seconds'], 0)
+
+        if connection.vendor == 'postgresql':
+            self.assertIn('actual time', selects[0]['plan'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'explains streamed query')
+    def test_profile_header_and_export(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get('/api/v1/transactions/export/',
+                                   HTTP_X_PROFILE='1')
+        profile = response.json()
+
+        self.assertEqual(profile['status'], HTTP_200_OK)
+        self.assertTrue(any('plan' in query for query in profile['queries']))
+
+        # the other apps are never profiled
+        response = self.client.get('/admin/', {'_profile': 1})
+        self.assertNotEqual(response.get('Content-Type'), 'application/json')
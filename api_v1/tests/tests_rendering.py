@@ -0,0 +1,70 @@
+from uuid import uuid4
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from wallet.models import Account, Customer, Currency, Transaction, Action
+from api_v1.shards import set_account_shards
+from api_v1.utils import get_history_tx
+
+
+class FastRenderingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        john = Customer.objects.create(first_name='John', last_name='Doe')
+        jane = Customer.objects.create(first_name='Jane  ',
+                                       last_name='Дое "\\"')
+        cls.usd = Account.objects.create(
+            uuid=uuid4(), customer=john,
+            currency=Currency.USD, amount=Decimal('100.5')
+        )
+        cls.eur = Account.objects.create(
+            uuid=uuid4(), customer=jane,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+        Transaction.objects.bulk_create([
+            get_history_tx(cls.usd, cls.eur, Decimal(i) / 3, Action.TRANSFER)
+            for i in range(1, 16)
+        ])
+
+    def _compare(self, url, **headers):
+        client = APIClient()
+
+        with override_settings(FAST_RENDERING=False):
+            expected = client.get(url, **headers)
+        with override_settings(FAST_RENDERING=True):
+            response = client.get(url, **headers)
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response['Content-Type'], expected['Content-Type'])
+        self.assertEqual(response.content, expected.content)
+
+        return response
+
+    def test_transactions(self):
+        response = self._compare('/api/v1/transactions/')
+        self._compare(response.data['next'])
+        self._compare('/api/v1/transactions/?ordering=created_at')
+        self._compare('/api/v1/transactions/',
+                      HTTP_ACCEPT='application/json; indent=4')
+
+    def test_customers(self):
+        set_account_shards(str(self.usd.uuid), 2)
+
+        self._compare('/api/v1/customers/')
+
+        with override_settings(WALLET_MODE='lazy', TRANSFER_ENGINE='ledger'):
+            self._compare('/api/v1/customers/')
+
+    def test_query_count(self):
+        client = APIClient()
+
+        with override_settings(FAST_RENDERING=True):
+            # list version and page
+            with self.assertNumQueries(2):
+                client.get('/api/v1/transactions/')
+            # list version, customers count, page and their accounts
+            with self.assertNumQueries(5):
+                client.get('/api/v1/customers/')
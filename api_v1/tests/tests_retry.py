@@ -0,0 +1,71 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.db import OperationalError
+
+from api_v1.retry import (
+    retry_on_conflict,
+    conflicts,
+    DEADLOCK,
+    RETRIES_EXHAUSTED
+)
+from app.settings import TRANSFER_RETRY_ATTEMPTS
+
+
+class PgError(Exception):
+
+    def __init__(self, pgcode):
+        super(PgError, self).__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def get_operational_error(pgcode):
+    err = OperationalError(pgcode)
+    err.__cause__ = PgError(pgcode)
+    return err
+
+
+@patch('api_v1.retry.sleep')
+class RetryOnConflictTestCase(TestCase):
+
+    def setUp(self):
+        conflicts.clear()
+
+    def test_retry_on_deadlock(self, sleep):
+        calls = []
+
+        @retry_on_conflict
+        def func():
+            calls.append(1)
+            if len(calls) == 1:
+                raise get_operational_error('40P01')
+            return 'ok'
+
+        self.assertEqual(func(), 'ok')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(conflicts[DEADLOCK], 1)
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_retries_exhausted(self, sleep):
+
+        @retry_on_conflict
+        def func():
+            raise get_operational_error('40001')
+
+        with self.assertRaises(OperationalError):
+            func()
+
+        self.assertEqual(sleep.call_count, TRANSFER_RETRY_ATTEMPTS - 1)
+        self.assertEqual(conflicts[RETRIES_EXHAUSTED], 1)
+
+    def test_other_errors_are_not_retried(self, sleep):
+
+        @retry_on_conflict
+        def func():
+            raise get_operational_error('57014')
+
+        with self.assertRaises(OperationalError):
+            func()
+
+        self.assertFalse(sleep.called)
+        self.assertFalse(conflicts)
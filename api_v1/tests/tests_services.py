@@ -1,4 +1,60 @@
-from unittest import TestCase
+from io import StringIO
+from uuid import uuid4
+from decimal import Decimal
+from datetime import timedelta
+from tempfile import NamedTemporaryFile
+from threading import Thread
+from unittest import TestCase, skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.test import (
+    TestCase as DBTestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.utils import timezone
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+    HTTP_500_INTERNAL_SERVER_ERROR
+)
+from rest_framework.test import APIClient
+
+from wallet.models import (
+    Account,
+    Customer,
+    Currency,
+    Transaction,
+    Action,
+    LedgerEntry,
+    AccountShard,
+    TransferRequest,
+    TransferStatus,
+    IdempotencyKey
+)
+from api_v1.idempotency import responses
+from api_v1.services import (
+    lock_accounts,
+    transfer,
+    transfer_batch,
+    transfer_ledger,
+    transfer_locking,
+    transfer_returning
+)
+from api_v1.serializers import TransferBatchSerializer, TransferSerializer
+from api_v1.shards import set_account_shards
+from api_v1.validations import (
+    ACCOUNT_DOESNT_EXIST,
+    BATCH_ROLLED_BACK,
+    IDEMPOTENCY_KEY_REUSED
+)
+from app.settings import IDEMPOTENCY_KEY_TTL
 
 
 class TransferTestCase(TestCase):
@@ -13,3 +69,691 @@ class CustomerWaller(TestCase):
     def test_create_customer_with_wallet(self):
         # TODO: implement
         pass
+
+
+class WalletTestCase(DBTestCase):
+
+    def setUp(self):
+        self.john = Customer.objects.create(first_name='John', last_name='Doe')
+        self.jane = Customer.objects.create(first_name='Jane', last_name='Doe')
+        self.john_usd = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        self.john_eur = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.EUR, amount=Decimal(0)
+        )
+        self.jane_usd = Account.objects.create(
+            uuid=uuid4(), customer=self.jane,
+            currency=Currency.USD, amount=Decimal(0)
+        )
+
+    def _s2s(self, amount):
+        return {
+            'customer_from': self.john.id,
+            'account_from': str(self.john_usd.uuid),
+            'account_to': str(self.john_eur.uuid),
+            'amount': amount
+        }
+
+    def _s2a(self, amount):
+        return {
+            'customer_from': self.john.id,
+            'customer_to': self.jane.id,
+            'account_from': str(self.john_usd.uuid),
+            'account_to': str(self.jane_usd.uuid),
+            'amount': amount
+        }
+
+    def _amount(self, account):
+        return Account.objects.get(id=account.id).amount
+
+
+class TransferBatchTestCase(WalletTestCase):
+
+    def _batch(self, transfers, atomic=True):
+        serializer = TransferBatchSerializer(
+            data={'transfers': transfers, 'atomic': atomic}
+        )
+        serializer.is_valid(raise_exception=True)
+        return transfer_batch(serializer.data)
+
+    def test_transfer_batch(self):
+        data, status = self._batch([self._s2s('10'), self._s2a('20')])
+
+        self.assertEqual(status, HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in data['transfers']],
+            [HTTP_200_OK, HTTP_200_OK]
+        )
+        self.assertEqual(self._amount(self.john_usd), Decimal('69.00'))
+        self.assertEqual(self._amount(self.john_eur), Decimal('10.00'))
+        self.assertEqual(self._amount(self.jane_usd), Decimal('20.00'))
+        self.assertEqual(
+            Transaction.objects.filter(action=Action.TRANSFER).count(), 2
+        )
+
+    def test_transfer_batch_uses_previous_balances(self):
+        # second transfer doesn't fit into balance left by the first one
+        data, status = self._batch([self._s2s('60'), self._s2s('60')])
+
+        self.assertEqual(status, HTTP_400_BAD_REQUEST)
+        self.assertEqual(data['transfers'][0]['errors'], [BATCH_ROLLED_BACK])
+        self.assertEqual(len(data['transfers'][1]['errors']), 1)
+        self.assertEqual(self._amount(self.john_usd), Decimal('100.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_transfer_batch_partial(self):
+        missing = dict(self._s2s('10'), account_to=str(uuid4()))
+        data, status = self._batch([missing, self._s2s('10')], atomic=False)
+
+        self.assertEqual(status, HTTP_200_OK)
+        self.assertEqual(
+            data['transfers'][0]['errors'],
+            [ACCOUNT_DOESNT_EXIST % missing['account_to']]
+        )
+        self.assertEqual(data['transfers'][1]['status'], HTTP_200_OK)
+        self.assertEqual(self._amount(self.john_usd), Decimal('90.00'))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+
+class IdempotencyKeyTestCase(WalletTestCase):
+
+    def setUp(self):
+        super(IdempotencyKeyTestCase, self).setUp()
+        responses.clear()
+
+    def _post(self, key, payload):
+        return APIClient().post('/api/v1/transfer/', payload, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_transfer_replay(self):
+        first = self._post('key-1', self._s2a('10'))
+        responses.clear()
+        replay = self._post('key-1', self._s2a('10'))
+
+        self.assertEqual(first.status_code, HTTP_200_OK)
+        self.assertEqual(replay.status_code, HTTP_200_OK)
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(self._amount(self.john_usd), Decimal('89.50'))
+        self.assertEqual(
+            Transaction.objects.filter(action=Action.TRANSFER).count(), 1
+        )
+
+        # cached replay doesn't query database at all
+        with self.assertNumQueries(0):
+            replay = self._post('key-1', self._s2a('10'))
+        self.assertEqual(replay.data, first.data)
+
+    def test_transfer_key_reused(self):
+        self._post('key-1', self._s2a('10'))
+        response = self._post('key-1', self._s2a('20'))
+
+        self.assertEqual(response.status_code, HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(response.data['errors'],
+                         [IDEMPOTENCY_KEY_REUSED % 'key-1'])
+        self.assertEqual(self._amount(self.john_usd), Decimal('89.50'))
+
+    def test_expired_key(self):
+        self._post('key-1', self._s2a('10'))
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(seconds=IDEMPOTENCY_KEY_TTL + 1)
+        )
+        responses.clear()
+
+        # expired key isn't purged yet, but it's used as a new one
+        response = self._post('key-1', self._s2a('20'))
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(self._amount(self.john_usd), Decimal('68.50'))
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_purge_expired_keys(self):
+        self._post('key-1', self._s2a('10'))
+        self._post('key-2', self._s2a('10'))
+        IdempotencyKey.objects.filter(key='key-1').update(
+            created_at=timezone.now() - timedelta(seconds=IDEMPOTENCY_KEY_TTL + 1)
+        )
+
+        call_command('purge_idempotency_keys', stdout=StringIO())
+
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list('key', flat=True)),
+            ['key-2']
+        )
+
+
+class TransferAsyncTestCase(WalletTestCase):
+
+    def test_transfer_async(self):
+        client = APIClient()
+        missing = dict(self._s2s('10'), account_to=str(uuid4()))
+        queued = [
+            client.post('/api/v1/transfer/async/', payload, format='json')
+            for payload in (self._s2s('10'), missing, self._s2a('20'))
+        ]
+
+        self.assertEqual([item.status_code for item in queued],
+                         [HTTP_202_ACCEPTED] * 3)
+        self.assertEqual(queued[0].data['status'], TransferStatus.QUEUED)
+        self.assertEqual(self._amount(self.john_usd), Decimal('100.00'))
+
+        call_command('process_transfers', once=True, stdout=StringIO())
+
+        done, failed, _ = [
+            client.get('/api/v1/transfer/%s/' % item.data['id']).data
+            for item in queued
+        ]
+        self.assertEqual(done['status'], TransferStatus.DONE)
+        self.assertEqual(done['result_status'], HTTP_200_OK)
+        self.assertEqual(done['result']['result']['from']['account']['amount'],
+                         '90.00')
+        self.assertEqual(failed['status'], TransferStatus.FAILED)
+        self.assertEqual(failed['result']['errors'],
+                         [ACCOUNT_DOESNT_EXIST % missing['account_to']])
+        self.assertEqual(self._amount(self.john_usd), Decimal('69.00'))
+        self.assertEqual(self._amount(self.jane_usd), Decimal('20.00'))
+        self.assertFalse(
+            TransferRequest.objects.filter(status=TransferStatus.QUEUED).exists()
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'adds table constraint')
+    def test_transfer_async_database_error(self):
+        client = APIClient()
+        # credit of jane violates constraint and aborts its savepoint
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(
+                'ALTER TABLE wallet_account ADD CONSTRAINT jane_usd_cap '
+                'CHECK (id <> %s OR amount <= 5)' % self.jane_usd.id
+            )
+        queued = [
+            client.post('/api/v1/transfer/async/', payload, format='json')
+            for payload in (self._s2a('10'), self._s2s('10'))
+        ]
+
+        call_command('process_transfers', once=True, stdout=StringIO())
+
+        failed, done = [
+            client.get('/api/v1/transfer/%s/' % item.data['id']).data
+            for item in queued
+        ]
+        self.assertEqual(failed['status'], TransferStatus.FAILED)
+        self.assertEqual(failed['result_status'],
+                         HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('database', failed['result']['errors'][0])
+        self.assertEqual(done['status'], TransferStatus.DONE)
+        self.assertEqual(self._amount(self.john_usd), Decimal('90.00'))
+        self.assertEqual(self._amount(self.john_eur), Decimal('10.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'uses postgresql CTE')
+class TransferReturningTestCase(WalletTestCase):
+
+    def _transfer(self, engine, payload):
+        serializer = TransferSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        return engine(serializer.data)
+
+    def test_transfer_returning(self):
+        for payload in (self._s2s('10'), self._s2a('20')):
+            self._transfer(transfer_locking, payload)
+            data, status = self._transfer(transfer_returning, payload)
+
+            self.assertEqual(status, HTTP_200_OK)
+            self.assertEqual(
+                data['from']['account']['amount'],
+                str(self._amount(self.john_usd))
+            )
+
+        self.assertEqual(self._amount(self.john_usd), Decimal('38.00'))
+        self.assertEqual(self._amount(self.john_eur), Decimal('20.00'))
+        self.assertEqual(self._amount(self.jane_usd), Decimal('40.00'))
+        self.assertEqual(Transaction.objects.count(), 4)
+
+    def test_transfer_half_cent(self):
+        # 0.30 with 5% fee debits 0.315, every engine rounds it to 0.32
+        for engine, expected in ((transfer_locking, '99.68'),
+                                 (transfer_returning, '99.36'),
+                                 (transfer_ledger, '99.04')):
+            data, status = self._transfer(engine, self._s2a('0.30'))
+            self.assertEqual(status, HTTP_200_OK)
+            self.assertEqual(data['from']['account']['amount'], expected)
+
+    def test_transfer_returning_hot_accounts(self):
+        call_command('shard_account', str(self.jane_usd.uuid), '2',
+                     stdout=StringIO())
+        self._transfer(transfer_locking, self._s2a('50'))
+
+        data, status = self._transfer(transfer_returning, self._s2a('10'))
+        self.assertEqual(status, HTTP_200_OK)
+        self.assertEqual(data['to']['account']['amount'], '60.00')
+        self.assertEqual(
+            Transaction.objects.latest('id').account_to_amount,
+            Decimal('60.00')
+        )
+        # credit went to a shard, base row isn't updated
+        self.assertEqual(self._amount(self.jane_usd), Decimal(0))
+
+        call_command('shard_account', str(self.john_usd.uuid), '2',
+                     stdout=StringIO())
+        data, status = self._transfer(transfer_returning, self._s2a('10'))
+        self.assertEqual(status, HTTP_200_OK)
+        self.assertEqual(data['from']['account']['amount'], '26.50')
+        self.assertEqual(data['to']['account']['amount'], '70.00')
+
+    def test_transfer_returning_errors(self):
+        wrong_customer = dict(self._s2a('10'), customer_from=self.jane.id)
+        same_customers = dict(self._s2a('10'), customer_to=self.john.id)
+
+        for payload in (self._s2s('100'), self._s2a('99'),
+                        wrong_customer, same_customers):
+            self.assertEqual(
+                self._transfer(transfer_returning, payload),
+                self._transfer(transfer_locking, payload)
+            )
+
+        self.assertEqual(self._amount(self.john_usd), Decimal('100.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'uses concurrent connections')
+class TransferLockOrderTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.john = Customer.objects.create(first_name='John', last_name='Doe')
+        self.jane = Customer.objects.create(first_name='Jane', last_name='Doe')
+        # the debited account has the larger id
+        self.jane_usd = Account.objects.create(
+            uuid=uuid4(), customer=self.jane,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+        self.john_usd = Account.objects.create(
+            uuid=uuid4(), customer=self.john,
+            currency=Currency.USD, amount=Decimal(100)
+        )
+
+    def _start_transfer(self, engine, account_from, account_to):
+        """ Starts transfer in another thread, returns once it's done
+        or waits for a lock """
+        def run():
+            serializer = TransferSerializer(data={
+                'customer_from': account_from.customer_id,
+                'customer_to': account_to.customer_id,
+                'account_from': str(account_from.uuid),
+                'account_to': str(account_to.uuid),
+                'amount': '10'
+            })
+            serializer.is_valid(raise_exception=True)
+            try:
+                results.append(engine(serializer.data))
+            finally:
+                connections.close_all()
+
+        results = []
+        thread = Thread(target=run)
+        thread.start()
+
+        with connection.cursor() as cursor:
+            for _ in range(500):
+                cursor.execute('SELECT count(*) FROM pg_locks '
+                               'WHERE NOT granted')
+                if cursor.fetchone()[0] or not thread.is_alive():
+                    break
+                thread.join(0.01)
+
+        return thread, results
+
+    def _is_locked(self, account):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM wallet_account WHERE id = %s '
+                'FOR UPDATE SKIP LOCKED', [account.id]
+            )
+            return cursor.fetchone() is None
+
+    def test_transfer_returning_lock_order(self):
+        with transaction.atomic():
+            Account.objects.select_for_update().get(id=self.jane_usd.id)
+            thread, results = self._start_transfer(
+                transfer_returning, self.john_usd, self.jane_usd
+            )
+            # debited row isn't locked until the credited one with lower id
+            self.assertTrue(thread.is_alive())
+            self.assertFalse(self._is_locked(self.john_usd))
+
+        thread.join()
+        self.assertEqual(results[0][1], HTTP_200_OK)
+        self.assertEqual(Account.objects.get(id=self.jane_usd.id).amount,
+                         Decimal('110.00'))
+
+    def test_transfer_hot_credit_waits(self):
+        set_account_shards(str(self.jane_usd.uuid), 2)
+
+        with transaction.atomic():
+            # shards are being debited by another transfer
+            shards = list(AccountShard.objects.select_for_update()
+                          .filter(account=self.jane_usd))
+            AccountShard.objects.filter(id=shards[0].id) \
+                .update(amount=F('amount') - 30)
+
+            thread, results = self._start_transfer(
+                transfer_locking, self.john_usd, self.jane_usd
+            )
+            # credited shard is locked before balance is read
+            self.assertTrue(thread.is_alive())
+
+        thread.join()
+        self.assertEqual(results[0][1], HTTP_200_OK)
+        self.assertEqual(Transaction.objects.get().account_to_amount,
+                         Decimal('80.00'))
+
+    def test_transfer_ledger_credit_waits(self):
+        with transaction.atomic():
+            # john is debited by another ledger transfer
+            lock_accounts([str(self.john_usd.uuid)], no_key=True)
+            LedgerEntry.objects.create(account=self.john_usd, transaction_id=0,
+                                       amount=Decimal('-50'))
+
+            thread, results = self._start_transfer(
+                transfer_ledger, self.jane_usd, self.john_usd
+            )
+            # credit snapshot must include the debit being committed
+            self.assertTrue(thread.is_alive())
+
+        thread.join()
+        self.assertEqual(results[0][1], HTTP_200_OK)
+        self.assertEqual(Transaction.objects.get().account_to_amount,
+                         Decimal('60.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'uses postgresql arrays')
+class BalanceAsOfTestCase(WalletTestCase):
+
+    def setUp(self):
+        super(BalanceAsOfTestCase, self).setUp()
+        self.day = timezone.now() - timedelta(days=2)
+        client = APIClient()
+
+        for days, payload in enumerate((self._s2a('10'), self._s2s('20'))):
+            client.post('/api/v1/transfer/', payload, format='json')
+            Transaction.objects \
+                .filter(id=Transaction.objects.latest('id').id) \
+                .update(created_at=self.day + timedelta(days=days))
+
+    def test_account_balance(self):
+        client = APIClient()
+        url = '/api/v1/accounts/%s/balance/' % self.john_usd.uuid
+
+        first = client.get(url, {'as_of': self.day.isoformat()})
+        current = client.get(url)
+        before = client.get(url, {
+            'as_of': (self.day - timedelta(seconds=1)).isoformat()
+        })
+
+        self.assertEqual(first.status_code, HTTP_200_OK)
+        self.assertEqual(first.data['amount'], '89.50')
+        self.assertEqual(current.data['amount'], '69.50')
+        self.assertEqual(current.data['currency'], Currency.USD)
+        self.assertEqual(before.status_code, HTTP_404_NOT_FOUND)
+
+    def test_accounts_balances(self):
+        missing = str(uuid4())
+        response = APIClient().post('/api/v1/accounts/balance/', {
+            'accounts': [str(self.john_eur.uuid), str(self.jane_usd.uuid),
+                         missing],
+            'as_of': self.day.isoformat()
+        }, format='json')
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            [(item['uuid'], item['amount'])
+             for item in response.data['balances']],
+            [(str(self.john_eur.uuid), None),
+             (str(self.jane_usd.uuid), '10.00'),
+             (missing, None)]
+        )
+
+    def test_balances_as_of_command(self):
+        with NamedTemporaryFile('r', suffix='.csv') as file:
+            call_command('balances_as_of', timezone.now().isoformat(),
+                         file.name, chunk_size=2, stdout=StringIO())
+            rows = file.read().splitlines()
+
+        self.assertEqual(rows[0], 'uuid,currency,amount,updated_at')
+        self.assertEqual(len(rows), 4)
+        self.assertIn('%s,%s,20.00,' % (self.john_eur.uuid, Currency.EUR),
+                      rows[2])
+
+
+class CustomersBulkTestCase(DBTestCase):
+
+    def test_bulk_create_customers(self):
+        client = APIClient()
+        single = client.post('/api/v1/customers/',
+                             {'first_name': 'John', 'last_name': 'Doe'},
+                             format='json')
+        bulk = client.post('/api/v1/customers/bulk/', {'customers': [
+            {'first_name': 'Jane', 'last_name': 'Doe'},
+            {'first_name': 'Jack', 'last_name': 'Doe'},
+        ]}, format='json')
+
+        self.assertEqual(bulk.status_code, 201)
+        customers = bulk.data['customers']
+        self.assertEqual(len(customers), 2)
+
+        for customer in customers:
+            self.assertEqual(list(customer), list(single.data))
+            self.assertEqual(
+                [(a['currency'], a['amount']) for a in customer['accounts']],
+                [(a['currency'], a['amount'])
+                 for a in single.data['accounts']]
+            )
+            self.assertEqual(
+                client.get('/api/v1/customers/%s/' % customer['id']).data,
+                customer
+            )
+
+        self.assertEqual(Account.objects.count(), 9)
+        self.assertEqual(
+            Transaction.objects.filter(action=Action.INITIAL).count(), 9
+        )
+
+    def test_import_customers_command(self):
+        with NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write('first_name,last_name\n')
+            file.writelines('John,Doe%s\n' % i for i in range(5))
+            file.flush()
+            call_command('import_customers', file.name,
+                         chunk_size=2, stdout=StringIO())
+
+        self.assertEqual(Customer.objects.count(), 5)
+        self.assertEqual(Account.objects.count(), 15)
+        self.assertEqual(Transaction.objects.count(), 15)
+
+    def test_import_customers_command_errors(self):
+        with NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write('first_name,last_name\n')
+            file.write('John,Doe\nJane,Doe\n,Doe\nJim\n%s,Doe\n' % ('x' * 300))
+            file.flush()
+
+            with self.assertRaises(CommandError) as context:
+                call_command('import_customers', file.name,
+                             chunk_size=2, stdout=StringIO())
+
+        message = str(context.exception)
+        self.assertIn('2 created before them', message)
+        self.assertIn('line 4: first_name:', message)
+        self.assertIn('line 5: last_name:', message)
+        self.assertEqual(Customer.objects.count(), 2)
+
+
+@override_settings(WALLET_MODE='lazy')
+class LazyWalletTestCase(DBTestCase):
+
+    def test_lazy_wallet(self):
+        client = APIClient()
+        john = client.post('/api/v1/customers/',
+                           {'first_name': 'John', 'last_name': 'Doe'},
+                           format='json').data
+        jane = client.post('/api/v1/customers/bulk/', {'customers': [
+            {'first_name': 'Jane', 'last_name': 'Doe'}
+        ]}, format='json').data['customers'][0]
+
+        # only accounts with initial balance are created
+        self.assertEqual(Account.objects.count(), 2)
+        self.assertEqual(Transaction.objects.count(), 2)
+
+        for customer in (john, jane):
+            self.assertEqual(
+                [(a['currency'], a['amount']) for a in customer['accounts']],
+                [('USD', '100.00'), ('EUR', '0.00'), ('CNY', '0.00')]
+            )
+            self.assertEqual(
+                client.get('/api/v1/customers/%s/' % customer['id']).data,
+                customer
+            )
+
+        john_usd, john_eur, _ = [a['uuid'] for a in john['accounts']]
+        _, jane_eur, _ = [a['uuid'] for a in jane['accounts']]
+
+        response = client.post('/api/v1/transfer/', {
+            'customer_from': john['id'],
+            'account_from': john_usd,
+            'account_to': john_eur,
+            'amount': '10'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['to']['account']['uuid'], john_eur)
+
+        # virtual account of another customer can't be used
+        response = client.post('/api/v1/transfer/', {
+            'customer_from': john['id'],
+            'account_from': john_usd,
+            'account_to': jane_eur,
+            'amount': '10'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(
+            Account.objects.get(uuid=john_eur).amount, Decimal('10.00')
+        )
+        self.assertFalse(Account.objects.filter(uuid=jane_eur).exists())
+
+    def test_lazy_wallet_missing_customer(self):
+        client = APIClient()
+        john = client.post('/api/v1/customers/',
+                           {'first_name': 'John', 'last_name': 'Doe'},
+                           format='json').data
+        missing = Account.get_virtual_uuid(987654, Currency.USD)
+
+        response = client.post('/api/v1/transfer/', {
+            'customer_from': john['id'],
+            'account_from': john['accounts'][0]['uuid'],
+            'customer_to': 987654,
+            'account_to': str(missing),
+            'amount': '10'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'],
+                         [ACCOUNT_DOESNT_EXIST % missing])
+        self.assertFalse(Account.objects.filter(uuid=missing).exists())
+
+
+@override_settings(TRANSFER_ENGINE='ledger')
+class LedgerTestCase(WalletTestCase):
+
+    def _transfer(self, payload):
+        serializer = TransferSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        return transfer(serializer.data)
+
+    def _balances(self):
+        customers = APIClient().get('/api/v1/customers/').data['results']
+        return {account['uuid']: account['amount']
+                for customer in customers
+                for account in customer['accounts']}
+
+    def test_ledger_transfer(self):
+        data, status = self._transfer(self._s2a('20'))
+        self.assertEqual(status, HTTP_200_OK)
+        self.assertEqual(data['from']['account']['amount'], '79.00')
+        self.assertEqual(data['to']['account']['amount'], '20.00')
+
+        data, status = self._transfer(self._s2s('80'))
+        self.assertEqual(status, HTTP_400_BAD_REQUEST)
+
+        batch = TransferBatchSerializer(
+            data={'transfers': [self._s2s('10'), self._s2s('10')]}
+        )
+        batch.is_valid(raise_exception=True)
+        self.assertEqual(transfer_batch(batch.data)[1], HTTP_200_OK)
+
+        expected = {
+            str(self.john_usd.uuid): '59.00',
+            str(self.john_eur.uuid): '20.00',
+            str(self.jane_usd.uuid): '20.00',
+        }
+        self.assertEqual(self._balances(), expected)
+
+        # accounts aren't updated, balances are kept by entries
+        self.assertEqual(self._amount(self.john_usd), Decimal('100.00'))
+        self.assertEqual(LedgerEntry.objects.count(), 6)
+
+        call_command('checkpoint_balances', min_entries=1, stdout=StringIO())
+
+        self.assertFalse(
+            LedgerEntry.objects.filter(checkpoint__isnull=True).exists()
+        )
+        self.assertEqual(self._balances(), expected)
+
+        data, status = self._transfer(self._s2s('50'))
+        self.assertEqual(data['from']['account']['amount'], '9.00')
+        self.assertEqual(self._balances()[str(self.john_eur.uuid)], '70.00')
+
+
+class HotAccountTestCase(WalletTestCase):
+
+    def _transfer(self, payload):
+        serializer = TransferSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        return transfer(serializer.data)
+
+    def _shards(self):
+        return sorted(AccountShard.objects.filter(account=self.john_usd)
+                      .values_list('amount', flat=True))
+
+    def test_hot_account(self):
+        call_command('shard_account', str(self.john_usd.uuid), '4',
+                     stdout=StringIO())
+        self.assertEqual(self._shards(), [Decimal(25)] * 4)
+        self.assertEqual(self._amount(self.john_usd), Decimal(0))
+
+        for _ in range(3):
+            data, status = self._transfer(self._s2s('20'))
+            self.assertEqual(status, HTTP_200_OK)
+
+        data, status = self._transfer(self._s2s('40'))
+        self.assertEqual(status, HTTP_400_BAD_REQUEST)
+
+        data, status = self._transfer(dict(
+            self._s2s('15'),
+            account_from=str(self.john_eur.uuid),
+            account_to=str(self.john_usd.uuid)
+        ))
+        self.assertEqual(status, HTTP_200_OK)
+        self.assertEqual(data['to']['account']['amount'], '55.00')
+        self.assertEqual(sum(self._shards()), Decimal(55))
+
+        customer = APIClient().get('/api/v1/customers/%s/' % self.john.id)
+        self.assertEqual(customer.data['accounts'][0]['amount'], '55.00')
+
+        call_command('rebalance_shards', stdout=StringIO())
+        self.assertEqual(self._shards(), [Decimal('13.75')] * 4)
+
+        call_command('shard_account', str(self.john_usd.uuid), '0',
+                     stdout=StringIO())
+        self.assertEqual(self._shards(), [])
+        self.assertEqual(self._amount(self.john_usd), Decimal(55))
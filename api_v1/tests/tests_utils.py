@@ -3,7 +3,7 @@ from decimal import Decimal
 from django.test import TestCase
 
 from app.settings import TRANSFER_FEE_PERCENT
-from api_v1.utils import calculate_fee
+from api_v1.utils import calculate_fee, quantize_amount
 
 
 class UtilsTestCase(TestCase):
@@ -18,6 +18,11 @@ class UtilsTestCase(TestCase):
         self.assertNotEqual(expected + 1, result)
         self.assertNotEqual(expected - 1, result)
 
+    def test_quantize_amount(self):
+        self.assertEqual(quantize_amount(Decimal('99.685')), Decimal('99.69'))
+        self.assertEqual(quantize_amount(Decimal('0.125')), Decimal('0.13'))
+        self.assertEqual(quantize_amount(Decimal('-0.125')), Decimal('-0.13'))
+
     def test_is_account_belongs_to_customer(self):
         # TODO: implement
         pass
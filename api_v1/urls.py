@@ -1,6 +1,18 @@
 from django.urls import path
 from rest_framework import routers
-from api_v1.views import CustomerViewSet, TransactionViewSet, Transfer
+from api_v1.views import (
+    AccountBalance,
+    AccountsBalances,
+    AccountTransactions,
+    CacheStats,
+    CustomerViewSet,
+    HotAccounts,
+    TransactionViewSet,
+    Transfer,
+    TransferAsync,
+    TransferBatch,
+    TransferStatus
+)
 
 router = routers.DefaultRouter()
 router.register(r'customers', CustomerViewSet)
@@ -8,6 +20,14 @@ router.register(r'transactions', TransactionViewSet)
 
 urlpatterns = [
     path('transfer/', Transfer.as_view()),
+    path('transfer/batch/', TransferBatch.as_view()),
+    path('transfer/async/', TransferAsync.as_view()),
+    path('transfer/<int:pk>/', TransferStatus.as_view()),
+    path('accounts/<uuid:uuid>/transactions/', AccountTransactions.as_view()),
+    path('accounts/<uuid:uuid>/balance/', AccountBalance.as_view()),
+    path('accounts/balance/', AccountsBalances.as_view()),
+    path('cache/stats/', CacheStats.as_view()),
+    path('admin/hot-accounts/', HotAccounts.as_view()),
 ]
 
 urlpatterns += router.urls
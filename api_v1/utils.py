@@ -1,18 +1,39 @@
-from decimal import Decimal
-from typing import Dict
-
-from wallet.models import Account, Action, Transaction
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from wallet.models import (
+    Account,
+    Action,
+    Currency,
+    LedgerEntry,
+    Transaction,
+    TransferEngine,
+    TransferRequest
+)
 from app.settings import TRANSFER_FEE_PERCENT
 from api_v1.serializers import TransferSerializer, AccountSerializer
 
 
 CUSTOMER_TO = 'customer_to'
+AMOUNT_QUANT = Decimal('0.01')
 
 
 def calculate_fee(amount: Decimal) -> Decimal:
     return Decimal(amount / 100 * TRANSFER_FEE_PERCENT)
 
 
+def quantize_amount(amount: Decimal) -> Decimal:
+    """ Rounds amount half away from zero as database column stores it """
+    return amount.quantize(AMOUNT_QUANT, rounding=ROUND_HALF_UP)
+
+
+def calculate_total(amount: Decimal, fee: Decimal) -> Decimal:
+    """ Amount debited by transfer, every engine rounds it once """
+    return quantize_amount(amount + fee)
+
+
 def is_account_belongs_to_customer(account_customer: int,
                                    customer: int) -> bool:
     return account_customer == customer
@@ -27,6 +48,10 @@ def is_enough_amount(account: Decimal,
     return True if account - amount - fee > 0 else False
 
 
+def is_ledger_mode() -> bool:
+    return settings.TRANSFER_ENGINE == TransferEngine.LEDGER
+
+
 def is_different_customers(customer_to: int, customer_from) -> bool:
     return customer_to != customer_from
 
@@ -52,16 +77,39 @@ def get_history_tx(account_from: Account, account_to: Account,
                    amount: Decimal, action: Action) -> Transaction:
     """ Prepare history transaction object """
     return Transaction(
-        customer_from=account_from.customer,
-        customer_to=account_to.customer,
         account_from=account_from,
-        account_from_uuid=account_from.uuid,
-        account_from_currency=account_from.currency,
         account_from_amount=account_from.amount,
         account_to=account_to,
-        account_to_uuid=account_to.uuid,
-        account_to_currency=account_to.currency,
         account_to_amount=account_to.amount,
         amount=amount,
         action=action
     )
+
+
+def get_virtual_account(customer: int, uuid: str) -> Optional[Account]:
+    """ Prepare not yet created account of customer by its uuid """
+    for currency in Currency:
+        if str(Account.get_virtual_uuid(customer, currency)) == uuid:
+            return Account(
+                uuid=uuid,
+                customer_id=customer,
+                currency=currency.value,
+                amount=Decimal(0)
+            )
+    return None
+
+
+def get_ledger_entries(tx: Transaction, total: Decimal) -> List[LedgerEntry]:
+    """ Prepare debit (with fee) and credit ledger entries of transfer """
+    return [
+        LedgerEntry(account=tx.account_from, transaction=tx, amount=-total),
+        LedgerEntry(account=tx.account_to, transaction=tx, amount=tx.amount),
+    ]
+
+
+def get_transfer_request_data(transfer_request: TransferRequest) -> Dict:
+    """ Queued transfer as TransferSerializer data, self transfer has no customer_to """
+    data = TransferSerializer(transfer_request).data
+    if data[CUSTOMER_TO] is None:
+        data.pop(CUSTOMER_TO)
+    return data
@@ -8,7 +8,8 @@ from api_v1.utils import (
     is_enough_amount,
     is_different_customers,
     is_account_belongs_to_customer,
-    calculate_fee
+    calculate_fee,
+    calculate_total
 )
 
 
@@ -16,6 +17,13 @@ SAME_CUSTOMERS = "customers can't be with same id = %s"
 NOT_ENOUGH_AMOUNT = "not enough amount to transfer - %s vs %s"
 NOT_ENOUGH_AMOUNT_FEE = "not enough amount to transfer with fee - %s + %s vs %s"
 ACCOUNT_DOESNT_BELONG = "account '%s' doesn't belong to customer with id = %s"
+ACCOUNT_DOESNT_EXIST = "account '%s' doesn't exist"
+BATCH_ROLLED_BACK = "transfer is rolled back due to errors in batch"
+NO_BALANCE = "account '%s' has no balance at %s"
+IDEMPOTENCY_KEY_TOO_LONG = "idempotency key can't be longer than %s characters"
+IDEMPOTENCY_KEY_REUSED = "idempotency key '%s' is already used with another request"
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
 
 
 def transfer_data_validate(account_from: Account,
@@ -69,9 +77,53 @@ def transfer_data_validate(account_from: Account,
 
         fee = calculate_fee(amount)
 
-        if not is_enough_amount(account_from.amount, amount, fee):
+        if not is_enough_amount(account_from.amount,
+                                calculate_total(amount, fee)):
             errors.get('errors').append(
                 NOT_ENOUGH_AMOUNT_FEE % (amount, fee, account_from.amount)
             )
 
     return errors
+
+
+def accounts_exist_validate(account_from: Account,
+                            account_to: Account,
+                            data: TransferSerializer) -> Mapping[str, list]:
+    """
+    Validates that both transfer accounts are found in database
+
+    Returns:
+        Mapping[str, str] - dict with errors if they are exist
+    """
+
+    errors = {'errors': []}
+
+    if account_from is None:
+        errors.get('errors').append(
+            ACCOUNT_DOESNT_EXIST % data['account_from']
+        )
+
+    if account_to is None:
+        errors.get('errors').append(
+            ACCOUNT_DOESNT_EXIST % data['account_to']
+        )
+
+    return errors
+
+
+def idempotency_key_validate(key: str) -> Mapping[str, list]:
+    """
+    Validates idempotency key fits its database column
+
+    Returns:
+        Mapping[str, str] - dict with errors if they are exist
+    """
+
+    errors = {'errors': []}
+
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        errors.get('errors').append(
+            IDEMPOTENCY_KEY_TOO_LONG % IDEMPOTENCY_KEY_MAX_LENGTH
+        )
+
+    return errors
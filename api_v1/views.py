@@ -1,24 +1,141 @@
-from rest_framework import viewsets
+from uuid import UUID
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Max, Prefetch, QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 
-from api_v1.filters import TransactionFilters
-from api_v1.services import create_customer_with_wallet, transfer
-from wallet.models import Customer, Transaction
+from api_v1.cache import (
+    account_scope,
+    cached_response,
+    customer_scope,
+    get_stats as get_cache_stats,
+    invalidate,
+    HISTORY,
+    NAMES
+)
+from api_v1.conditional import conditional_list
+from api_v1.contention import get_hot_accounts
+from api_v1.export import export_response, NDJSONRenderer, CSVRenderer
+from api_v1.filters import TransactionFilters, get_account_id
+from api_v1.metrics import render as render_metrics, CONTENT_TYPE
+from api_v1.pagination import KeysetPagination, UnionKeysetPagination
+from api_v1.rendering import (
+    FastJSONRenderer,
+    get_customer_rows,
+    get_transaction_rows,
+    is_fast_rendering,
+    render_customers,
+    render_transactions
+)
+from api_v1.services import (
+    account_balance,
+    accounts_balances,
+    create_customer_with_wallet,
+    create_customers_with_wallets,
+    enqueue_transfer,
+    transfer,
+    transfer_batch,
+    transfer_idempotent
+)
+from wallet.models import Account, Customer, Transaction, TransferRequest
+from api_v1.utils import is_ledger_mode
 from api_v1.serializers import (
+    AccountTransactionSerializer,
+    BalanceAsOfSerializer,
+    BalanceBulkSerializer,
     CustomerAccountSerializer,
+    CustomerBulkSerializer,
+    HotAccountsSerializer,
     TransactionSerializer,
-    TransferSerializer
+    TransferSerializer,
+    TransferBatchSerializer,
+    TransferRequestSerializer
 )
 
 
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+
 class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all().prefetch_related('accounts')
     serializer_class = CustomerAccountSerializer
 
+    def get_queryset(self) -> QuerySet:
+        if is_ledger_mode():
+            accounts = Account.objects.with_ledger_balance()
+        else:
+            accounts = Account.objects.with_shards_balance()
+
+        return Customer.objects.all().prefetch_related(
+            Prefetch('accounts', queryset=accounts.order_by('id'))
+        )
+
+    def get_list_version(self) -> Tuple[Tuple, Optional[datetime]]:
+        """
+        Customers list is versioned by the latest customer update and
+        the latest history transaction, every balance change appends one
+        """
+        customers = Customer.objects.aggregate(
+            last_id=Max('id'), updated_at=Max('updated_at')
+        )
+        last_tx = Transaction.objects \
+            .order_by('-id') \
+            .values_list('id', 'created_at') \
+            .first() or (None, None)
+        modified_at = max(
+            filter(None, (customers['updated_at'], last_tx[1])), default=None
+        )
+
+        return (customers['last_id'], customers['updated_at'], last_tx[0]), \
+            modified_at
+
+    def get_cache_scopes(self, request: Request, *args, **kwargs) -> List[str]:
+        """ Scope of the customer id as transfers invalidate it """
+        try:
+            customer_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            # customer isn't found, so the response isn't cached
+            customer_id = kwargs[self.lookup_field]
+
+        return [customer_scope(customer_id)]
+
+    @cached_response
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        return super(CustomerViewSet, self).retrieve(request, *args, **kwargs)
+
+    def perform_update(self, serializer: CustomerAccountSerializer) -> None:
+        serializer.save()
+        invalidate([NAMES, customer_scope(serializer.instance.id)])
+
+    def perform_destroy(self, instance: Customer) -> None:
+        scopes = [NAMES, customer_scope(instance.id)]
+        instance.delete()
+        invalidate(scopes)
+
+    @conditional_list
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        if not is_fast_rendering(request):
+            return super(CustomerViewSet, self).list(request, *args, **kwargs)
+
+        request.accepted_renderer = FastJSONRenderer()
+        rows = get_customer_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+
+        if page is None:
+            return Response(render_customers(rows))
+
+        return self.get_paginated_response(render_customers(page))
+
     def create(self, request: Request, *args, **kwargs) -> Response:
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -32,6 +149,20 @@ class CustomerViewSet(viewsets.ModelViewSet):
             status=response_status,
         )
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request: Request, *args, **kwargs) -> Response:
+        serializer = CustomerBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        response_data, response_status = create_customers_with_wallets(
+            serializer.validated_data
+        )
+
+        return Response(
+            response_data,
+            status=response_status,
+        )
+
 
 class Transfer(APIView):
 
@@ -39,7 +170,105 @@ class Transfer(APIView):
         serializer = TransferSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        response_data, response_status = transfer(serializer.data)
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+
+        if key is None:
+            response_data, response_status = transfer(serializer.data)
+        else:
+            response_data, response_status = transfer_idempotent(
+                key, serializer.data
+            )
+
+        return Response(
+            response_data,
+            status=response_status
+        )
+
+
+class TransferBatch(APIView):
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        serializer = TransferBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        response_data, response_status = transfer_batch(serializer.data)
+
+        return Response(
+            response_data,
+            status=response_status
+        )
+
+
+class TransferAsync(APIView):
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        serializer = TransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        response_data, response_status = enqueue_transfer(serializer.data)
+
+        return Response(
+            response_data,
+            status=response_status
+        )
+
+
+class TransferStatus(APIView):
+
+    def get(self, request: Request, pk: int, *args, **kwargs) -> Response:
+        transfer_request = get_object_or_404(TransferRequest, pk=pk)
+
+        return Response(TransferRequestSerializer(transfer_request).data)
+
+
+class AccountTransactions(generics.ListAPIView):
+    """ Incoming and outgoing transactions of account with its balance """
+    queryset = Transaction.objects.all() \
+        .select_related('account_from__customer', 'account_to__customer') \
+        .order_by('-created_at', '-id')
+    serializer_class = AccountTransactionSerializer
+    pagination_class = UnionKeysetPagination
+
+    def get_union_querysets(self, queryset: QuerySet) -> List[QuerySet]:
+        account = get_account_id(self.kwargs['uuid'])
+
+        return [
+            queryset.filter(account_from=account),
+            queryset.filter(account_to=account)
+                    .exclude(account_from=account),
+        ]
+
+    def get_serializer_context(self) -> Dict:
+        context = super(AccountTransactions, self).get_serializer_context()
+        context['account'] = str(self.kwargs['uuid'])
+        return context
+
+
+class AccountBalance(APIView):
+
+    def get(self, request: Request, uuid: str, *args, **kwargs) -> Response:
+        serializer = BalanceAsOfSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        response_data, response_status = account_balance(
+            uuid, serializer.validated_data
+        )
+
+        return Response(
+            response_data,
+            status=response_status
+        )
+
+
+class AccountsBalances(APIView):
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        serializer = BalanceBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        response_data, response_status = accounts_balances(
+            serializer.validated_data
+        )
 
         return Response(
             response_data,
@@ -47,9 +276,85 @@ class Transfer(APIView):
         )
 
 
+class HotAccounts(APIView):
+    """ The hottest accounts and pairs by lock wait and transfers rate """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        serializer = HotAccountsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(get_hot_accounts(serializer.validated_data['top']))
+
+
+class CacheStats(APIView):
+    """ Hits and misses of cached endpoints summed over all workers """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        return Response(get_cache_stats())
+
+
+class Metrics(APIView):
+    """ Histograms of all workers in Prometheus text exposition format """
+
+    def get(self, request: Request, *args, **kwargs) -> HttpResponse:
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
+
+
 class TransactionViewSet(viewsets.ModelViewSet):
-    queryset = Transaction.objects.all().select_related().order_by('-created_at')
+    queryset = Transaction.objects.all() \
+        .select_related('account_from__customer', 'account_to__customer') \
+        .order_by('-created_at', '-id')
     serializer_class = TransactionSerializer
+    pagination_class = KeysetPagination
     filter_backends = (OrderingFilter, DjangoFilterBackend)
     ordering_fields = ('action', 'created_at')
     filterset_class = TransactionFilters
+
+    def get_list_version(self) -> Tuple[Tuple, Optional[datetime]]:
+        """
+        History is append-only, it's versioned by the latest filtered row,
+        found by one index probe in list order instead of two aggregates
+        """
+        last_id, created_at = self.filter_queryset(self.get_queryset()) \
+            .order_by('-created_at', '-id') \
+            .values_list('id', 'created_at') \
+            .first() or (None, None)
+
+        return (last_id, created_at), created_at
+
+    def get_cache_scopes(self, request: Request, *args, **kwargs) -> List[str]:
+        """
+        Scopes of filtered accounts, uuids are written the same way as
+        transfers invalidate them, whatever case or format request has
+        """
+        try:
+            accounts = [UUID(request.query_params[name])
+                        for name in ('account_from_uuid', 'account_to_uuid')
+                        if request.query_params.get(name)]
+        except ValueError:
+            accounts = []
+
+        if not accounts:
+            return [NAMES, HISTORY]
+
+        return [NAMES] + [account_scope(uuid) for uuid in accounts]
+
+    @cached_response
+    @conditional_list
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        if not is_fast_rendering(request):
+            return super(TransactionViewSet, self).list(request, *args, **kwargs)
+
+        request.accepted_renderer = FastJSONRenderer()
+        rows = get_transaction_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+
+        return self.get_paginated_response(render_transactions(page))
+
+    @action(detail=False, renderer_classes=(NDJSONRenderer, CSVRenderer))
+    def export(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        queryset = self.filter_queryset(self.get_queryset())
+
+        return export_response(queryset, request.accepted_renderer.format)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# imported after settings are configured
+from api_v1.asgi import ReadRouter  # noqa: E402
+
+application = ReadRouter(application)
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_v1.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -51,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api_v1.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -86,6 +88,8 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # seconds connection is kept between requests, 0 closes it
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 0)),
     }
 }
 
@@ -133,6 +137,65 @@ STATIC_URL = '/static/'
 
 TRANSFER_FEE_PERCENT = os.getenv('TRANSFER_FEE', 5)
 
+# 'locking' - locks both accounts and validates transfer in python
+# 'returning' - one guarded UPDATE ... RETURNING statement per transfer
+# 'ledger' - appends ledger entries, locks only debited account
+
+TRANSFER_ENGINE = os.getenv('TRANSFER_ENGINE', 'locking')
+
+TRANSFER_BATCH_MAX_SIZE = int(os.getenv('TRANSFER_BATCH_MAX_SIZE', 1000))
+
+# Idempotency keys are kept for ttl seconds, recent ones are cached in process
+
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000))
+
+# Async transfers worker, poll interval is in seconds
+
+TRANSFER_QUEUE_BATCH_SIZE = int(os.getenv('TRANSFER_QUEUE_BATCH_SIZE', 500))
+TRANSFER_QUEUE_POLL_INTERVAL = float(os.getenv('TRANSFER_QUEUE_POLL_INTERVAL', 0.5))
+
+
+# Customers onboarding parameters
+
+# 'eager' - every currency account is created together with customer
+# 'lazy' - only accounts with initial balance, the others on first transfer
+
+WALLET_MODE = os.getenv('WALLET_MODE', 'eager')
+
+CUSTOMER_BULK_MAX_SIZE = int(os.getenv('CUSTOMER_BULK_MAX_SIZE', 10000))
+CUSTOMER_BULK_CHUNK_SIZE = int(os.getenv('CUSTOMER_BULK_CHUNK_SIZE', 2000))
+
+# How amounts are stored, run `python manage.py convert_money` after change
+# 'decimal' - numeric(10, 2), balances up to 99,999,999.99
+# 'minor' - bigint count of minor units (cents), smaller rows and indexes,
+# integer arithmetic and balances up to 18 digits
+
+MONEY_STORAGE = os.getenv('MONEY_STORAGE', 'decimal')
+
+# Accounts balances at given time requested at once
+
+BALANCE_BULK_MAX_SIZE = int(os.getenv('BALANCE_BULK_MAX_SIZE', 10000))
+
+# Deadlock and serialization failure retries, backoff is in seconds
+
+TRANSFER_RETRY_ATTEMPTS = int(os.getenv('TRANSFER_RETRY_ATTEMPTS', 3))
+TRANSFER_RETRY_BACKOFF = float(os.getenv('TRANSFER_RETRY_BACKOFF', 0.01))
+TRANSFER_RETRY_BACKOFF_MAX = float(os.getenv('TRANSFER_RETRY_BACKOFF_MAX', 0.2))
+
+# Every worker writes its metrics into the directory at most once per
+# interval in seconds, /metrics sums files of all workers. Directory must be
+# shared by workers and cleared on start (default is a temporary one)
+
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+# Share of transfers whose lock wait is recorded by accounts, 0 disables it,
+# and count of the hottest accounts and pairs kept by every worker
+
+CONTENTION_SAMPLE_RATE = float(os.getenv('CONTENTION_SAMPLE_RATE', 0.1))
+CONTENTION_TOP_SIZE = int(os.getenv('CONTENTION_TOP_SIZE', 100))
+
 
 # Django Rest Framework
 
@@ -143,6 +206,34 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# Customers and transactions lists are built from flat rows without
+# serializers, output is the same
+
+FAST_RENDERING = os.getenv('FAST_RENDERING', '0') == '1'
+
+# Any Django cache backend, it must be shared by all workers (e.g. memcached)
+# when response cache is used with more than one process
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds transactions pages and customers are cached for, 0 disables cache
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 0))
+
+# Threads serving read endpoints under ASGI server, each uses its own
+# database connection, kept between requests for `CONN_MAX_AGE` seconds
+
+ASGI_READ_THREADS = int(os.getenv('ASGI_READ_THREADS', 32))
+
+# Rows fetched from server-side cursor at once by history export
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
 
 # SQL queries console logging
 
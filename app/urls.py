@@ -16,8 +16,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from api_v1.views import Metrics
+
 
 urlpatterns = [
+    path('metrics', Metrics.as_view()),
     path('api/v1/', include(('api_v1.urls', 'api_v1'), namespace='api_v1')),
     path('admin/', admin.site.urls),
 ]
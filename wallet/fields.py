@@ -0,0 +1,91 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import models
+
+
+DECIMAL_PLACES = 2
+
+DECIMAL_PARAMS = {'decimal_places': DECIMAL_PLACES, 'max_digits': 10}
+
+# int64 holds any amount of 18 digits in minor units
+MINOR_UNITS_MAX_DIGITS = 18
+
+
+class MoneyStorage(models.TextChoices):
+    """ How amounts are stored in database """
+    DECIMAL = 'decimal'
+    MINOR = 'minor'
+
+
+def is_minor_units() -> bool:
+    return settings.MONEY_STORAGE == MoneyStorage.MINOR
+
+
+def get_amount_params() -> Dict[str, int]:
+    """ Amounts precision of API, larger balances fit into minor units """
+    return {
+        'decimal_places': DECIMAL_PLACES,
+        'max_digits': MINOR_UNITS_MAX_DIGITS if is_minor_units()
+        else DECIMAL_PARAMS['max_digits']
+    }
+
+
+def to_db_amount(amount: Optional[Decimal]):
+    """ Amount as it's stored, rounded the same way numeric column does """
+    if amount is None or not is_minor_units():
+        return amount
+    return int(Decimal(amount).scaleb(DECIMAL_PLACES)
+               .to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_db_amount(value) -> Optional[Decimal]:
+    """ Amount read by raw SQL """
+    if value is None or not is_minor_units():
+        return value
+    return Decimal(value).scaleb(-DECIMAL_PLACES)
+
+
+class MoneyField(models.DecimalField):
+    """
+    Decimal amount stored as numeric or as integer minor units
+
+    `MONEY_STORAGE=minor` keeps amounts as bigint count of cents, so rows
+    and indexes are smaller, database arithmetic is integer one and
+    balances aren't capped by numeric precision. Python value is Decimal
+    in both modes, it's converted at database boundary only
+    """
+
+    def db_type(self, connection) -> str:
+        if is_minor_units():
+            return 'bigint'
+        return super(MoneyField, self).db_type(connection)
+
+    def get_db_prep_save(self, value, connection):
+        if is_minor_units() and not hasattr(value, 'as_sql'):
+            return to_db_amount(self.to_python(value))
+        return super(MoneyField, self).get_db_prep_save(value, connection)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if is_minor_units():
+            if not prepared:
+                value = self.get_prep_value(value)
+            return to_db_amount(value)
+        return super(MoneyField, self).get_db_prep_value(value, connection,
+                                                         prepared)
+
+    def get_db_converters(self, connection):
+        # numeric values need no conversion, so there is no per value cost
+        converters = super(MoneyField, self).get_db_converters(connection)
+        if is_minor_units():
+            converters.append(self.from_minor_units)
+        return converters
+
+    def from_minor_units(self, value, expression, connection):
+        return from_db_amount(value)
+
+
+def money_value(amount: Decimal) -> models.Value:
+    """ Amount used in database expressions, e.g. `F('amount') + amount` """
+    return models.Value(amount, output_field=MoneyField(**DECIMAL_PARAMS))
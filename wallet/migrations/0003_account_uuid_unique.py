@@ -0,0 +1,18 @@
+# Generated by Django 3.0.3 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_auto_20200303_1518'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='uuid',
+            field=models.UUIDField(unique=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.0.3 on 2026-10-18 17:55
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # indexes are built concurrently to not block history writes
+    atomic = False
+
+    dependencies = [
+        ('wallet', '0003_account_uuid_unique'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['-created_at', '-id'], name='wallet_tx_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['account_from_uuid', '-created_at', '-id'], name='wallet_tx_from_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['account_to_uuid', '-created_at', '-id'], name='wallet_tx_to_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['action', '-created_at', '-id'], name='wallet_tx_action_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.0.3 on 2026-10-18 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0005_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='shards_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='AccountShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='shards', to='wallet.Account')),
+            ],
+            options={
+                'unique_together': {('account', 'index')},
+            },
+        ),
+    ]
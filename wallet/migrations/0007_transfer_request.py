@@ -0,0 +1,32 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0006_account_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferRequest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_from', models.IntegerField()),
+                ('customer_to', models.IntegerField(null=True)),
+                ('account_from', models.UUIDField()),
+                ('account_to', models.UUIDField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='QUEUED', max_length=16)),
+                ('result', models.TextField(blank=True)),
+                ('result_status', models.PositiveSmallIntegerField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(status='QUEUED'), fields=['id'], name='wallet_transfer_queued_idx')],
+            },
+        ),
+    ]
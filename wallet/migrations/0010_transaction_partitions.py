@@ -0,0 +1,213 @@
+# Generated by Django 3.0.3 on 2026-10-18 21:05
+
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+TABLE = 'wallet_transaction'
+INITIAL_PARTITION = 'wallet_transaction_initial'
+DEFAULT_PARTITION = 'wallet_transaction_default'
+INITIAL_RANGE = 'wallet_transaction_initial_range'
+
+
+def get_next_month():
+    """ Upper bound of the initial partition """
+    now = datetime.now(timezone.utc)
+    month = now.year * 12 + now.month
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def get_indexes(cursor, table):
+    """ Names, definitions and primary key flags of table indexes """
+    cursor.execute("""
+        SELECT index.relname, pg_get_indexdef(index.oid), pg_index.indisprimary
+        FROM pg_index
+        JOIN pg_class index ON index.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = %s::regclass
+    """, [table])
+    return cursor.fetchall()
+
+
+def get_foreign_keys(cursor, table):
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    """, [table])
+    return cursor.fetchall()
+
+
+def is_identity(cursor, table):
+    """ Newer Django versions create identity instead of serial ids """
+    cursor.execute("""
+        SELECT attidentity <> ''
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = 'id'
+    """, [table])
+    return cursor.fetchone()[0]
+
+
+def move_sequence(cursor, table_from, table_to):
+    """ Makes id of `table_to` continue the sequence of `table_from` """
+    if is_identity(cursor, table_from):
+        cursor.execute(
+            'ALTER TABLE %s ALTER COLUMN id DROP IDENTITY' % table_from
+        )
+        cursor.execute("""
+            SELECT setval(pg_get_serial_sequence(%s, 'id'),
+                          COALESCE(MAX(id), 0) + 1, false)
+            FROM {table}
+        """.format(table=table_from), [table_to])
+    else:
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table_from])
+        cursor.execute('ALTER SEQUENCE %s OWNED BY %s.id'
+                       % (cursor.fetchone()[0], table_to))
+
+
+def check_initial_range(apps, schema_editor):
+    """
+    Checks that existing history fits into the initial partition
+
+    Constraint is added NOT VALID and validated by its own statement out
+    of migration transaction, so the table is scanned without blocking
+    writes. ATTACH PARTITION finds its bound implied by the constraint
+    and skips the scan under exclusive lock
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'ALTER TABLE %s ADD CONSTRAINT %s CHECK (created_at < %%s) '
+            'NOT VALID' % (TABLE, INITIAL_RANGE), [get_next_month()]
+        )
+        cursor.execute('ALTER TABLE %s VALIDATE CONSTRAINT %s'
+                       % (TABLE, INITIAL_RANGE))
+
+
+def uncheck_initial_range(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE %s DROP CONSTRAINT IF EXISTS %s'
+                       % (TABLE, INITIAL_RANGE))
+
+
+def partition_transactions(apps, schema_editor):
+    """
+    Turns history table into partitioned by month of `created_at` one
+
+    Existing table isn't copied, it becomes the initial partition of all
+    history made before the next month, later months get own partitions
+    created by `manage_partitions` command, default partition takes rows
+    of months which have no partition yet
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    # the same as bound of checked range unless the month has just changed,
+    # then attach scans the table itself
+    next_month = get_next_month()
+
+    with schema_editor.connection.cursor() as cursor:
+        indexes = get_indexes(cursor, TABLE)
+        foreign_keys = get_foreign_keys(cursor, TABLE)
+
+        cursor.execute('ALTER TABLE %s RENAME TO %s'
+                       % (TABLE, INITIAL_PARTITION))
+
+        # index names are kept by partitioned table, partition primary key
+        # must include partition key
+        for name, _, primary in indexes:
+            if primary:
+                cursor.execute('ALTER TABLE %s DROP CONSTRAINT %s'
+                               % (INITIAL_PARTITION, name))
+            else:
+                cursor.execute('ALTER INDEX %s RENAME TO %s_initial'
+                               % (name, name))
+
+        cursor.execute("""
+            CREATE TABLE {table} (
+                LIKE {initial}
+                INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY
+            ) PARTITION BY RANGE (created_at)
+        """.format(table=TABLE, initial=INITIAL_PARTITION))
+        # range check is copied with constraints, later months must not fail it
+        cursor.execute('ALTER TABLE %s DROP CONSTRAINT %s'
+                       % (TABLE, INITIAL_RANGE))
+        cursor.execute('ALTER TABLE %s ADD PRIMARY KEY (id, created_at)'
+                       % TABLE)
+        move_sequence(cursor, INITIAL_PARTITION, TABLE)
+
+        for _, definition, primary in indexes:
+            if not primary:
+                cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s %s'
+                           % (TABLE, name, definition))
+
+        cursor.execute("""
+            ALTER TABLE {table} ATTACH PARTITION {initial}
+            FOR VALUES FROM (MINVALUE) TO (%s)
+        """.format(table=TABLE, initial=INITIAL_PARTITION), [next_month])
+        cursor.execute('ALTER TABLE %s DROP CONSTRAINT %s'
+                       % (INITIAL_PARTITION, INITIAL_RANGE))
+        cursor.execute('CREATE TABLE %s PARTITION OF %s DEFAULT'
+                       % (DEFAULT_PARTITION, TABLE))
+
+
+def unpartition_transactions(apps, schema_editor):
+    """ Copies partitioned history back into a plain table """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    plain = '%s_plain' % TABLE
+
+    with schema_editor.connection.cursor() as cursor:
+        indexes = get_indexes(cursor, TABLE)
+        foreign_keys = get_foreign_keys(cursor, TABLE)
+
+        cursor.execute("""
+            CREATE TABLE {plain} (
+                LIKE {table}
+                INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY
+            )
+        """.format(plain=plain, table=TABLE))
+        cursor.execute('INSERT INTO %s SELECT * FROM %s' % (plain, TABLE))
+        move_sequence(cursor, TABLE, plain)
+        cursor.execute('DROP TABLE %s CASCADE' % TABLE)
+        cursor.execute('ALTER TABLE %s RENAME TO %s' % (plain, TABLE))
+        cursor.execute('ALTER TABLE %s ADD PRIMARY KEY (id)' % TABLE)
+
+        for _, definition, primary in indexes:
+            if not primary:
+                cursor.execute(definition.replace(' ON ONLY ', ' ON '))
+        for name, definition in foreign_keys:
+            cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s %s'
+                           % (TABLE, name, definition))
+
+
+class Migration(migrations.Migration):
+
+    # range is validated out of transaction, the table is partitioned
+    # by one atomic step
+    atomic = False
+
+    dependencies = [
+        ('wallet', '0009_customer_updated_at'),
+    ]
+
+    operations = [
+        # partitioned table can't be referenced by foreign key on id only
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='transaction',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='entries', to='wallet.Transaction'),
+        ),
+        migrations.RunPython(check_initial_range, uncheck_initial_range),
+        migrations.RunPython(partition_transactions, unpartition_transactions,
+                             atomic=True),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.0.3 on 2026-10-18 21:30
+
+import wallet.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0010_transaction_partitions'),
+    ]
+
+    # columns keep their type, `convert_money` command converts them
+    # to storage set by MONEY_STORAGE
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='account',
+                name='amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+            migrations.AlterField(
+                model_name='accountshard',
+                name='amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+            migrations.AlterField(
+                model_name='balancecheckpoint',
+                name='amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+            migrations.AlterField(
+                model_name='ledgerentry',
+                name='amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+            migrations.AlterField(
+                model_name='transaction',
+                name='account_from_amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+            migrations.AlterField(
+                model_name='transaction',
+                name='account_to_amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+            migrations.AlterField(
+                model_name='transaction',
+                name='amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+            migrations.AlterField(
+                model_name='transferrequest',
+                name='amount',
+                field=wallet.fields.MoneyField(decimal_places=2, max_digits=10),
+            ),
+        ]),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 3.0.3 on 2026-10-18 21:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0011_money_field'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='wallet_tx_from_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='wallet_tx_to_created_idx',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='account_from_currency',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='account_from_uuid',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='account_to_currency',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='account_to_uuid',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='customer_from',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='customer_to',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='updated_at',
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='account_from',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='tx_from', to='wallet.Account'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='account_to',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='tx_to', to='wallet.Account'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account_from', '-created_at', '-id'], name='wallet_tx_from_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account_to', '-created_at', '-id'], name='wallet_tx_to_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.0.3 on 2026-10-18 22:10
+
+import django.db.models.deletion
+import wallet.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0012_slim_transaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', wallet.fields.MoneyField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='snapshots', to='wallet.Account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', '-created_at'], name='wallet_snapshot_created_idx')],
+            },
+        ),
+    ]
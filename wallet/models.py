@@ -1,7 +1,12 @@
+from uuid import UUID, uuid5
+
 from django.db import models
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 
+from wallet.fields import DECIMAL_PARAMS, MoneyField
 
-DECIMAL_PARAMS = {'decimal_places': 2, 'max_digits': 10}
+VIRTUAL_ACCOUNT_NAMESPACE = UUID('5b0c2a6e-8f51-4a7e-9d0b-2f3c6c1e7a44')
 
 
 class Currency(models.TextChoices):
@@ -18,33 +23,209 @@ class Action(models.TextChoices):
     CHARGE = 'CHARGE'
 
 
+class TransferEngine(models.TextChoices):
+    """ How transfer changes balances """
+    LOCKING = 'locking'
+    RETURNING = 'returning'
+    LEDGER = 'ledger'
+
+
+class WalletMode(models.TextChoices):
+    """ Which accounts are created together with customer """
+    EAGER = 'eager'
+    LAZY = 'lazy'
+
+
+class TransferStatus(models.TextChoices):
+    """ Queued transfer processing state """
+    QUEUED = 'QUEUED'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+
 class Customer(models.Model):
     """ User who has different accounts """
     first_name = models.CharField(max_length=256)
     last_name = models.CharField(max_length=256)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class AccountQuerySet(models.QuerySet):
+
+    def with_ledger_balance(self) -> 'AccountQuerySet':
+        """
+        Annotates `ledger_amount` - balance of ledger mode
+
+        It's the latest checkpoint (or `amount` if account has no one yet)
+        plus entries which are not included into checkpoint
+        """
+        checkpoint = BalanceCheckpoint.objects \
+            .filter(account=OuterRef('pk')) \
+            .order_by('-id') \
+            .values('amount')[:1]
+        entries = LedgerEntry.objects \
+            .filter(account=OuterRef('pk'), checkpoint__isnull=True) \
+            .order_by() \
+            .values('account') \
+            .annotate(total=Sum('amount')) \
+            .values('total')
+        output_field = MoneyField(**DECIMAL_PARAMS)
+
+        return self.annotate(ledger_amount=models.ExpressionWrapper(
+            Coalesce(Subquery(checkpoint), F('amount'),
+                     output_field=output_field) +
+            Coalesce(Subquery(entries), 0, output_field=output_field),
+            output_field=output_field
+        ))
+
+    def with_shards_balance(self) -> 'AccountQuerySet':
+        """ Annotates `shards_amount` - sum of hot account shards """
+        shards = AccountShard.objects \
+            .filter(account=OuterRef('pk')) \
+            .order_by() \
+            .values('account') \
+            .annotate(total=Sum('amount')) \
+            .values('total')
+        output_field = MoneyField(**DECIMAL_PARAMS)
+
+        return self.annotate(shards_amount=models.Case(
+            models.When(shards_count=0, then=0),
+            default=Coalesce(Subquery(shards), 0, output_field=output_field),
+            output_field=output_field
+        ))
 
 
 class Account(models.Model):
     """ Account belongs to customer """
-    uuid = models.UUIDField()
+    uuid = models.UUIDField(unique=True)
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT, related_name='accounts')
     currency = models.CharField(max_length=3, choices=Currency.choices)
-    amount = models.DecimalField(**DECIMAL_PARAMS)
+    amount = MoneyField(**DECIMAL_PARAMS)
+    shards_count = models.PositiveSmallIntegerField(default=0)
+
+    objects = AccountQuerySet.as_manager()
+
+    @property
+    def is_hot(self) -> bool:
+        return self.shards_count > 0
+
+    @property
+    def balance(self):
+        """ Current balance, includes ledger entries and shards if queried """
+        return getattr(self, 'ledger_amount', self.amount) + \
+            getattr(self, 'shards_amount', 0)
+
+    @staticmethod
+    def get_virtual_uuid(customer: int, currency: str) -> UUID:
+        """ Uuid of customer account which may be not created yet """
+        return uuid5(VIRTUAL_ACCOUNT_NAMESPACE,
+                     '%s:%s' % (customer, Currency(currency).value))
+
+
+class AccountShard(models.Model):
+    """ Part of hot account balance, hot account balance is split by shards """
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    amount = MoneyField(**DECIMAL_PARAMS)
+
+    class Meta:
+        unique_together = ('account', 'index')
 
 
 class Transaction(models.Model):
-    """ History operation """
-    customer_from = models.ForeignKey(Customer, on_delete=models.PROTECT, related_name='tx_from')
-    customer_to = models.ForeignKey(Customer, on_delete=models.PROTECT, related_name='tx_to')
-    account_from = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='tx_from')
-    account_to = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='tx_to')
-    account_from_uuid = models.UUIDField()
-    account_from_currency = models.CharField(max_length=3, choices=Currency.choices)
-    account_from_amount = models.DecimalField(**DECIMAL_PARAMS)
-    account_to_uuid = models.UUIDField()
-    account_to_currency = models.CharField(max_length=3, choices=Currency.choices)
-    account_to_amount = models.DecimalField(**DECIMAL_PARAMS)
-    amount = models.DecimalField(**DECIMAL_PARAMS)
+    """
+    History operation, table is partitioned by month of `created_at`
+
+    Row keeps only what can't be got from accounts - balances after
+    the operation, uuids, currencies and customers are joined
+    """
+    account_from = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='tx_from', db_index=False)
+    account_to = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='tx_to', db_index=False)
+    account_from_amount = MoneyField(**DECIMAL_PARAMS)
+    account_to_amount = MoneyField(**DECIMAL_PARAMS)
+    amount = MoneyField(**DECIMAL_PARAMS)
     action = models.CharField(max_length=128, choices=Action.choices)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # account indexes also serve foreign keys lookups
+        indexes = (
+            models.Index(fields=('-created_at', '-id'),
+                         name='wallet_tx_created_idx'),
+            models.Index(fields=('account_from', '-created_at', '-id'),
+                         name='wallet_tx_from_created_idx'),
+            models.Index(fields=('account_to', '-created_at', '-id'),
+                         name='wallet_tx_to_created_idx'),
+            models.Index(fields=('action', '-created_at', '-id'),
+                         name='wallet_tx_action_created_idx'),
+        )
+
+
+class BalanceCheckpoint(models.Model):
+    """ Ledger mode account balance including all entries linked to it """
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='checkpoints')
+    amount = MoneyField(**DECIMAL_PARAMS)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Account balance after its latest history operation of detached partition
+
+    Keeps balance as of times after detached history for point in time
+    queries, `created_at` is the time of that operation
+    """
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='snapshots')
+    amount = MoneyField(**DECIMAL_PARAMS)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('account', '-created_at'),
+                         name='wallet_snapshot_created_idx'),
+        )
+
+
+class LedgerEntry(models.Model):
+    """ Ledger mode append-only balance change, debit is negative """
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='entries')
+    transaction = models.ForeignKey(Transaction, on_delete=models.PROTECT, related_name='entries', db_constraint=False)
+    checkpoint = models.ForeignKey(BalanceCheckpoint, on_delete=models.PROTECT, related_name='entries', null=True)
+    amount = MoneyField(**DECIMAL_PARAMS)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('account',),
+                         condition=Q(checkpoint__isnull=True),
+                         name='wallet_entry_unchecked_idx'),
+        )
+
+
+class TransferRequest(models.Model):
+    """ Transfer queued by client and applied by worker later """
+    customer_from = models.IntegerField()
+    customer_to = models.IntegerField(null=True)
+    account_from = models.UUIDField()
+    account_to = models.UUIDField()
+    amount = MoneyField(**DECIMAL_PARAMS)
+    status = models.CharField(max_length=16, choices=TransferStatus.choices, default=TransferStatus.QUEUED)
+    result = models.TextField(blank=True)
+    result_status = models.PositiveSmallIntegerField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('id',),
+                         condition=Q(status=TransferStatus.QUEUED),
+                         name='wallet_transfer_queued_idx'),
+        )
+
+
+class IdempotencyKey(models.Model):
+    """ Response of transfer done with client's idempotency key """
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(max_length=64)
+    response = models.TextField()
+    status = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)